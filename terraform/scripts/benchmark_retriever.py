@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Vultr Resource Retriever Benchmark
+Runs VultrResourceRetriever end to end against a local mock_vultr_api server
+and reports wall time, requests per second, bytes transferred and peak
+memory for the serial, concurrent, paginated and cached modes as JSON.
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from mock_vultr_api import MockVultrAPI, build_catalog
+from vultr_resource_retriever import VultrResourceRetriever
+
+
+class RetrieverBenchmark:
+    """Runs retriever scenarios against a mock API and collects metrics"""
+    
+    def __init__(self, api: MockVultrAPI, repeat: int = 3, rate_limit: float = None):
+        """
+        Initialize the benchmark.
+        
+        Args:
+            api: Running mock API server
+            repeat: Timed runs per scenario (the median is reported)
+            rate_limit: Retriever requests per second (default: retriever default)
+        """
+        self.api = api
+        self.repeat = repeat
+        self.rate_limit = rate_limit or VultrResourceRetriever.DEFAULT_RATE_LIMIT
+    
+    def _retriever(self, **kwargs) -> VultrResourceRetriever:
+        return VultrResourceRetriever(base_url=self.api.base_url, rate_limit=self.rate_limit, **kwargs)
+    
+    def scenarios(self, work_dir: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Define the benchmark scenarios.
+        
+        Each scenario has a 'retriever' factory, 'run' arguments for
+        retrieve_and_save_all and an optional 'prepare' step run untimed.
+        
+        Args:
+            work_dir: Scratch directory for caches and output files
+        
+        Returns:
+            Scenario definitions keyed by name
+        """
+        warm_cache = f"{work_dir}/cache"
+        
+        def warm():
+            with contextlib.redirect_stdout(io.StringIO()):
+                with self._retriever(cache_dir=warm_cache) as retriever:
+                    retriever.fetch_all()
+        
+        return {
+            "serial": {
+                "retriever": lambda: self._retriever(),
+                "run": {"concurrency": 1},
+            },
+            "concurrent": {
+                "retriever": lambda: self._retriever(),
+                "run": {"concurrency": 3},
+            },
+            "paginated": {
+                "retriever": lambda: self._retriever(per_page=MockVultrAPI.DEFAULT_PER_PAGE // 4),
+                "run": {"concurrency": 1},
+            },
+            "cached": {
+                "retriever": lambda: self._retriever(cache_dir=warm_cache),
+                "run": {"concurrency": 1},
+                "prepare": warm,
+            },
+            "revalidated": {
+                "retriever": lambda: self._retriever(cache_dir=warm_cache, cache_ttl=0),
+                "run": {"concurrency": 1},
+                "prepare": warm,
+            },
+        }
+    
+    def _run_once(self, factory: Callable[[], VultrResourceRetriever], run: Dict[str, Any],
+                  output_dir: str) -> Dict[str, Any]:
+        """
+        Run one retrieve_and_save_all pass with output suppressed.
+        
+        Returns:
+            Wall time and the mock server's request statistics
+        """
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(output_dir)
+        self.api.reset_stats()
+        with contextlib.redirect_stdout(io.StringIO()):
+            with factory() as retriever:
+                start = time.perf_counter()
+                retriever.retrieve_and_save_all(output_dir=output_dir, force=True, **run)
+                wall = time.perf_counter() - start
+        return {"wall_seconds": wall, **self.api.stats}
+    
+    def run_scenario(self, name: str, scenario: Dict[str, Any], work_dir: str) -> Dict[str, Any]:
+        """
+        Time a scenario several times, then measure peak memory in one
+        extra traced run (tracing would distort the timings).
+        
+        Returns:
+            Result record for the scenario
+        """
+        output_dir = f"{work_dir}/out_{name}"
+        walls = []
+        stats = {}
+        for _ in range(self.repeat):
+            if scenario.get("prepare"):
+                scenario["prepare"]()
+            stats = self._run_once(scenario["retriever"], scenario["run"], output_dir)
+            walls.append(stats["wall_seconds"])
+        
+        if scenario.get("prepare"):
+            scenario["prepare"]()
+        tracemalloc.start()
+        self._run_once(scenario["retriever"], scenario["run"], output_dir)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        wall = statistics.median(walls)
+        return {
+            "scenario": name,
+            "wall_seconds": round(wall, 6),
+            "wall_seconds_runs": [round(w, 6) for w in walls],
+            "requests": stats["requests"],
+            "requests_per_second": round(stats["requests"] / wall, 2) if wall else None,
+            "bytes_received": stats["bytes_sent"],
+            "status_counts": stats["status"],
+            "peak_memory_bytes": peak,
+        }
+    
+    def run(self, selected: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Run the selected scenarios (all by default).
+        
+        Returns:
+            List of result records
+        """
+        work_dir = tempfile.mkdtemp(prefix="vultr_bench_")
+        try:
+            results = []
+            for name, scenario in self.scenarios(work_dir).items():
+                if selected and name not in selected:
+                    continue
+                print(f"Running scenario: {name}", file=sys.stderr)
+                results.append(self.run_scenario(name, scenario, work_dir))
+            return results
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    """Main function to run the benchmark"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Benchmark VultrResourceRetriever against a local mock Vultr API"
+    )
+    parser.add_argument("--plans", type=int, default=1000, help="Synthetic plans (default: 1000)")
+    parser.add_argument("--regions", type=int, default=32, help="Synthetic regions (default: 32)")
+    parser.add_argument("--os-count", type=int, default=200, help="Synthetic OS images (default: 200)")
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="Mock server latency per request in seconds (default: 0.02)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probability of a 429 response (default: 0)")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Probability of a 503 response (default: 0)")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="Retriever requests per second (default: retriever default)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per scenario (default: 3)")
+    parser.add_argument("--scenario", action="append",
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--output", default=None, help="Write JSON results to this file (default: stdout)")
+    
+    args = parser.parse_args()
+    
+    catalog = build_catalog(args.plans, args.regions, args.os_count)
+    with MockVultrAPI(catalog=catalog, latency=args.latency, rate_429=args.rate_429,
+                      rate_5xx=args.rate_5xx, retry_after="0") as api:
+        benchmark = RetrieverBenchmark(api, repeat=args.repeat, rate_limit=args.rate_limit)
+        results = benchmark.run(args.scenario)
+    
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "plans": args.plans,
+            "regions": args.regions,
+            "os_count": args.os_count,
+            "latency": args.latency,
+            "rate_429": args.rate_429,
+            "rate_5xx": args.rate_5xx,
+            "rate_limit": benchmark.rate_limit,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+        print(f"Results saved to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,31 +4,35 @@ Example usage of VultrResourceRetriever class
 Demonstrates how to use the retriever programmatically in your own scripts
 """
 
+from vultr_catalog import VultrCatalog
 from vultr_resource_retriever import VultrResourceRetriever
 
+# Shared response cache so the examples only download the catalog once
+CACHE_DIR = ".vultr_cache"
+
 def example_basic_usage():
     """Example: Basic usage without API key"""
     print("=== Example 1: Basic Usage ===\n")
     
-    retriever = VultrResourceRetriever()
+    retriever = VultrResourceRetriever(cache_dir=CACHE_DIR)
     
     # Get plans
     plans = retriever.get_plans()
     print(f"Found {len(plans)} plans")
     if plans:
-        print(f"First plan: {plans[0]['id']}")
+        print(f"First plan: {plans[0].id}")
     
     # Get regions
     regions = retriever.get_regions()
     print(f"Found {len(regions)} regions")
     if regions:
-        print(f"First region: {regions[0]['id']} - {regions[0]['city']}")
+        print(f"First region: {regions[0].id} - {regions[0].city}")
     
     # Get operating systems
     os_list = retriever.get_os_list()
     print(f"Found {len(os_list)} operating systems")
     if os_list:
-        print(f"First OS: {os_list[0]['name']}")
+        print(f"First OS: {os_list[0].name}")
     print()
 
 
@@ -39,7 +43,7 @@ def example_with_api_key():
     # Replace with your actual API key
     api_key = "YOUR_API_KEY_HERE"
     
-    retriever = VultrResourceRetriever(api_key=api_key)
+    retriever = VultrResourceRetriever(api_key=api_key, cache_dir=CACHE_DIR)
     
     # Retrieve and save all data
     retriever.retrieve_and_save_all(output_dir="./output")
@@ -50,19 +54,19 @@ def example_filter_plans():
     """Example: Filter plans by criteria"""
     print("=== Example 3: Filter Plans ===\n")
     
-    retriever = VultrResourceRetriever()
+    retriever = VultrResourceRetriever(cache_dir=CACHE_DIR)
     plans = retriever.get_plans()
     
     # Filter plans with at least 2 CPUs and 4GB RAM
     filtered_plans = [
         plan for plan in plans 
-        if plan.get('vcpu_count', 0) >= 2 and plan.get('ram', 0) >= 4096
+        if (plan.vcpu_count or 0) >= 2 and (plan.ram or 0) >= 4096
     ]
     
     print(f"Plans with 2+ CPUs and 4+ GB RAM: {len(filtered_plans)}")
     for plan in filtered_plans[:5]:  # Show first 5
-        print(f"  - {plan['id']}: {plan['vcpu_count']} CPU, "
-              f"{plan['ram']//1024}GB RAM, ${plan.get('monthly_cost', 'N/A')}/mo")
+        print(f"  - {plan.id}: {plan.vcpu_count} CPU, "
+              f"{plan.ram//1024}GB RAM, ${plan.monthly_cost}/mo")
     print()
 
 
@@ -70,20 +74,20 @@ def example_find_regions_by_country():
     """Example: Find regions by country"""
     print("=== Example 4: Find Regions by Country ===\n")
     
-    retriever = VultrResourceRetriever()
+    retriever = VultrResourceRetriever(cache_dir=CACHE_DIR)
     regions = retriever.get_regions()
     
     # Group regions by country
     countries = {}
     for region in regions:
-        country = region.get('country', 'Unknown')
+        country = region.country or 'Unknown'
         if country not in countries:
             countries[country] = []
         countries[country].append(region)
     
     print("Regions by country:")
     for country, region_list in sorted(countries.items()):
-        cities = [r['city'] for r in region_list]
+        cities = [r.city for r in region_list]
         print(f"  {country}: {', '.join(cities)}")
     print()
 
@@ -92,16 +96,16 @@ def example_os_by_family():
     """Example: Group operating systems by family"""
     print("=== Example 5: Operating Systems by Family ===\n")
     
-    retriever = VultrResourceRetriever()
+    retriever = VultrResourceRetriever(cache_dir=CACHE_DIR)
     os_list = retriever.get_os_list()
     
     # Group by family
     families = {}
     for os in os_list:
-        family = os.get('family', 'other')
+        family = os.family or 'other'
         if family not in families:
             families[family] = []
-        families[family].append(os['name'])
+        families[family].append(os.name)
     
     print("Operating systems by family:")
     for family, os_names in sorted(families.items()):
@@ -117,17 +121,17 @@ def example_cheapest_plans():
     """Example: Find cheapest plans"""
     print("=== Example 6: Find Cheapest Plans ===\n")
     
-    retriever = VultrResourceRetriever()
+    retriever = VultrResourceRetriever(cache_dir=CACHE_DIR)
     plans = retriever.get_plans()
     
     # Sort by monthly cost
-    plans_with_cost = [p for p in plans if 'monthly_cost' in p and p['monthly_cost']]
-    sorted_plans = sorted(plans_with_cost, key=lambda x: float(x['monthly_cost']))
+    plans_with_cost = [p for p in plans if p.monthly_cost]
+    sorted_plans = sorted(plans_with_cost, key=lambda x: x.monthly_cost)
     
     print("5 Cheapest plans:")
     for plan in sorted_plans[:5]:
-        print(f"  ${plan['monthly_cost']:>6}/mo - {plan['id']}: "
-              f"{plan['vcpu_count']} CPU, {plan['ram']//1024}GB RAM, {plan['disk']}GB disk")
+        print(f"  ${plan.monthly_cost:>6}/mo - {plan.id}: "
+              f"{plan.vcpu_count} CPU, {plan.ram//1024}GB RAM, {plan.disk}GB disk")
     print()
 
 
@@ -135,11 +139,11 @@ def example_save_specific_data():
     """Example: Save only specific data"""
     print("=== Example 7: Save Specific Data Only ===\n")
     
-    retriever = VultrResourceRetriever()
+    retriever = VultrResourceRetriever(cache_dir=CACHE_DIR)
     
     # Get only regions in the US
     all_regions = retriever.get_regions()
-    us_regions = [r for r in all_regions if r.get('country') == 'US']
+    us_regions = [r for r in all_regions if r.country == 'US']
     
     # Save to custom file
     retriever.save_to_json({"us_regions": us_regions}, "us_regions_only.json")
@@ -149,11 +153,43 @@ def example_save_specific_data():
     print()
 
 
+def example_catalog_queries():
+    """Example: Indexed queries with VultrCatalog (one fetch, no scans)"""
+    print("=== Example 8: Indexed Catalog Queries ===\n")
+    
+    retriever = VultrResourceRetriever(cache_dir=CACHE_DIR)
+    catalog = VultrCatalog.from_retriever(retriever, concurrency=3)
+    
+    plan = catalog.cheapest_plan(min_vcpu=4, region="dfw")
+    if plan:
+        print(f"Cheapest 4+ vCPU plan in dfw: {plan.id} (${plan.monthly_cost}/mo)")
+    
+    print("3 cheapest plans with 2+ CPUs and 4+ GB RAM:")
+    for plan in catalog.find_plans(min_vcpu=2, min_ram=4096, limit=3):
+        print(f"  - {plan.id}: {plan.vcpu_count} CPU, {plan.ram//1024}GB RAM, ${plan.monthly_cost}/mo")
+    
+    us_cities = [r.city for r in catalog.regions_by_country("US")]
+    print(f"US regions: {', '.join(us_cities)}")
+    print(f"Ubuntu images: {len(catalog.os_by_family('ubuntu'))}")
+    print()
+
+
 if __name__ == "__main__":
+    import os
+    import sys
+    
     print("Vultr Resource Retriever - Usage Examples\n")
     print("=" * 60)
     print()
     
+    # --mock: run against a local synthetic API instead of api.vultr.com
+    mock_api = None
+    if "--mock" in sys.argv:
+        from mock_vultr_api import MockVultrAPI
+        mock_api = MockVultrAPI().start()
+        os.environ["VULTR_API_BASE_URL"] = mock_api.base_url
+        print(f"Using mock Vultr API at {mock_api.base_url}\n")
+    
     # Run all examples
     try:
         example_basic_usage()
@@ -163,11 +199,16 @@ if __name__ == "__main__":
         example_os_by_family()
         example_cheapest_plans()
         example_save_specific_data()
+        example_catalog_queries()
         
         print("=" * 60)
         print("\nAll examples completed successfully!")
-        
+    
     except Exception as e:
         print(f"\nError running examples: {e}")
         print("Make sure you have an internet connection and the 'requests' library installed.")
         print("Install with: pip install requests")
+        print("To run without a network, use: python3 examples.py --mock")
+    finally:
+        if mock_api:
+            mock_api.stop()
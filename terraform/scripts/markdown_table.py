@@ -0,0 +1,139 @@
+"""
+Markdown Table Rendering
+Streaming writer and precompiled table formatter used by update_vultr_docs.py.
+
+A MarkdownTable compiles its column spec once (header, separator and a row
+formatter with the per-column getters and truncation bound in closures), then
+streams one line per record to a MarkdownWriter, which writes straight to a
+buffered file instead of collecting every line in memory.
+"""
+
+import hashlib
+from itertools import islice
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, TextIO
+
+
+class MarkdownWriter:
+    """Writes markdown lines to a text stream and hashes each section"""
+    
+    BATCH_LINES = 512
+    
+    def __init__(self, stream: TextIO):
+        """
+        Initialize the writer.
+        
+        Args:
+            stream: Text stream to write to (e.g. a buffered file)
+        """
+        self.stream = stream
+        self._started = False
+        self._section = None
+    
+    def _write(self, chunk: str):
+        self.stream.write(chunk)
+        if self._section is not None:
+            self._section.update(chunk.encode('utf-8'))
+    
+    def line(self, text: str = ""):
+        """
+        Write one line.
+        
+        Lines are separated (not terminated) by newlines, so the output is
+        identical to "\\n".join() over all lines.
+        """
+        if self._started:
+            self._write("\n" + text)
+        else:
+            self.stream.write(text)
+            self._started = True
+    
+    def lines(self, texts: Iterable[str]):
+        """Write several lines, joined in batches to keep write calls few."""
+        texts = iter(texts)
+        if not self._started:
+            for text in islice(texts, 1):
+                self.line(text)
+        while True:
+            batch = list(islice(texts, self.BATCH_LINES))
+            if not batch:
+                break
+            self._write("\n" + "\n".join(batch))
+    
+    def begin_section(self):
+        """
+        Start hashing the lines of a new section (which must not be the
+        first output, as the document header always precedes it).
+        """
+        self._section = hashlib.sha256()
+    
+    def end_section(self) -> str:
+        """
+        Stop hashing the current section.
+        
+        Returns:
+            Digest of the section's lines (same as text_digest)
+        """
+        digest = self._section.hexdigest()[:16]
+        self._section = None
+        return digest
+
+
+def text_digest(lines: List[str]) -> str:
+    """Return the digest MarkdownWriter.end_section gives for these lines."""
+    digest = hashlib.sha256()
+    for text in lines:
+        digest.update(("\n" + text).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class Column(NamedTuple):
+    """A table column: header text, value getter and optional truncation width"""
+    
+    header: str
+    value: Callable[[Any], Any]
+    max_width: Optional[int] = None
+
+
+class MarkdownTable:
+    """Markdown table compiled once from a column spec"""
+    
+    def __init__(self, columns: Iterable[Column]):
+        """
+        Compile the table.
+        
+        Args:
+            columns: Column specs in display order
+        """
+        self.columns = list(columns)
+        self.header = "| " + " | ".join(column.header for column in self.columns) + " |"
+        self.separator = "|" + "|".join(["---"] * len(self.columns)) + "|"
+        self.format_row = self._compile()
+    
+    def _compile(self) -> Callable[[Any], str]:
+        """Build the row formatter: one format template, getters pre-bound."""
+        template = "| " + " | ".join(["{}"] * len(self.columns)) + " |"
+        getters = []
+        for column in self.columns:
+            if column.max_width is None:
+                getters.append(column.value)
+            else:
+                def cell(record, get=column.value, width=column.max_width):
+                    value = str(get(record))
+                    return value if len(value) <= width else value[:width - 3] + "..."
+                getters.append(cell)
+        
+        def format_row(record) -> str:
+            return template.format(*[get(record) for get in getters])
+        return format_row
+    
+    def write(self, writer: MarkdownWriter, records: Iterable[Any]):
+        """
+        Stream the header, separator and one row per record.
+        
+        Args:
+            writer: Destination writer
+            records: Records to render, in order
+        """
+        writer.line(self.header)
+        writer.line(self.separator)
+        writer.lines(map(self.format_row, records))
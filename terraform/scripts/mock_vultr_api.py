@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Local Mock Vultr API Server
+Serves synthetic /v2/plans, /v2/regions and /v2/os catalogs so the retriever
+can be tested and benchmarked without reaching api.vultr.com.
+
+Supports cursor pagination (per_page/cursor, meta.links.next), ETag
+revalidation, gzip, configurable latency and 429/5xx fault injection.
+/v2/regions/{id}/availability lists the plans located in the region, minus
+a deterministic ~10% that are "sold out".
+
+With an API key (any Bearer token) it also serves a synthetic account:
+/v2/instances, /v2/snapshots, /v2/backups, /v2/reserved-ips and the
+per-instance /backup-schedule and /bandwidth endpoints.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+PLAN_TYPES = ["vc2", "vhf", "vhp", "voc", "vcg"]
+CONTINENTS = {
+    "US": "North America", "CA": "North America", "MX": "North America",
+    "BR": "South America", "CL": "South America",
+    "DE": "Europe", "GB": "Europe", "FR": "Europe", "NL": "Europe", "ES": "Europe",
+    "JP": "Asia", "KR": "Asia", "SG": "Asia", "IN": "Asia",
+    "AU": "Australia", "ZA": "Africa",
+}
+REGION_OPTIONS = ["ddos_protection", "block_storage_storage_opt",
+                  "block_storage_high_perf", "load_balancers", "kubernetes"]
+OS_FAMILIES = ["ubuntu", "debian", "centos", "rockylinux", "almalinux",
+               "fedora", "windows", "freebsd", "archlinux"]
+
+
+def build_catalog(plans: int = 100, regions: int = 32, os_count: int = 50,
+                  seed: int = 0) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Build a synthetic catalog shaped like the Vultr API responses.
+    
+    Args:
+        plans: Number of plans
+        regions: Number of regions
+        os_count: Number of operating systems
+        seed: Random seed, so the same arguments give the same catalog
+    
+    Returns:
+        Dictionary with 'plans', 'regions' and 'os' item lists
+    """
+    rng = random.Random(seed)
+    countries = list(CONTINENTS)
+    
+    region_items = []
+    for i in range(regions):
+        country = rng.choice(countries)
+        region_items.append({
+            "id": "".join(chr(97 + (i // 26 ** k) % 26) for k in (2, 1, 0)),
+            "city": f"City {i}",
+            "country": country,
+            "continent": CONTINENTS[country],
+            "options": rng.sample(REGION_OPTIONS, rng.randint(0, 3)),
+        })
+    region_ids = [r["id"] for r in region_items]
+    
+    plan_items = []
+    for i in range(plans):
+        plan_type = rng.choice(PLAN_TYPES)
+        vcpus = rng.choice([1, 2, 4, 6, 8, 16, 24, 32])
+        ram = vcpus * rng.choice([512, 1024, 2048, 4096])
+        monthly_cost = round(vcpus * rng.choice([2.5, 3.5, 5, 6, 7.5]), 2)
+        plan_items.append({
+            "id": f"{plan_type}-{vcpus}c-{ram // 1024 or 0.5}gb-{i}",
+            "vcpu_count": vcpus,
+            "ram": ram,
+            "disk": rng.choice([10, 25, 50, 100, 200, 400]),
+            "disk_count": 1,
+            "bandwidth": rng.choice([0, 512, 1024, 2048, 4096]),
+            "monthly_cost": monthly_cost,
+            "hourly_cost": round(monthly_cost / 730, 3),
+            "type": plan_type,
+            "locations": rng.sample(region_ids, rng.randint(0, min(len(region_ids), 12))),
+            "cpu_vendor": rng.choice(["Intel", "AMD"]),
+            "storage_type": rng.choice(["local_storage", "nvme"]),
+            "invoice_type": "monthly",
+        })
+    
+    os_items = []
+    for i in range(os_count):
+        family = rng.choice(OS_FAMILIES)
+        os_items.append({
+            "id": 100 + i * 7,
+            "name": f"{family.title()} {i} x64",
+            "arch": rng.choice(["x64", "arm64"]),
+            "family": family,
+        })
+    
+    return {"plans": plan_items, "regions": region_items, "os": os_items}
+
+
+def build_account(catalog: Dict[str, List[Dict[str, Any]]], instances: int = 0,
+                  seed: int = 0) -> Dict[str, Any]:
+    """
+    Build a synthetic account (instances and their snapshots, backups,
+    reserved IPs, backup schedules and bandwidth) using ids from a catalog.
+    
+    Args:
+        catalog: Catalog from build_catalog, for plan, region and OS ids
+        instances: Number of instances
+        seed: Random seed, so the same arguments give the same account
+    
+    Returns:
+        Dictionary with 'instances', 'snapshots', 'backups' and
+        'reserved_ips' item lists, and 'backup_schedules' and 'bandwidth'
+        keyed by instance id
+    """
+    rng = random.Random(seed)
+    account = {"instances": [], "snapshots": [], "backups": [], "reserved_ips": [],
+               "backup_schedules": {}, "bandwidth": {}}
+    plans = [plan for plan in catalog["plans"] if plan["locations"]] or catalog["plans"]
+    for i in range(instances):
+        plan = rng.choice(plans)
+        os_item = rng.choice(catalog["os"])
+        backups = rng.random() < 0.5
+        instance_id = f"{i:08x}-{seed:04x}-4000-8000-{rng.getrandbits(48):012x}"
+        account["instances"].append({
+            "id": instance_id,
+            "os": os_item["name"],
+            "ram": plan["ram"],
+            "disk": plan["disk"],
+            "main_ip": f"192.0.{2 + i // 250}.{i % 250 + 1}",
+            "vcpu_count": plan["vcpu_count"],
+            "region": rng.choice(plan["locations"]) if plan["locations"] else "ewr",
+            "plan": plan["id"],
+            "date_created": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T12:00:00+00:00",
+            "status": "active",
+            "power_status": rng.choice(["running", "running", "stopped"]),
+            "server_status": "ok",
+            "label": f"Server {i}",
+            "hostname": f"server-{i}.example.com",
+            "tags": rng.sample(["web", "mail", "db", "production", "staging"], rng.randint(0, 2)),
+            "os_id": os_item["id"],
+            "features": ["auto_backups"] if backups else [],
+        })
+        account["backup_schedules"][instance_id] = {
+            "enabled": backups, "type": "weekly", "hour": 5, "dow": 0, "dom": 0,
+            "next_scheduled_time_utc": "2026-01-25 05:00:00",
+        }
+        account["bandwidth"][instance_id] = {
+            f"2026-01-{day:02d}": {"incoming_bytes": rng.randint(0, 10 ** 9),
+                                   "outgoing_bytes": rng.randint(0, 10 ** 9)}
+            for day in range(1, 31)
+        }
+        for n in range(rng.randint(0, 2)):
+            account["snapshots"].append({
+                "id": f"{instance_id[:8]}-snap-{n}",
+                "date_created": f"2026-01-{10 + n:02d}T00:00:00+00:00",
+                "description": f"Server {i} snapshot {n}",
+                "size": plan["disk"] * 2 ** 30,
+                "compressed_size": plan["disk"] * 2 ** 28,
+                "status": "complete",
+                "os_id": os_item["id"],
+                "app_id": 0,
+            })
+        if backups:
+            account["backups"].append({
+                "id": f"{instance_id[:8]}-backup-0",
+                "date_created": "2026-01-18T05:00:00+00:00",
+                "description": f"Automatic backup of server-{i}.example.com",
+                "size": plan["disk"] * 2 ** 28,
+                "status": "complete",
+            })
+        if rng.random() < 0.3:
+            account["reserved_ips"].append({
+                "id": f"{instance_id[:8]}-rip",
+                "region": account["instances"][-1]["region"],
+                "ip_type": "v4",
+                "subnet": f"203.0.113.{i % 250 + 1}",
+                "subnet_size": 32,
+                "label": f"Server {i} IP",
+                "instance_id": instance_id,
+            })
+    return account
+
+
+def encode_cursor(offset: int) -> str:
+    """Encode a list offset as an opaque cursor string."""
+    return base64.urlsafe_b64encode(f"next__{offset}".encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by encode_cursor (0 if invalid)."""
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii").split("__")[1])
+    except (ValueError, IndexError):
+        return 0
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Accept bursts of parallel connections (the default backlog is 5)
+    request_queue_size = 128
+
+
+class MockVultrAPI:
+    """Threaded local HTTP server mimicking the Vultr catalog endpoints"""
+    
+    DEFAULT_PER_PAGE = 100
+    MAX_PER_PAGE = 500
+    # Account list endpoint -> list name in the response
+    ACCOUNT_LISTS = {"instances": "instances", "snapshots": "snapshots",
+                     "backups": "backups", "reserved-ips": "reserved_ips"}
+    
+    def __init__(self, catalog: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                 account: Optional[Dict[str, Any]] = None, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 rate_429: float = 0.0, rate_5xx: float = 0.0,
+                 retry_after: str = "1", seed: int = 0):
+        """
+        Initialize the mock server (call start() to begin serving).
+        
+        Args:
+            catalog: Items per endpoint (default: build_catalog())
+            account: Account served to authorized requests (default: no instances)
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Seconds of artificial delay added to every response
+            rate_429: Probability of answering 429 Too Many Requests
+            rate_5xx: Probability of answering 503 Service Unavailable
+            retry_after: Retry-After header value sent with 429 responses
+            seed: Random seed for fault injection
+        """
+        self.catalog = catalog if catalog is not None else build_catalog()
+        self.account = account if account is not None else build_account(self.catalog)
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset_stats()
+        self._available = self._build_availability(seed)
+        self.server = _Server((host, port), self._handler_class())
+        self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass to VultrResourceRetriever(base_url=...)."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v2"
+    
+    def reset_stats(self):
+        """Reset request counters."""
+        with self._lock:
+            self.stats = {"requests": 0, "bytes_sent": 0, "status": {}}
+    
+    def _record(self, status: int, size: int):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_sent"] += size
+            self.stats["status"][str(status)] = self.stats["status"].get(str(status), 0) + 1
+    
+    def _inject_fault(self) -> Optional[int]:
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.rate_429:
+            return 429
+        if roll < self.rate_429 + self.rate_5xx:
+            return 503
+        return None
+    
+    def _build_availability(self, seed: int) -> Dict[str, List[str]]:
+        """Plans deployable per region: each plan's locations, minus sold-out pairs."""
+        rng = random.Random(seed)
+        available = {region["id"]: [] for region in self.catalog.get("regions", [])}
+        for plan in self.catalog.get("plans", []):
+            for location in plan.get("locations", []):
+                if location in available and rng.random() >= 0.1:
+                    available[location].append(plan["id"])
+        return available
+    
+    def availability(self, region_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Build the availability response of a region.
+        
+        Args:
+            region_id: Region id
+        
+        Returns:
+            Response body, or None if the region is unknown
+        """
+        if region_id not in self._available:
+            return None
+        return {"available_plans": self._available[region_id]}
+    
+    def route(self, path: List[str]) -> Optional[Tuple[Any, bool]]:
+        """
+        Find the response builder for a request path.
+        
+        Args:
+            path: Path segments after /v2 (e.g. ['instances', '<id>', 'bandwidth'])
+        
+        Returns:
+            Tuple of (function(per_page, cursor) -> body, whether an API key
+            is required), or None if the path is unknown
+        """
+        if len(path) == 1 and path[0] in self.catalog:
+            return (lambda per_page, cursor: self.page(path[0], per_page, cursor)), False
+        if len(path) == 1 and path[0] in self.ACCOUNT_LISTS:
+            key = self.ACCOUNT_LISTS[path[0]]
+            return (lambda per_page, cursor: self.page(key, per_page, cursor)), True
+        if len(path) == 3 and path[0] == "regions" and path[2] == "availability":
+            body = self.availability(path[1])
+            return ((lambda per_page, cursor: body), False) if body is not None else None
+        if len(path) == 3 and path[0] == "instances":
+            body = self.instance_detail(path[1], path[2])
+            return ((lambda per_page, cursor: body), True) if body is not None else None
+        return None
+    
+    def instance_detail(self, instance_id: str, detail: str) -> Optional[Dict[str, Any]]:
+        """
+        Build a per-instance response ('backup-schedule' or 'bandwidth').
+        
+        Returns:
+            Response body, or None if the instance or detail is unknown
+        """
+        if detail == "backup-schedule" and instance_id in self.account["backup_schedules"]:
+            return {"backup_schedule": self.account["backup_schedules"][instance_id]}
+        if detail == "bandwidth" and instance_id in self.account["bandwidth"]:
+            return {"bandwidth": self.account["bandwidth"][instance_id]}
+        return None
+    
+    def page(self, key: str, per_page: int, cursor: str) -> Dict[str, Any]:
+        """
+        Build one page of an endpoint response.
+        
+        Args:
+            key: Endpoint/list name ('plans', 'regions' or 'os')
+            per_page: Requested page size
+            cursor: Cursor from a previous page ('' for the first page)
+        
+        Returns:
+            Response body with the items and meta.links
+        """
+        items = self.catalog[key] if key in self.catalog else self.account[key]
+        per_page = max(1, min(per_page, self.MAX_PER_PAGE))
+        offset = decode_cursor(cursor) if cursor else 0
+        end = offset + per_page
+        return {
+            key: items[offset:end],
+            "meta": {
+                "total": len(items),
+                "links": {
+                    "next": encode_cursor(end) if end < len(items) else "",
+                    "prev": encode_cursor(max(0, offset - per_page)) if offset else "",
+                },
+            },
+        }
+    
+    def _handler_class(self):
+        api = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _send(self, status: int, body: bytes = b"", headers: Dict[str, str] = None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+                api._record(status, len(body))
+            
+            def do_GET(self):
+                if api.latency:
+                    time.sleep(api.latency)
+                
+                parsed = urlparse(self.path)
+                parts = parsed.path.strip("/").split("/")
+                route = api.route(parts[1:]) if parts[0] == "v2" else None
+                if route is None:
+                    self._send(404, b'{"error":"Not found","status":404}',
+                               {"Content-Type": "application/json"})
+                    return
+                build, private = route
+                if private and not self.headers.get("Authorization", "").startswith("Bearer "):
+                    self._send(401, b'{"error":"Invalid API token.","status":401}',
+                               {"Content-Type": "application/json"})
+                    return
+                
+                fault = api._inject_fault()
+                if fault == 429:
+                    self._send(429, b'{"error":"Rate limit exceeded","status":429}',
+                               {"Content-Type": "application/json", "Retry-After": api.retry_after})
+                    return
+                if fault:
+                    self._send(fault, b'{"error":"Service unavailable","status":503}',
+                               {"Content-Type": "application/json"})
+                    return
+                
+                query = parse_qs(parsed.query)
+                try:
+                    per_page = int(query.get("per_page", [api.DEFAULT_PER_PAGE])[0])
+                except ValueError:
+                    per_page = api.DEFAULT_PER_PAGE
+                body = json.dumps(build(per_page, query.get("cursor", [""])[0])).encode("utf-8")
+                
+                etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, headers={"ETag": etag})
+                    return
+                
+                headers = {"Content-Type": "application/json", "ETag": etag}
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    headers["Content-Encoding"] = "gzip"
+                self._send(200, body, headers)
+        
+        return Handler
+    
+    def start(self) -> "MockVultrAPI":
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop the server and release the port."""
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    """Main function to run the mock server in the foreground"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Serve a synthetic Vultr catalog (plans, regions, OS) on localhost"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to bind (default: 8080)")
+    parser.add_argument("--plans", type=int, default=100, help="Number of synthetic plans (default: 100)")
+    parser.add_argument("--regions", type=int, default=32, help="Number of synthetic regions (default: 32)")
+    parser.add_argument("--os-count", type=int, default=50, help="Number of synthetic OS images (default: 50)")
+    parser.add_argument("--instances", type=int, default=0, help="Number of synthetic account instances (default: 0)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per response (default: 0)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probability of a 429 response (default: 0)")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Probability of a 503 response (default: 0)")
+    parser.add_argument("--retry-after", default="1", help="Retry-After value sent with 429 (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    
+    args = parser.parse_args()
+    
+    catalog = build_catalog(args.plans, args.regions, args.os_count, args.seed)
+    api = MockVultrAPI(
+        catalog=catalog,
+        account=build_account(catalog, args.instances, args.seed),
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    print(f"Mock Vultr API listening on {api.base_url}")
+    print(f"Use: VULTR_API_BASE_URL={api.base_url} python3 vultr_resource_retriever.py")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping mock server", file=sys.stderr)
+    finally:
+        api.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
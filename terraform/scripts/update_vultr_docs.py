@@ -4,6 +4,9 @@ Update Vultr Documentation Markdown Files from CSV Data
 
 This script reads vultr_*.csv files from the scripts directory and updates
 the corresponding markdown documentation files in the parent directory.
+It can also read a vultr_resources_*.json snapshot (--json), the latest
+snapshot of a catalog database (--db), or fetch the catalog and render it
+in one process without intermediate files (refresh).
 
 Files updated:
 - PLAN_IDS.md (from vultr_plans_*.csv)
@@ -11,40 +14,89 @@ Files updated:
 - OS_IDS.md (from vultr_os_*.csv)
 """
 
+import copy
 import csv
+import hashlib
+import io
+import json
 import os
 import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext, redirect_stdout
 from datetime import datetime
+from functools import partial
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Optional, Set, TextIO, Tuple
 import glob
 
+from markdown_table import Column, MarkdownTable, MarkdownWriter, text_digest
+from vultr_metrics import Metrics
+from vultr_records import OperatingSystem, Plan, Region
+from vultr_snapshot_index import (COMPRESSION_SUFFIXES, RECORD_KINDS, SnapshotIndex,
+                                  iter_resources_records, iter_snapshot_records, open_snapshot)
+
+Catalog = Tuple[List[Plan], List[Region], List[OperatingSystem]]
+# (heading, input hash, render function writing the section's lines)
+Section = Tuple[str, str, Callable[[MarkdownWriter], None]]
+
 
 class VultrDocsUpdater:
     """Updates Vultr documentation markdown files from CSV data"""
     
-    def __init__(self, scripts_dir: str = "./scripts", docs_dir: str = "."):
+    # kind -> (progress label, file name, header method, sections method)
+    DOCUMENTS = {
+        "plans": ("📋 Plans: ", "PLAN_IDS.md", "plans_header", "plans_sections"),
+        "regions": ("🌍 Regions: ", "REGION_CODES.md", "regions_header", "regions_sections"),
+        "os": ("💿 Operating Systems: ", "OS_IDS.md", "os_header", "os_sections"),
+    }
+    MANIFEST_NAME = ".vultr_docs_manifest.json"
+    MANIFEST_VERSION = 2
+    WRITE_BUFFER = 1 << 16
+    
+    def __init__(self, scripts_dir: str = "./scripts", docs_dir: str = ".",
+                 db_path: Optional[str] = None, incremental: bool = True,
+                 workers: int = 3, snapshot: str = "latest",
+                 metrics: Optional[Metrics] = None):
         """
         Initialize the updater.
         
         Args:
             scripts_dir: Directory containing CSV files
             docs_dir: Directory containing markdown files to update
+            db_path: SQLite catalog database to read instead of CSV files
+            incremental: Reuse unchanged sections and skip unchanged files
+                using the section hash manifest in docs_dir
+            workers: Worker processes generating documents in parallel
+                (1 = one after another in this process)
+            snapshot: Snapshot to render from scripts_dir: 'latest',
+                'previous' or a timestamp (e.g. '20251218_131843', '2025-12-18')
+            metrics: Metrics to record stage timings in (default: a new
+                in-memory Metrics)
         """
         self.scripts_dir = Path(scripts_dir)
         self.docs_dir = Path(docs_dir)
-        
+        self.db_path = db_path
+        self.incremental = incremental
+        self.workers = workers
+        self.snapshot = snapshot
+        self.metrics = metrics or Metrics("docs_updater")
+    
     def find_latest_csv(self, pattern: str) -> Path:
         """
-        Find the most recent CSV file matching the pattern.
+        Find the most recent CSV file matching the pattern, including
+        compressed (.gz/.zst) copies.
         
         Args:
             pattern: Glob pattern to match CSV files
-            
+        
         Returns:
             Path to the latest CSV file
         """
-        csv_files = list(self.scripts_dir.glob(pattern))
+        csv_files = [path for suffix in ("",) + tuple(COMPRESSION_SUFFIXES.values())
+                     for path in self.scripts_dir.glob(pattern + suffix)]
         if not csv_files:
             raise FileNotFoundError(f"No CSV files found matching: {pattern}")
         
@@ -53,24 +105,110 @@ class VultrDocsUpdater:
         print(f"✓ Found latest file: {latest.name}")
         return latest
     
-    def read_csv(self, csv_path: Path) -> List[Dict[str, Any]]:
+    def find_snapshot_file(self, kind: str, fmt: str) -> Path:
+        """
+        Find a snapshot output file through the retriever's snapshot
+        manifest (vultr_snapshots.jsonl) in scripts_dir.
+        
+        Without a manifest, the latest file is found by glob and
+        modification time as before. For 'latest', the newest snapshot
+        that has the file is used (a later run may have written other
+        formats only).
+        
+        Args:
+            kind: 'resources', 'plans', 'regions' or 'os'
+            fmt: File format ('json' or 'csv')
+        
+        Returns:
+            Path to the file of the selected snapshot
+        """
+        index = SnapshotIndex(str(self.scripts_dir))
+        if not index.exists():
+            if self.snapshot != "latest":
+                raise FileNotFoundError(
+                    f"Selecting snapshot '{self.snapshot}' needs {index.path} (written by vultr_resource_retriever.py)"
+                )
+            return self.find_latest_csv(f"vultr_{kind}_*.{fmt}")
+        
+        if self.snapshot == "latest":
+            found = index.newest_with(kind, fmt)
+            if found is None:
+                return self.find_latest_csv(f"vultr_{kind}_*.{fmt}")
+            entry, path = found
+            latest = index.latest()
+            if latest is not None and latest.get("timestamp") != entry.get("timestamp"):
+                print(f"⚠ Latest snapshot has no {kind} {fmt} file; "
+                      f"using snapshot {entry.get('snapshot', entry.get('timestamp'))}")
+            print(f"✓ Found latest snapshot file: {Path(path).name}")
+            return Path(path)
+        
+        path = index.find(kind, fmt, self.snapshot)
+        if path is None:
+            raise FileNotFoundError(f"No {kind} {fmt} file recorded for snapshot '{self.snapshot}' in {index.path}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Snapshot file {path} ({self.snapshot}) no longer exists")
+        print(f"✓ Found {self.snapshot} snapshot file: {Path(path).name}")
+        return Path(path)
+    
+    def read_csv(self, csv_path: Path,
+                 parse: Optional[Callable[[Dict[str, Any]], Any]] = None) -> List[Any]:
         """
-        Read CSV file and return list of dictionaries.
+        Read CSV file and return list of dictionaries or records.
         
         Args:
             csv_path: Path to CSV file
-            
+            parse: Optional function turning each row into a record
+                (e.g. Plan.from_api), so values are parsed only once
+        
         Returns:
-            List of dictionaries representing rows
+            List of dictionaries (or records) representing rows
         """
         data = []
-        with open(csv_path, 'r', encoding='utf-8') as f:
+        with open_snapshot(str(csv_path)) as f:
             reader = csv.DictReader(f)
             for row in reader:
-                data.append(row)
+                data.append(parse(row) if parse else row)
         print(f"  Read {len(data)} rows from {csv_path.name}")
         return data
     
+    def read_json(self, json_path: Path) -> Catalog:
+        """
+        Read a vultr_resources_*.json snapshot into records.
+        
+        Numbers and lists keep their JSON types, so nothing has to be
+        re-parsed from strings. The file (possibly compressed) is decoded
+        one record at a time rather than loaded whole.
+        
+        Args:
+            json_path: Path to the snapshot file
+        
+        Returns:
+            Tuple of (plans, regions, os_list)
+        """
+        records = {kind: [] for kind in RECORD_KINDS}
+        for kind, record in iter_resources_records(str(json_path)):
+            records[kind].append(record)
+        plans, regions, os_list = records["plans"], records["regions"], records["os"]
+        print(f"  Read {len(plans)} plans, {len(regions)} regions and "
+              f"{len(os_list)} operating systems from {Path(json_path).name}")
+        return plans, regions, os_list
+    
+    def read_db(self) -> Catalog:
+        """
+        Read the latest snapshot from the catalog database.
+        
+        Returns:
+            Tuple of (plans, regions, os_list)
+        """
+        from vultr_catalog_store import CatalogStore
+        
+        with CatalogStore(self.db_path) as store:
+            snapshot = store.latest_snapshot()
+            if snapshot is None:
+                raise FileNotFoundError(f"No snapshots in database: {self.db_path}")
+            print(f"✓ Using snapshot {snapshot['id']} from {snapshot['taken_at']}")
+            return store.load(snapshot["id"])
+    
     def format_table_row(self, values: List[str], widths: List[int]) -> str:
         """
         Format a markdown table row with proper column widths.
@@ -78,7 +216,7 @@ class VultrDocsUpdater:
         Args:
             values: List of cell values
             widths: List of column widths
-            
+        
         Returns:
             Formatted markdown table row
         """
@@ -90,436 +228,829 @@ class VultrDocsUpdater:
             cells.append(f" {str(value):<{width}} ")
         return "|" + "|".join(cells) + "|"
     
-    def generate_plans_markdown(self, plans_data: List[Dict[str, Any]]) -> str:
+    @staticmethod
+    def _digest(*parts: Any) -> str:
+        """Return a short SHA-256 digest of JSON-serializable parts."""
+        payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+    
+    @staticmethod
+    def _digest_fields(record: Any) -> Dict[str, Any]:
         """
-        Generate markdown content for PLAN_IDS.md.
+        Return a record's fields with extra fields as CSV text, so a
+        snapshot digests the same whether it was read from CSV (extra
+        fields are strings) or from JSON (they keep their types).
+        """
+        data = record.to_dict()
+        for key, value in record.extra.items():
+            data[key] = '' if value is None else str(value)
+        return data
+    
+    def _record_digests(self, records: List[Any]) -> Dict[int, str]:
+        """Digest each record once, keyed by id() so sections can share them."""
+        encode = json.JSONEncoder(sort_keys=True, separators=(',', ':'), default=str).encode
+        sha256 = hashlib.sha256
+        fields = self._digest_fields
+        return {
+            id(record): sha256(encode(fields(record)).encode('utf-8')).hexdigest()[:16]
+            for record in records
+        }
+    
+    def _rows_digest(self, label: str, records: List[Any], digests: Dict[int, str]) -> str:
+        """Digest a section's input rows (in display order)."""
+        return self._digest(label, [digests[id(record)] for record in records])
+    
+    @staticmethod
+    def _field(name: str, record_type: type) -> Callable[[Any], Any]:
+        """
+        Return a getter for a record field as it appears in to_dict(), with
+        'N/A' for fields the record does not have.
+        """
+        if name not in record_type.FIELDS:
+            return lambda record: record.extra.get(name, 'N/A')
+        if name in record_type.LIST_FIELDS:
+            return lambda record: list(getattr(record, name))
+        get = attrgetter(name)
+        return lambda record: 'N/A' if get(record) is None else get(record)
+    
+    def _extra_columns(self, keys: Set[str], skip: Tuple[str, ...], record_type: type,
+                       max_width: int) -> List[Column]:
+        """Build title-cased, truncated columns for the non-key fields of a group."""
+        return [
+            Column(key.replace('_', ' ').title(), self._field(key, record_type), max_width)
+            for key in sorted(k for k in keys if k not in skip)
+        ]
+    
+    def _header(self, title: str, description: str) -> List[str]:
+        """Return the title, Last updated stamp and description lines."""
+        return [
+            f"# {title}",
+            "",
+            f"*Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*",
+            "",
+            description,
+            "",
+        ]
+    
+    def _render(self, header: List[str], sections: List[Section]) -> str:
+        """Render a full document from its header and sections into a string."""
+        buffer = io.StringIO()
+        writer = MarkdownWriter(buffer)
+        writer.lines(header)
+        for _, _, render in sections:
+            render(writer)
+        return buffer.getvalue()
+    
+    def _usage_section(self, writer: MarkdownWriter, plan: str, region: str, os_id: str):
+        """Write the 'Usage in Terraform' section with the given values."""
+        writer.lines([
+            "## Usage in Terraform",
+            "",
+            "```hcl",
+            "resource \"vultr_instance\" \"example\" {",
+            f"  plan    = {plan}",
+            f"  region  = {region}",
+            f"  os_id   = {os_id}",
+            "}",
+            "```",
+            "",
+        ])
+    
+    def plans_sections(self, plans_data: List[Plan]) -> List[Section]:
+        """
+        Split PLAN_IDS.md into sections keyed by heading.
         
         Args:
-            plans_data: List of plan dictionaries
-            
+            plans_data: List of Plan records
+        
         Returns:
-            Markdown content as string
+            List of (heading, input hash, render function) tuples
         """
-        content = []
-        content.append("# Vultr Plan IDs (Resource Codes)")
-        content.append("")
-        content.append(f"*Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*")
-        content.append("")
-        content.append("This document contains all available Vultr plan IDs and their specifications.")
-        content.append("")
-        
         # Sort plans by monthly cost (if available)
-        sorted_plans = sorted(
-            plans_data, 
-            key=lambda x: float(x.get('monthly_cost', 0) or 0)
-        )
+        sorted_plans = sorted(plans_data, key=lambda x: x.monthly_cost or 0)
         
-        # Group by type
+        # Group by type, collecting each group's extra fields in the same pass
         plans_by_type = {}
+        keys_by_type = {}
         for plan in sorted_plans:
-            plan_type = plan.get('type', 'unknown')
+            plan_type = plan.type or 'unknown'
             if plan_type not in plans_by_type:
                 plans_by_type[plan_type] = []
+                keys_by_type[plan_type] = set(Plan.FIELDS)
             plans_by_type[plan_type].append(plan)
+            keys_by_type[plan_type].update(plan.extra)
         
-        # Create summary
-        content.append("## Summary")
-        content.append("")
-        content.append(f"- **Total Plans:** {len(plans_data)}")
-        content.append(f"- **Plan Types:** {len(plans_by_type)}")
-        content.append("")
+        digests = self._record_digests(sorted_plans)
+        counts = {plan_type: len(plans) for plan_type, plans in plans_by_type.items()}
         
-        # Table of contents
-        content.append("## Plan Types")
-        content.append("")
-        for plan_type in sorted(plans_by_type.keys()):
-            count = len(plans_by_type[plan_type])
-            content.append(f"- [{plan_type.upper()}](#{plan_type.lower()}-plans) ({count} plans)")
-        content.append("")
+        def summary(writer):
+            writer.lines([
+                "## Summary",
+                "",
+                f"- **Total Plans:** {len(plans_data)}",
+                f"- **Plan Types:** {len(plans_by_type)}",
+                "",
+            ])
         
-        # All plans table
-        content.append("## All Plans")
-        content.append("")
-        content.append("| ID | Type | vCPUs | RAM (GB) | Disk (GB) | Bandwidth (GB) | Monthly Cost |")
-        content.append("|---|---|---|---|---|---|---|")
+        def table_of_contents(writer):
+            writer.lines(["## Plan Types", ""])
+            for plan_type in sorted(plans_by_type.keys()):
+                count = len(plans_by_type[plan_type])
+                writer.line(f"- [{plan_type.upper()}](#{plan_type.lower()}-plans) ({count} plans)")
+            writer.line()
         
-        for plan in sorted_plans:
-            ram_gb = int(plan.get('ram', 0)) / 1024 if plan.get('ram') else 0
-            content.append(
-                f"| `{plan.get('id', 'N/A')}` "
-                f"| {plan.get('type', 'N/A')} "
-                f"| {plan.get('vcpu_count', 'N/A')} "
-                f"| {ram_gb:.1f} "
-                f"| {plan.get('disk', 'N/A')} "
-                f"| {plan.get('bandwidth', 'N/A')} "
-                f"| ${plan.get('monthly_cost', 'N/A')} |"
-            )
-        content.append("")
+        vcpus, ram, disk, bandwidth, cost = (
+            self._field(name, Plan) for name in ('vcpu_count', 'ram', 'disk', 'bandwidth', 'monthly_cost'))
+        all_plans_table = MarkdownTable([
+            Column("ID", lambda p: f"`{p.id}`"),
+            Column("Type", lambda p: p.type),
+            Column("vCPUs", vcpus),
+            Column("RAM (GB)", lambda p: f"{(p.ram or 0) / 1024:.1f}"),
+            Column("Disk (GB)", disk),
+            Column("Bandwidth (GB)", bandwidth),
+            Column("Monthly Cost", lambda p: f"${cost(p)}"),
+        ])
         
-        # Detailed sections by type
-        for plan_type in sorted(plans_by_type.keys()):
-            content.append(f"## {plan_type.upper()} Plans")
-            content.append("")
-            
-            type_plans = plans_by_type[plan_type]
-            
-            # Get all available keys for this type
-            all_keys = set()
-            for plan in type_plans:
-                all_keys.update(plan.keys())
-            
-            # Define key columns
-            key_columns = ['id', 'vcpu_count', 'ram', 'disk', 'bandwidth', 'monthly_cost']
-            other_columns = sorted([k for k in all_keys if k not in key_columns])
-            
-            # Create detailed table
-            headers = ['ID', 'vCPUs', 'RAM (MB)', 'Disk (GB)', 'Bandwidth (GB)', 'Cost/mo'] + [k.replace('_', ' ').title() for k in other_columns]
-            content.append("| " + " | ".join(headers) + " |")
-            content.append("|" + "|".join(["---"] * len(headers)) + "|")
-            
-            for plan in type_plans:
-                row = [
-                    f"`{plan.get('id', 'N/A')}`",
-                    str(plan.get('vcpu_count', 'N/A')),
-                    str(plan.get('ram', 'N/A')),
-                    str(plan.get('disk', 'N/A')),
-                    str(plan.get('bandwidth', 'N/A')),
-                    f"${plan.get('monthly_cost', 'N/A')}"
-                ]
-                
-                for col in other_columns:
-                    value = plan.get(col, 'N/A')
-                    # Truncate long values
-                    if isinstance(value, str) and len(value) > 30:
-                        value = value[:27] + "..."
-                    row.append(str(value))
-                
-                content.append("| " + " | ".join(row) + " |")
-            
-            content.append("")
+        def all_plans(writer):
+            writer.lines(["## All Plans", ""])
+            all_plans_table.write(writer, sorted_plans)
+            writer.line()
+        
+        # Key columns come first; the rest are the group's other fields
+        key_columns = [
+            Column("ID", lambda p: f"`{p.id}`"),
+            Column("vCPUs", vcpus),
+            Column("RAM (MB)", ram),
+            Column("Disk (GB)", disk),
+            Column("Bandwidth (GB)", bandwidth),
+            Column("Cost/mo", lambda p: f"${cost(p)}"),
+        ]
+        key_names = ('id', 'vcpu_count', 'ram', 'disk', 'bandwidth', 'monthly_cost')
         
-        # Usage section
-        content.append("## Usage in Terraform")
-        content.append("")
-        content.append("```hcl")
-        content.append("resource \"vultr_instance\" \"example\" {")
-        content.append("  plan    = \"vc2-1c-1gb\"  # Choose from the IDs above")
-        content.append("  region  = \"ewr\"")
-        content.append("  os_id   = 387")
-        content.append("}")
-        content.append("```")
-        content.append("")
+        def type_section(writer, plan_type):
+            writer.lines([f"## {plan_type.upper()} Plans", ""])
+            table = MarkdownTable(key_columns + self._extra_columns(keys_by_type[plan_type], key_names, Plan, 30))
+            table.write(writer, plans_by_type[plan_type])
+            writer.line()
         
-        return "\n".join(content)
+        sections = [
+            ("Summary", self._digest(len(plans_data), len(plans_by_type)), summary),
+            ("Plan Types", self._digest(counts), table_of_contents),
+            ("All Plans", self._rows_digest("all", sorted_plans, digests), all_plans),
+        ]
+        for plan_type in sorted(plans_by_type.keys()):
+            sections.append((
+                f"{plan_type.upper()} Plans",
+                self._rows_digest(plan_type, plans_by_type[plan_type], digests),
+                lambda writer, plan_type=plan_type: type_section(writer, plan_type),
+            ))
+        sections.append((
+            "Usage in Terraform",
+            self._digest("usage"),
+            lambda writer: self._usage_section(writer, '"vc2-1c-1gb"  # Choose from the IDs above', '"ewr"', '387'),
+        ))
+        return sections
+    
+    def plans_header(self) -> List[str]:
+        """Return the header lines of PLAN_IDS.md."""
+        return self._header(
+            "Vultr Plan IDs (Resource Codes)",
+            "This document contains all available Vultr plan IDs and their specifications."
+        )
     
-    def generate_regions_markdown(self, regions_data: List[Dict[str, Any]]) -> str:
+    def generate_plans_markdown(self, plans_data: List[Plan]) -> str:
         """
-        Generate markdown content for REGION_CODES.md.
+        Generate markdown content for PLAN_IDS.md.
         
         Args:
-            regions_data: List of region dictionaries
-            
+            plans_data: List of Plan records
+        
         Returns:
             Markdown content as string
         """
-        content = []
-        content.append("# Vultr Region Codes")
-        content.append("")
-        content.append(f"*Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*")
-        content.append("")
-        content.append("This document contains all available Vultr region codes and locations.")
-        content.append("")
+        return self._render(self.plans_header(), self.plans_sections(plans_data))
+    
+    def regions_sections(self, regions_data: List[Region]) -> List[Section]:
+        """
+        Split REGION_CODES.md into sections keyed by heading.
         
+        Args:
+            regions_data: List of Region records
+        
+        Returns:
+            List of (heading, input hash, render function) tuples
+        """
         # Sort by continent, then country, then city
         sorted_regions = sorted(
             regions_data,
-            key=lambda x: (
-                x.get('continent', ''),
-                x.get('country', ''),
-                x.get('city', '')
-            )
+            key=lambda x: (x.continent, x.country, x.city)
         )
         
-        # Group by continent
+        # Group by continent, collecting each group's extra fields in the same pass
         regions_by_continent = {}
+        keys_by_continent = {}
         for region in sorted_regions:
-            continent = region.get('continent', 'Unknown')
+            continent = region.continent or 'Unknown'
             if continent not in regions_by_continent:
                 regions_by_continent[continent] = []
+                keys_by_continent[continent] = set(Region.FIELDS)
             regions_by_continent[continent].append(region)
+            keys_by_continent[continent].update(region.extra)
         
-        # Summary
-        content.append("## Summary")
-        content.append("")
-        content.append(f"- **Total Regions:** {len(regions_data)}")
-        content.append(f"- **Continents:** {len(regions_by_continent)}")
-        content.append("")
+        digests = self._record_digests(sorted_regions)
         
-        # Quick reference table
-        content.append("## Quick Reference")
-        content.append("")
-        content.append("| Region Code | City | Country | Continent |")
-        content.append("|---|---|---|---|")
+        def summary(writer):
+            writer.lines([
+                "## Summary",
+                "",
+                f"- **Total Regions:** {len(regions_data)}",
+                f"- **Continents:** {len(regions_by_continent)}",
+                "",
+            ])
         
-        for region in sorted_regions:
-            content.append(
-                f"| `{region.get('id', 'N/A')}` "
-                f"| {region.get('city', 'N/A')} "
-                f"| {region.get('country', 'N/A')} "
-                f"| {region.get('continent', 'N/A')} |"
-            )
-        content.append("")
+        quick_reference_table = MarkdownTable([
+            Column("Region Code", lambda r: f"`{r.id}`"),
+            Column("City", lambda r: r.city),
+            Column("Country", lambda r: r.country),
+            Column("Continent", lambda r: r.continent),
+        ])
         
-        # Detailed sections by continent
-        for continent in sorted(regions_by_continent.keys()):
-            content.append(f"## {continent}")
-            content.append("")
-            
-            continent_regions = regions_by_continent[continent]
-            
-            # Get all keys
-            all_keys = set()
-            for region in continent_regions:
-                all_keys.update(region.keys())
-            
-            # Define columns
-            key_columns = ['id', 'city', 'country', 'options']
-            other_columns = sorted([k for k in all_keys if k not in key_columns and k != 'continent'])
-            
-            headers = ['Code', 'City', 'Country', 'Features'] + [k.replace('_', ' ').title() for k in other_columns]
-            content.append("| " + " | ".join(headers) + " |")
-            content.append("|" + "|".join(["---"] * len(headers)) + "|")
-            
-            for region in continent_regions:
-                # Format options/features
-                options = region.get('options', '')
-                if isinstance(options, str) and options.startswith('['):
-                    # Parse list-like string
-                    options = options.strip('[]').replace("'", "").replace('"', '')
-                
-                row = [
-                    f"`{region.get('id', 'N/A')}`",
-                    region.get('city', 'N/A'),
-                    region.get('country', 'N/A'),
-                    options if options else 'N/A'
-                ]
-                
-                for col in other_columns:
-                    value = region.get(col, 'N/A')
-                    if isinstance(value, str) and len(value) > 40:
-                        value = value[:37] + "..."
-                    row.append(str(value))
-                
-                content.append("| " + " | ".join(row) + " |")
-            
-            content.append("")
+        def quick_reference(writer):
+            writer.lines(["## Quick Reference", ""])
+            quick_reference_table.write(writer, sorted_regions)
+            writer.line()
         
-        # Usage section
-        content.append("## Usage in Terraform")
-        content.append("")
-        content.append("```hcl")
-        content.append("resource \"vultr_instance\" \"example\" {")
-        content.append("  plan    = \"vc2-1c-1gb\"")
-        content.append("  region  = \"ewr\"  # Choose from the codes above")
-        content.append("  os_id   = 387")
-        content.append("}")
-        content.append("```")
-        content.append("")
+        key_columns = [
+            Column("Code", lambda r: f"`{r.id}`"),
+            Column("City", lambda r: r.city),
+            Column("Country", lambda r: r.country),
+            Column("Features", lambda r: ", ".join(r.options) or 'N/A'),
+        ]
+        key_names = ('id', 'city', 'country', 'options', 'continent')
         
-        return "\n".join(content)
+        def continent_section(writer, continent):
+            writer.lines([f"## {continent}", ""])
+            table = MarkdownTable(key_columns + self._extra_columns(keys_by_continent[continent], key_names, Region, 40))
+            table.write(writer, regions_by_continent[continent])
+            writer.line()
+        
+        sections = [
+            ("Summary", self._digest(len(regions_data), len(regions_by_continent)), summary),
+            ("Quick Reference", self._rows_digest("all", sorted_regions, digests), quick_reference),
+        ]
+        for continent in sorted(regions_by_continent.keys()):
+            sections.append((
+                continent,
+                self._rows_digest(continent, regions_by_continent[continent], digests),
+                lambda writer, continent=continent: continent_section(writer, continent),
+            ))
+        sections.append((
+            "Usage in Terraform",
+            self._digest("usage"),
+            lambda writer: self._usage_section(writer, '"vc2-1c-1gb"', '"ewr"  # Choose from the codes above', '387'),
+        ))
+        return sections
+    
+    def regions_header(self) -> List[str]:
+        """Return the header lines of REGION_CODES.md."""
+        return self._header(
+            "Vultr Region Codes",
+            "This document contains all available Vultr region codes and locations."
+        )
     
-    def generate_os_markdown(self, os_data: List[Dict[str, Any]]) -> str:
+    def generate_regions_markdown(self, regions_data: List[Region]) -> str:
         """
-        Generate markdown content for OS_IDS.md.
+        Generate markdown content for REGION_CODES.md.
         
         Args:
-            os_data: List of OS dictionaries
-            
+            regions_data: List of Region records
+        
         Returns:
             Markdown content as string
         """
-        content = []
-        content.append("# Vultr Operating System IDs")
-        content.append("")
-        content.append(f"*Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*")
-        content.append("")
-        content.append("This document contains all available Vultr operating system IDs.")
-        content.append("")
+        return self._render(self.regions_header(), self.regions_sections(regions_data))
+    
+    def os_sections(self, os_data: List[OperatingSystem]) -> List[Section]:
+        """
+        Split OS_IDS.md into sections keyed by heading.
         
+        Args:
+            os_data: List of OperatingSystem records
+        
+        Returns:
+            List of (heading, input hash, render function) tuples
+        """
         # Sort by family, then name
-        sorted_os = sorted(
-            os_data,
-            key=lambda x: (
-                x.get('family', ''),
-                x.get('name', '')
-            )
-        )
+        sorted_os = sorted(os_data, key=lambda x: (x.family, x.name))
         
         # Group by family
         os_by_family = {}
-        for os in sorted_os:
-            family = os.get('family', 'other')
+        for os_item in sorted_os:
+            family = os_item.family or 'other'
             if family not in os_by_family:
                 os_by_family[family] = []
-            os_by_family[family].append(os)
-        
-        # Summary
-        content.append("## Summary")
-        content.append("")
-        content.append(f"- **Total Operating Systems:** {len(os_data)}")
-        content.append(f"- **OS Families:** {len(os_by_family)}")
-        content.append("")
-        
-        # Table of contents
-        content.append("## OS Families")
-        content.append("")
-        for family in sorted(os_by_family.keys()):
-            count = len(os_by_family[family])
-            content.append(f"- [{family.title()}](#{family.lower()}) ({count} versions)")
-        content.append("")
-        
-        # Quick reference table
-        content.append("## Quick Reference")
-        content.append("")
-        content.append("| OS ID | Name | Family | Architecture |")
-        content.append("|---|---|---|---|")
-        
-        for os in sorted_os:
-            content.append(
-                f"| `{os.get('id', 'N/A')}` "
-                f"| {os.get('name', 'N/A')} "
-                f"| {os.get('family', 'N/A')} "
-                f"| {os.get('arch', 'N/A')} |"
-            )
-        content.append("")
+            os_by_family[family].append(os_item)
+        
+        digests = self._record_digests(sorted_os)
+        counts = {family: len(items) for family, items in os_by_family.items()}
+        
+        def summary(writer):
+            writer.lines([
+                "## Summary",
+                "",
+                f"- **Total Operating Systems:** {len(os_data)}",
+                f"- **OS Families:** {len(os_by_family)}",
+                "",
+            ])
+        
+        def table_of_contents(writer):
+            writer.lines(["## OS Families", ""])
+            for family in sorted(os_by_family.keys()):
+                count = len(os_by_family[family])
+                writer.line(f"- [{family.title()}](#{family.lower()}) ({count} versions)")
+            writer.line()
+        
+        quick_reference_table = MarkdownTable([
+            Column("OS ID", lambda o: f"`{o.id}`"),
+            Column("Name", lambda o: o.name),
+            Column("Family", lambda o: o.family),
+            Column("Architecture", lambda o: o.arch),
+        ])
+        family_table = MarkdownTable([
+            Column("OS ID", lambda o: f"`{o.id}`"),
+            Column("Name", lambda o: o.name),
+            Column("Architecture", lambda o: o.arch),
+        ])
+        
+        def quick_reference(writer):
+            writer.lines(["## Quick Reference", ""])
+            quick_reference_table.write(writer, sorted_os)
+            writer.line()
+        
+        def family_section(writer, family):
+            writer.lines([f"## {family.title()}", ""])
+            family_table.write(writer, os_by_family[family])
+            writer.line()
+        
+        def popular_choices(writer):
+            writer.lines([
+                "## Popular Choices",
+                "",
+                "Here are some commonly used operating systems:",
+                "",
+                "| OS | ID | Use Case |",
+                "|---|---|---|",
+                "| Ubuntu 22.04 LTS | `387` | General purpose, LTS support |",
+                "| Ubuntu 24.04 LTS | `2284` | Latest LTS, modern features |",
+                "| Debian 12 | `2136` | Stable, enterprise-ready |",
+                "| CentOS Stream 9 | `542` | RHEL-compatible |",
+                "| Rocky Linux 9 | `1869` | CentOS replacement |",
+                "",
+            ])
         
-        # Detailed sections by family
+        sections = [
+            ("Summary", self._digest(len(os_data), len(os_by_family)), summary),
+            ("OS Families", self._digest(counts), table_of_contents),
+            ("Quick Reference", self._rows_digest("all", sorted_os, digests), quick_reference),
+        ]
         for family in sorted(os_by_family.keys()):
-            content.append(f"## {family.title()}")
-            content.append("")
-            
-            family_os = os_by_family[family]
-            
-            content.append("| OS ID | Name | Architecture |")
-            content.append("|---|---|---|")
-            
-            for os in family_os:
-                content.append(
-                    f"| `{os.get('id', 'N/A')}` "
-                    f"| {os.get('name', 'N/A')} "
-                    f"| {os.get('arch', 'N/A')} |"
-                )
-            
-            content.append("")
-        
-        # Usage section
-        content.append("## Usage in Terraform")
-        content.append("")
-        content.append("```hcl")
-        content.append("resource \"vultr_instance\" \"example\" {")
-        content.append("  plan    = \"vc2-1c-1gb\"")
-        content.append("  region  = \"ewr\"")
-        content.append("  os_id   = 387  # Choose from the IDs above")
-        content.append("}")
-        content.append("```")
-        content.append("")
-        content.append("## Popular Choices")
-        content.append("")
-        content.append("Here are some commonly used operating systems:")
-        content.append("")
-        content.append("| OS | ID | Use Case |")
-        content.append("|---|---|---|")
-        content.append("| Ubuntu 22.04 LTS | `387` | General purpose, LTS support |")
-        content.append("| Ubuntu 24.04 LTS | `2284` | Latest LTS, modern features |")
-        content.append("| Debian 12 | `2136` | Stable, enterprise-ready |")
-        content.append("| CentOS Stream 9 | `542` | RHEL-compatible |")
-        content.append("| Rocky Linux 9 | `1869` | CentOS replacement |")
-        content.append("")
-        
-        return "\n".join(content)
+            sections.append((
+                family.title(),
+                self._rows_digest(family, os_by_family[family], digests),
+                lambda writer, family=family: family_section(writer, family),
+            ))
+        sections.append((
+            "Usage in Terraform",
+            self._digest("usage"),
+            lambda writer: self._usage_section(writer, '"vc2-1c-1gb"', '"ewr"', '387  # Choose from the IDs above'),
+        ))
+        sections.append(("Popular Choices", self._digest("popular"), popular_choices))
+        return sections
+    
+    def os_header(self) -> List[str]:
+        """Return the header lines of OS_IDS.md."""
+        return self._header(
+            "Vultr Operating System IDs",
+            "This document contains all available Vultr operating system IDs."
+        )
+    
+    def generate_os_markdown(self, os_data: List[OperatingSystem]) -> str:
+        """
+        Generate markdown content for OS_IDS.md.
+        
+        Args:
+            os_data: List of OperatingSystem records
+        
+        Returns:
+            Markdown content as string
+        """
+        return self._render(self.os_header(), self.os_sections(os_data))
+    
+    @contextmanager
+    def _atomic_open(self, filepath: Path) -> Iterator[TextIO]:
+        """
+        Open a temp file next to filepath and rename it over filepath when
+        the block succeeds, so readers never see a half-written file.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp")
+        try:
+            try:
+                mode = filepath.stat().st_mode & 0o777
+            except OSError:
+                mode = 0o644
+            os.chmod(tmp_path, mode)
+            with os.fdopen(fd, 'w', encoding='utf-8', buffering=self.WRITE_BUFFER) as f:
+                yield f
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
     
     def update_file(self, content: str, filepath: Path):
         """
-        Write content to file.
+        Atomically write content to file.
         
         Args:
             content: Markdown content to write
             filepath: Path to the output file
         """
-        with open(filepath, 'w', encoding='utf-8') as f:
+        with self._atomic_open(filepath) as f:
             f.write(content)
         print(f"✓ Updated: {filepath}")
     
-    def run(self, keep_csv: bool = False):
+    def _load_manifest(self) -> Dict[str, Any]:
+        """Load the section hash manifest (empty if missing or stale)."""
+        try:
+            with open(self.docs_dir / self.MANIFEST_NAME, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("version") != self.MANIFEST_VERSION:
+            return {}
+        return manifest.get("documents", {})
+    
+    def _save_manifest(self, documents: Dict[str, Any]):
+        """Atomically write the section hash manifest."""
+        with self._atomic_open(self.docs_dir / self.MANIFEST_NAME) as f:
+            json.dump({"version": self.MANIFEST_VERSION, "documents": documents}, f, indent=2)
+            f.write("\n")
+    
+    @staticmethod
+    def _split_sections(text: str) -> Dict[str, List[str]]:
+        """Split an existing document into its '## ' sections by heading."""
+        sections = {}
+        current = None
+        for line in text.split("\n"):
+            if line.startswith("## "):
+                current = line[3:]
+                sections[current] = []
+            if current is not None:
+                sections[current].append(line)
+        return sections
+    
+    def update_document(self, filepath: Path, header: List[str], sections: List[Section],
+                        manifest: Dict[str, Any], label: str = "") -> bool:
         """
-        Run the documentation update process
+        Re-render only the sections whose input hash changed and write the
+        document only if its content changed.
+        
+        Unchanged sections are copied from the existing file, provided the
+        text there still matches the hash recorded in the manifest.
         
         Args:
-            keep_csv: If True, keep CSV files after processing. If False, delete them.
+            filepath: Path to the output file
+            header: Title, Last updated stamp and description lines
+            sections: Output of plans_sections/regions_sections/os_sections
+            manifest: Section manifest, updated in place for this document
+            label: Prefix for the progress message
+        
+        Returns:
+            True if the file was written
         """
+        previous = manifest.get(filepath.name, {}) if self.incremental else {}
+        old_sections = {}
+        if previous and filepath.exists():
+            old_sections = self._split_sections(filepath.read_text(encoding='utf-8'))
+        
+        # Decide which sections can be copied before opening the file
+        reusable = {}
+        for heading, input_hash, _ in sections:
+            old = previous.get(heading)
+            old_text = old_sections.get(heading)
+            if (old and old["input"] == input_hash and old_text is not None
+                    and text_digest(old_text) == old["output"]):
+                reusable[heading] = old_text
+        
+        if len(reusable) == len(sections) and [heading for heading, _, _ in sections] == list(previous):
+            print(f"{label}✓ Unchanged: {filepath} (skipped write)")
+            return False
+        
+        entries = {}
+        with self._atomic_open(filepath) as f:
+            writer = MarkdownWriter(f)
+            writer.lines(header)
+            for heading, input_hash, render in sections:
+                writer.begin_section()
+                if heading in reusable:
+                    writer.lines(reusable[heading])
+                else:
+                    render(writer)
+                entries[heading] = {"input": input_hash, "output": writer.end_section()}
+        manifest[filepath.name] = entries
+        
+        print(f"{label}✓ Updated: {filepath} "
+              f"(rendered {len(sections) - len(reusable)} of {len(sections)} sections)")
+        return True
+    
+    def load_csv(self, kind: str,
+                 parse: Callable[[Dict[str, Any]], Any]) -> Tuple[List[Any], Optional[Path]]:
+        """
+        Find and read the CSV file of the selected snapshot.
+        
+        If the latest snapshot's CSV file was already deleted (e.g. by an
+        earlier run, when the retriever found the catalog unchanged and
+        reused the snapshot), the kind is read from the snapshot's JSON file
+        instead of an older CSV.
+        
+        Returns:
+            Tuple of (records, path of the CSV file, or None if the records
+            came from the JSON file, which is never cleaned up)
+        """
+        index = SnapshotIndex(str(self.scripts_dir))
+        entry = index.latest() if self.snapshot == "latest" and index.exists() else None
+        if entry is not None:
+            csv_output = index.output(entry, kind, "csv")
+            json_output = index.output(entry, "resources", "json")
+            if ((csv_output is None or not os.path.exists(csv_output["path"]))
+                    and json_output is not None and os.path.exists(json_output["path"])):
+                path = Path(json_output["path"])
+                print(f"✓ Reading {kind} from latest snapshot file: {path.name}")
+                records = list(iter_snapshot_records(str(path), kind))
+                print(f"  Read {len(records)} {kind} from {path.name}")
+                return records, None
+        csv_file = self.find_snapshot_file(kind, "csv")
+        return self.read_csv(csv_file, parse), csv_file
+    
+    def _generate(self, sources: Dict[str, Any]) -> Tuple[List[Path], List[Path]]:
+        """
+        Run the plans, regions and OS pipelines (load, render, write),
+        in worker processes when workers > 1.
+        
+        Every pipeline runs to completion even if another one fails; the
+        first error is raised afterwards. Each file is replaced atomically,
+        and the section manifest is saved with the entries of the documents
+        that succeeded, if any of them changed.
+        
+        Args:
+            sources: For 'plans', 'regions' and 'os', either the records or
+                a picklable function returning (records, source path)
+        
+        Returns:
+            Tuple of (paths of the files written, source paths that were read)
+        """
+        manifest = self._load_manifest()
+        # Pipelines run in this process update the entries in place
+        loaded = copy.deepcopy(manifest)
+        jobs = [
+            (kind, sources[kind], {filename: manifest.get(filename)} if filename in manifest else {})
+            for kind, (_, filename, _, _) in self.DOCUMENTS.items()
+        ]
+        
+        results = []
+        errors = []
+        try:
+            if self.workers <= 1:
+                for kind, source, entry in jobs:
+                    try:
+                        results.append(_run_pipeline(self, kind, source, entry))
+                    except PipelineError as e:
+                        print(e.output, end="")
+                        errors.append(e.error)
+                    else:
+                        print(results[-1][3], end="")
+            else:
+                # Flush first so forked workers don't inherit (and repeat) buffered output
+                sys.stdout.flush()
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as executor:
+                    futures = [executor.submit(_run_pipeline, self, *job) for job in jobs]
+                    for future in futures:
+                        try:
+                            results.append(future.result())
+                        except PipelineError as e:
+                            print(e.output, end="")
+                            errors.append(e.error)
+                        else:
+                            print(results[-1][3], end="")
+            for _, entry, _, _, timings in results:
+                manifest.update(entry)
+                for stage, seconds in timings.items():
+                    self.metrics.record_stage(stage, seconds)
+        finally:
+            # Only write when an entry changed, so unchanged runs leave the
+            # (committed) manifest file alone
+            if manifest != loaded:
+                self._save_manifest(manifest)
+        print()
+        if errors:
+            raise errors[0]
+        
+        updated = [path for path, _, _, _, _ in results if path is not None]
         print("=" * 60)
-        print("Vultr Documentation Updater")
+        if updated:
+            print("✅ All documentation files updated successfully!")
+        else:
+            print("✅ Documentation already up to date, nothing written")
         print("=" * 60)
         print()
+        if updated:
+            print("Updated files:")
+            for path in updated:
+                print(f"  - {path}")
+            print()
+        return updated, [source for _, _, source, _, _ in results if source is not None]
+    
+    def update_docs(self, plans_data: List[Plan], regions_data: List[Region],
+                    os_data: List[OperatingSystem]) -> List[Path]:
+        """
+        Render and write the three documentation files from records.
+        
+        Only sections whose input rows changed are re-rendered, and files
+        whose content is unchanged are not rewritten (so their Last updated
+        stamp stays put).
         
+        Args:
+            plans_data: List of Plan records
+            regions_data: List of Region records
+            os_data: List of OperatingSystem records
+        
+        Returns:
+            Paths of the files that were written
+        """
+        updated, _ = self._generate({"plans": plans_data, "regions": regions_data, "os": os_data})
+        return updated
+    
+    def _print_banner(self):
+        print("=" * 60)
+        print("Vultr Documentation Updater")
+        print("=" * 60)
+        print()
+    
+    def _handle_errors(self, step: Callable[[], Any]):
+        """Run a step, exiting with a message on error."""
         try:
-            # Update PLAN_IDS.md
-            print("📋 Processing Plans...")
-            plans_csv = self.find_latest_csv("vultr_plans_*.csv")
-            plans_data = self.read_csv(plans_csv)
-            plans_md = self.generate_plans_markdown(plans_data)
-            self.update_file(plans_md, self.docs_dir / "PLAN_IDS.md")
-            print()
-            
-            # Update REGION_CODES.md
-            print("🌍 Processing Regions...")
-            regions_csv = self.find_latest_csv("vultr_regions_*.csv")
-            regions_data = self.read_csv(regions_csv)
-            regions_md = self.generate_regions_markdown(regions_data)
-            self.update_file(regions_md, self.docs_dir / "REGION_CODES.md")
-            print()
-            
-            # Update OS_IDS.md
-            print("💿 Processing Operating Systems...")
-            os_csv = self.find_latest_csv("vultr_os_*.csv")
-            os_data = self.read_csv(os_csv)
-            os_md = self.generate_os_markdown(os_data)
-            self.update_file(os_md, self.docs_dir / "OS_IDS.md")
+            return step()
+        except FileNotFoundError as e:
+            print(f"❌ Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        except Exception as e:
+            print(f"❌ Unexpected error: {e}", file=sys.stderr)
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+    
+    def refresh(self, retriever, concurrency: int = 1) -> List[Path]:
+        """
+        Fetch the catalog and render the documentation in one process,
+        without writing any intermediate JSON or CSV files.
+        
+        Args:
+            retriever: VultrResourceRetriever instance
+            concurrency: Number of endpoints to fetch in parallel
+        
+        Returns:
+            Paths of the updated files
+        """
+        self._print_banner()
+        
+        def step():
+            print("🔄 Fetching catalog from the Vultr API...")
+            failures_before = retriever.failed_requests
+            with self.metrics.stage("fetch"):
+                plans, regions, os_list = retriever.fetch_all(concurrency=concurrency)
             print()
+            # A partial catalog would overwrite good documents with short tables
+            failed = retriever.failed_requests - failures_before
+            empty = [name for name, items in (("plans", plans), ("regions", regions), ("os", os_list))
+                     if not items]
+            if failed or empty:
+                problems = ([f"{failed} request(s) failed"] if failed else []) + \
+                    [f"no {name} retrieved" for name in empty]
+                print(f"❌ Error: {'; '.join(problems)}; documentation left unchanged", file=sys.stderr)
+                sys.exit(1)
+            with self.metrics.stage("generate"):
+                return self.update_docs(plans, regions, os_list)
+        
+        return self._handle_errors(step)
+    
+    def run(self, keep_csv: bool = False, json_path: Optional[str] = None):
+        """
+        Run the documentation update process
+        
+        Args:
+            keep_csv: If True, keep CSV files after processing. If False, delete them.
+            json_path: Read this vultr_resources_*.json snapshot instead of CSV
+                files ('latest' picks the one selected by snapshot)
+        """
+        self._print_banner()
+        
+        def step():
+            if self.db_path or json_path:
+                with self.metrics.stage("read"):
+                    if self.db_path:
+                        plans, regions, os_list = self.read_db()
+                    else:
+                        path = (self.find_snapshot_file("resources", "json")
+                                if json_path == "latest" else Path(json_path))
+                        plans, regions, os_list = self.read_json(path)
+                print()
+                with self.metrics.stage("generate"):
+                    self.update_docs(plans, regions, os_list)
+                return
             
-            print("=" * 60)
-            print("✅ All documentation files updated successfully!")
-            print("=" * 60)
-            print()
-            print("Updated files:")
-            print(f"  - {self.docs_dir / 'PLAN_IDS.md'}")
-            print(f"  - {self.docs_dir / 'REGION_CODES.md'}")
-            print(f"  - {self.docs_dir / 'OS_IDS.md'}")
-            print()
+            # Each pipeline finds and reads its own CSV file
+            with self.metrics.stage("generate"):
+                _, csv_files = self._generate({
+                    "plans": partial(self.load_csv, "plans", Plan.from_api),
+                    "regions": partial(self.load_csv, "regions", Region.from_api),
+                    "os": partial(self.load_csv, "os", OperatingSystem.from_api),
+                })
             
-            # Clean up CSV files unless --keep-csv is specified
+            # Clean up CSV files (only reached if all three documents succeeded)
             if not keep_csv:
                 print("🗑️  Cleaning up CSV files...")
-                csv_files = [plans_csv, regions_csv, os_csv]
-                for csv_file in csv_files:
-                    try:
-                        csv_file.unlink()
-                        print(f"  ✓ Deleted: {csv_file.name}")
-                    except Exception as e:
-                        print(f"  ⚠ Could not delete {csv_file.name}: {e}")
+                with self.metrics.stage("cleanup"):
+                    for csv_file in csv_files:
+                        try:
+                            csv_file.unlink()
+                            print(f"  ✓ Deleted: {csv_file.name}")
+                        except Exception as e:
+                            print(f"  ⚠ Could not delete {csv_file.name}: {e}")
                 print()
             else:
                 print("📁 Keeping CSV files as requested")
                 print()
+        
+        self._handle_errors(step)
+
+
+class PipelineError(Exception):
+    """A document pipeline failed; carries its captured output and the cause"""
+    
+    def __init__(self, error: Exception, output: str):
+        super().__init__(str(error))
+        self.error = error
+        self.output = output
+    
+    def __reduce__(self):
+        return (PipelineError, (self.error, self.output))
+
+
+def _run_pipeline(updater: VultrDocsUpdater, kind: str, source: Any,
+                  manifest: Dict[str, Any]) -> Tuple[Optional[Path], Dict[str, Any], Optional[Path], str,
+                                                     Dict[str, float]]:
+    """
+    Load, render and write one document. Module-level so it can run in a
+    worker process; progress output is captured and returned so the caller
+    can print it in document order.
+    
+    Args:
+        updater: Updater whose settings to use
+        kind: 'plans', 'regions' or 'os'
+        source: Records, or a function returning (records, source path)
+        manifest: Manifest entry of this document (may be empty)
+    
+    Returns:
+        Tuple of (path if written, updated manifest entry, source path, output,
+        seconds per stage: '<kind>.load', '<kind>.group' and '<kind>.render')
+    """
+    label, filename, header, sections = updater.DOCUMENTS[kind]
+    output = io.StringIO()
+    timings = {}
+    try:
+        with redirect_stdout(output):
+            start = time.perf_counter()
+            records, source_path = source() if callable(source) else (source, None)
+            timings[f"{kind}.load"] = time.perf_counter() - start
             
-        except FileNotFoundError as e:
-            print(f"❌ Error: {e}", file=sys.stderr)
-            sys.exit(1)
-        except Exception as e:
-            print(f"❌ Unexpected error: {e}", file=sys.stderr)
-            import traceback
-            traceback.print_exc()
-            sys.exit(1)
+            # Grouping, sorting and section hashing happen up front; rendering
+            # and writing happen together while the file is streamed out
+            start = time.perf_counter()
+            document_sections = getattr(updater, sections)(records)
+            timings[f"{kind}.group"] = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            filepath = updater.docs_dir / filename
+            written = updater.update_document(
+                filepath, getattr(updater, header)(), document_sections, manifest, label
+            )
+            timings[f"{kind}.render"] = time.perf_counter() - start
+    except Exception as e:
+        raise PipelineError(e, output.getvalue())
+    return ((filepath if written else None), {filename: manifest.get(filename, {})}, source_path,
+            output.getvalue(), timings)
 
 
 def main():
@@ -529,6 +1060,14 @@ def main():
     parser = argparse.ArgumentParser(
         description="Update Vultr documentation markdown files from CSV data"
     )
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["update", "refresh"],
+        default="update",
+        help="update: render from saved files (default); "
+             "refresh: fetch from the API and render without intermediate files"
+    )
     parser.add_argument(
         "--scripts-dir",
         default="./scripts",
@@ -544,14 +1083,116 @@ def main():
         action="store_true",
         help="Keep CSV files after generating documentation (default: delete them)"
     )
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="Read the latest snapshot from this SQLite catalog database instead of CSV files"
+    )
+    parser.add_argument(
+        "--snapshot",
+        default="latest",
+        help="Snapshot to render from --scripts-dir: latest, previous or a timestamp "
+             "(e.g. 20251218_131843 or 2025-12-18; default: latest)"
+    )
+    parser.add_argument(
+        "--json",
+        nargs="?",
+        const="latest",
+        default=None,
+        help="Read a vultr_resources_*.json snapshot instead of CSV files "
+             "(without a path: the one selected by --snapshot)"
+    )
+    parser.add_argument(
+        "--api-key",
+        default=None,
+        help="Vultr API key for refresh (optional, can also use VULTR_API_KEY env var)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="HTTP response cache directory for refresh (default: disabled)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=3,
+        help="Endpoints fetched in parallel by refresh (default: 3)"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-render every section and rewrite all files, ignoring the section manifest"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=3,
+        help="Worker processes generating documents in parallel (default: 3, 1 = sequential)"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        default=None,
+        help="Profile the run (cProfile, flame graph stack samples, allocations, stage times) into DIR; "
+             "use --workers 1 to include document generation"
+    )
+    parser.add_argument(
+        "--metrics-log",
+        default=None,
+        help="Append JSON-lines events (stage timings, and API requests for refresh) to this file"
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        default=None,
+        help="Write Prometheus metrics to this file when done (for node_exporter's textfile collector, *.prom)"
+    )
     
     args = parser.parse_args()
+    args.api_key = args.api_key or os.environ.get("VULTR_API_KEY")
+    try:
+        metrics = Metrics("docs_updater", args.metrics_log)
+    except OSError as e:
+        parser.error(f"--metrics-log: {e}")
     
     updater = VultrDocsUpdater(
         scripts_dir=args.scripts_dir,
-        docs_dir=args.docs_dir
+        docs_dir=args.docs_dir,
+        db_path=args.db,
+        incremental=not args.full,
+        workers=args.workers,
+        snapshot=args.snapshot,
+        metrics=metrics
     )
-    updater.run(keep_csv=args.keep_csv)
+    if args.profile:
+        from vultr_profiler import Profiler
+        
+        notes = []
+        if args.workers > 1:
+            notes.append(f"documents were generated in {args.workers} worker processes, which only report "
+                         "stage times; rerun with --workers 1 to profile them")
+            print(f"Note: --profile does not see the {args.workers} worker processes; "
+                  "use --workers 1 to profile document generation", file=sys.stderr)
+        profiler = Profiler(args.profile, metrics, notes)
+    else:
+        profiler = nullcontext()
+    
+    success = False
+    try:
+        with profiler:
+            if args.command == "refresh":
+                from vultr_resource_retriever import VultrResourceRetriever
+                
+                with VultrResourceRetriever(api_key=args.api_key, cache_dir=args.cache_dir,
+                                            metrics=metrics) as retriever:
+                    updater.refresh(retriever, concurrency=args.concurrency)
+            else:
+                updater.run(keep_csv=args.keep_csv, json_path=args.json)
+        success = True
+    except SystemExit as e:
+        success = not e.code
+        raise
+    finally:
+        metrics.finish(success, args.metrics_textfile)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,245 @@
+"""
+Vultr Account Inventory
+Collects the state of a Vultr account with a VultrResourceRetriever:
+instances with their backup schedules and bandwidth usage, snapshots,
+backups and reserved IPs, as one normalized snapshot.
+
+The list endpoints are paged through in parallel, then the per-instance
+backup-schedule and bandwidth requests are fanned out over a bounded
+thread pool that shares the retriever's session, rate limiter and retry
+budget. Cached responses are always revalidated, since account state has
+to be current.
+
+check_drift compares a snapshot with the vultr_instance resources of a
+terraform state (terraform.tfstate or `terraform show -json` output).
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Snapshot list name -> API endpoint (the response list has the same name)
+ACCOUNT_LISTS = {
+    "instances": "instances",
+    "snapshots": "snapshots",
+    "backups": "backups",
+    "reserved_ips": "reserved-ips",
+}
+# Per-instance field -> endpoint under instances/{id}/
+INSTANCE_DETAILS = {
+    "backup_schedule": "backup-schedule",
+    "bandwidth": "bandwidth",
+}
+# vultr_instance attributes compared with the live instance field of the same name
+STATE_FIELDS = ("plan", "region", "os_id", "label", "hostname", "tags", "backups")
+SCHEDULE_FIELDS = ("type", "hour", "dow", "dom")
+
+
+def _normalize(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Return an item with 'id' as first key."""
+    normalized = {"id": item.get("id")}
+    normalized.update((key, value) for key, value in item.items() if key != "id")
+    return normalized
+
+
+def summarize_bandwidth(days: Optional[Dict[str, Dict[str, int]]]) -> Optional[Dict[str, Any]]:
+    """
+    Total the daily usage returned by instances/{id}/bandwidth.
+    
+    Args:
+        days: Date -> {'incoming_bytes', 'outgoing_bytes'}, or None
+    
+    Returns:
+        Dictionary with the covered dates and byte totals, or None
+    """
+    if days is None:
+        return None
+    dates = sorted(days)
+    return {
+        "from": dates[0] if dates else None,
+        "to": dates[-1] if dates else None,
+        "days": len(dates),
+        "incoming_bytes": sum(day.get("incoming_bytes", 0) for day in days.values()),
+        "outgoing_bytes": sum(day.get("outgoing_bytes", 0) for day in days.values()),
+    }
+
+
+class AccountInventory:
+    """Collects account state through a VultrResourceRetriever"""
+    
+    def __init__(self, retriever, concurrency: Optional[int] = None):
+        """
+        Initialize the collector.
+        
+        Args:
+            retriever: VultrResourceRetriever created with an API key
+            concurrency: Maximum requests in flight (default: the
+                retriever's connection pool size)
+        
+        Raises:
+            ValueError: If the retriever has no API key
+        """
+        if not retriever.api_key:
+            raise ValueError("The account inventory requires an API key")
+        self.retriever = retriever
+        self.concurrency = max(1, concurrency or retriever.pool_size)
+    
+    def _list(self, name: str) -> List[Dict[str, Any]]:
+        """Fetch every page of an account list endpoint."""
+        return list(self.retriever._paginate(ACCOUNT_LISTS[name], name, revalidate=True))
+    
+    def _detail(self, instance_id: str, name: str) -> Optional[Any]:
+        """Fetch one per-instance detail, or None if the request failed."""
+        data = self.retriever._make_request(f"instances/{instance_id}/{INSTANCE_DETAILS[name]}",
+                                            revalidate=True)
+        return data.get(name)
+    
+    def collect(self) -> Dict[str, Any]:
+        """
+        Collect the account inventory.
+        
+        Returns:
+            Snapshot with 'instances', 'snapshots', 'backups' and
+            'reserved_ips' lists sorted by id, a 'summary' of counts, and
+            'complete'/'errors' describing failed requests
+        """
+        failures_before = self.retriever.failed_requests
+        errors = []
+        print("Fetching account inventory...")
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            lists = {name: executor.submit(self._list, name) for name in ACCOUNT_LISTS}
+            instances = lists["instances"].result()
+            details = {
+                (instance["id"], name): executor.submit(self._detail, instance["id"], name)
+                for instance in instances for name in INSTANCE_DETAILS
+            }
+            collected = {name: future.result() for name, future in lists.items()}
+            detail_values = {key: future.result() for key, future in details.items()}
+        
+        normalized_instances = []
+        for instance in instances:
+            normalized = _normalize(instance)
+            normalized["tags"] = sorted(instance.get("tags") or [])
+            normalized["backups"] = "enabled" if "auto_backups" in (instance.get("features") or []) else "disabled"
+            for name in INSTANCE_DETAILS:
+                if detail_values[(instance["id"], name)] is None:
+                    errors.append(f"instances/{instance['id']}/{INSTANCE_DETAILS[name]}: no data")
+            normalized["backup_schedule"] = detail_values[(instance["id"], "backup_schedule")]
+            normalized["bandwidth"] = summarize_bandwidth(detail_values[(instance["id"], "bandwidth")])
+            normalized_instances.append(normalized)
+        collected["instances"] = normalized_instances
+        
+        failed = self.retriever.failed_requests - failures_before
+        if failed:
+            errors.insert(0, f"{failed} request(s) failed; lists may be incomplete")
+        snapshot = {"timestamp": datetime.now().isoformat(), "complete": not errors, "errors": errors}
+        for name in ACCOUNT_LISTS:
+            snapshot[name] = sorted((_normalize(item) for item in collected[name]),
+                                    key=lambda item: str(item["id"]))
+        snapshot["summary"] = {name: len(snapshot[name]) for name in ACCOUNT_LISTS}
+        print("Retrieved " + ", ".join(f"{count} {name.replace('_', ' ')}"
+                                       for name, count in snapshot["summary"].items()))
+        return snapshot
+
+
+@dataclass
+class Drift:
+    """A difference between terraform state and the live account"""
+    address: str
+    instance_id: str
+    field: str
+    state: Any
+    live: Any
+    
+    def __str__(self) -> str:
+        if self.field == "instance":
+            return f"{self.address} ({self.instance_id}): no longer exists"
+        return f"{self.address} ({self.instance_id}): {self.field}: state {self.state!r}, live {self.live!r}"
+
+
+def _state_modules(module: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield a `terraform show -json` module and its child modules."""
+    yield module
+    for child in module.get("child_modules", []):
+        yield from _state_modules(child)
+
+
+def terraform_instances(state: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Extract the managed vultr_instance resources from a terraform state.
+    
+    Args:
+        state: Parsed terraform.tfstate (format version 4) or
+            `terraform show -json` output
+    
+    Returns:
+        List of (resource address, attributes)
+    """
+    instances = []
+    if "values" in state:
+        root = (state.get("values") or {}).get("root_module", {})
+        for module in _state_modules(root):
+            for resource in module.get("resources", []):
+                if resource.get("mode") == "managed" and resource.get("type") == "vultr_instance":
+                    instances.append((resource["address"], resource.get("values", {})))
+        return instances
+    
+    for resource in state.get("resources", []):
+        if resource.get("mode") != "managed" or resource.get("type") != "vultr_instance":
+            continue
+        address = f"{resource['module']}.{resource['type']}.{resource['name']}" if resource.get("module") \
+            else f"{resource['type']}.{resource['name']}"
+        for instance in resource.get("instances", []):
+            key = instance.get("index_key")
+            suffix = "" if key is None else f"[{json.dumps(key)}]"
+            instances.append((address + suffix, instance.get("attributes", {})))
+    return instances
+
+
+def check_drift(inventory: Dict[str, Any], state: Dict[str, Any]) -> Tuple[List[Drift], List[Dict[str, Any]]]:
+    """
+    Compare an inventory snapshot with terraform state.
+    
+    If the inventory is incomplete, an instance missing from it may just
+    not have been retrieved, so it is not reported as deleted.
+    
+    Args:
+        inventory: Snapshot from AccountInventory.collect
+        state: Parsed terraform state (see terraform_instances)
+    
+    Returns:
+        Tuple of (drifted fields and instances deleted outside terraform,
+        live instances not managed by the state)
+    """
+    complete = inventory.get("complete", True)
+    live = {instance["id"]: instance for instance in inventory["instances"]}
+    drifts = []
+    managed = set()
+    for address, attributes in terraform_instances(state):
+        instance_id = attributes.get("id")
+        managed.add(instance_id)
+        instance = live.get(instance_id)
+        if instance is None:
+            if complete:
+                drifts.append(Drift(address, instance_id, "instance", instance_id, None))
+            continue
+        for field in STATE_FIELDS:
+            if field not in attributes:
+                continue
+            expected, actual = attributes[field], instance.get(field)
+            if field == "tags":
+                expected, actual = sorted(expected or []), sorted(actual or [])
+            if expected != actual:
+                drifts.append(Drift(address, instance_id, field, expected, actual))
+        
+        schedules = attributes.get("backups_schedule") or []
+        schedule = instance.get("backup_schedule")
+        if attributes.get("backups") == "enabled" and schedules and schedule is not None:
+            for field in SCHEDULE_FIELDS:
+                if field in schedules[0] and schedules[0][field] != schedule.get(field):
+                    drifts.append(Drift(address, instance_id, f"backups_schedule.{field}",
+                                        schedules[0][field], schedule.get(field)))
+    unmanaged = [instance for instance_id, instance in live.items() if instance_id not in managed]
+    return drifts, unmanaged
@@ -0,0 +1,149 @@
+"""
+Vultr Plan Availability Matrix
+Which plans can be deployed in which region right now, as reported by the
+per-region /regions/{id}/availability endpoint.
+
+A plan listing a region in its locations is not necessarily deployable
+there (it may be sold out), so the matrix is fetched separately. It is
+stored as bitmaps: one integer per plan with a bit per region, and one per
+region with a bit per plan, so both "regions where plan X is available"
+and "plans available in region Y" are a single lookup plus a bit scan.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def _bits(mask: int) -> Iterable[int]:
+    """Yield the positions of the set bits of mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class AvailabilityMatrix:
+    """Plan x region availability bitmap"""
+    
+    def __init__(self, regions: Iterable[str], plans: Iterable[str] = (),
+                 timestamp: str = ""):
+        """
+        Initialize an empty matrix.
+        
+        Args:
+            regions: Region ids (the columns)
+            plans: Plan ids known up front (the rows); plans reported by a
+                region later are appended
+            timestamp: When the availability was fetched
+        """
+        self.regions: List[str] = list(regions)
+        self.plans: List[str] = []
+        self.timestamp = timestamp
+        # Regions whose availability could not be fetched
+        self.failed_regions: List[str] = []
+        self._region_index = {region: i for i, region in enumerate(self.regions)}
+        self._plan_index: Dict[str, int] = {}
+        self._rows: List[int] = []  # per plan, bit i = available in self.regions[i]
+        self._columns: List[int] = [0] * len(self.regions)  # per region, bit j = self.plans[j]
+        for plan_id in plans:
+            self._plan_row(plan_id)
+    
+    def _plan_row(self, plan_id: str) -> int:
+        row = self._plan_index.get(plan_id)
+        if row is None:
+            row = self._plan_index[plan_id] = len(self.plans)
+            self.plans.append(plan_id)
+            self._rows.append(0)
+        return row
+    
+    def set_region(self, region_id: str, plan_ids: Optional[Iterable[str]]):
+        """
+        Record the plans available in a region.
+        
+        Args:
+            region_id: Region id (must be one of the matrix columns)
+            plan_ids: Available plan ids, or None if the fetch failed
+        """
+        column = self._region_index[region_id]
+        if plan_ids is None:
+            self.failed_regions.append(region_id)
+            return
+        column_mask = 0
+        region_bit = 1 << column
+        for plan_id in plan_ids:
+            row = self._plan_row(plan_id)
+            self._rows[row] |= region_bit
+            column_mask |= 1 << row
+        self._columns[column] = column_mask
+    
+    def is_available(self, plan_id: str, region_id: str) -> bool:
+        """Return True if the plan can be deployed in the region."""
+        row = self._plan_index.get(plan_id)
+        column = self._region_index.get(region_id)
+        if row is None or column is None:
+            return False
+        return bool(self._rows[row] >> column & 1)
+    
+    def regions_for_plan(self, plan_id: str) -> List[str]:
+        """Return the regions where a plan is available, in column order."""
+        row = self._plan_index.get(plan_id)
+        if row is None:
+            return []
+        return [self.regions[i] for i in _bits(self._rows[row])]
+    
+    def plans_in_region(self, region_id: str) -> List[str]:
+        """Return the plans available in a region, in row order."""
+        column = self._region_index.get(region_id)
+        if column is None:
+            return []
+        return [self.plans[j] for j in _bits(self._columns[column])]
+    
+    def region_count(self, plan_id: str) -> int:
+        """Return the number of regions where a plan is available."""
+        row = self._plan_index.get(plan_id)
+        return bin(self._rows[row]).count("1") if row is not None else 0
+    
+    def summary(self) -> Dict[str, int]:
+        """Return the matrix dimensions and the number of available pairs."""
+        return {
+            "plans": len(self.plans),
+            "regions": len(self.regions),
+            "available": sum(bin(mask).count("1") for mask in self._rows),
+            "failed_regions": len(self.failed_regions),
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return a JSON-serializable form, with each plan's row as a hex
+        bitmask over the regions list.
+        """
+        return {
+            "timestamp": self.timestamp,
+            "regions": self.regions,
+            "failed_regions": self.failed_regions,
+            "plans": self.plans,
+            "rows": [format(mask, "x") for mask in self._rows],
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AvailabilityMatrix":
+        """Rebuild a matrix written by to_dict."""
+        matrix = cls(data["regions"], data["plans"], data.get("timestamp", ""))
+        matrix.failed_regions = list(data.get("failed_regions", []))
+        for row, mask in enumerate(data["rows"]):
+            mask = int(mask, 16)
+            matrix._rows[row] = mask
+            for column in _bits(mask):
+                matrix._columns[column] |= 1 << row
+        return matrix
+    
+    def save(self, path: str):
+        """Write the matrix to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+    
+    @classmethod
+    def load(cls, path: str) -> "AvailabilityMatrix":
+        """Read a matrix written by save."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,281 @@
+"""
+Vultr Catalog Query Engine
+In-memory, indexed view of the plans, regions and operating systems returned
+by VultrResourceRetriever.
+
+Indexes are built once: sorted arrays on monthly_cost, ram, vcpu_count and
+disk for range queries, hash maps for type, country, continent and family,
+and a region -> plans inverted index from each plan's locations. Plans are
+identified internally by their rank in monthly_cost order, so intersecting
+candidate sets and sorting the result by price is cheap. Plans without a
+price rank after the priced ones, and a plan without a value for a range
+field never matches a constraint on it.
+"""
+
+import os
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from vultr_records import OperatingSystem, Plan, Region
+from vultr_snapshot_index import (RECORD_KINDS, SnapshotIndex, iter_resources_records,
+                                  iter_snapshot_records)
+
+
+class VultrCatalog:
+    """Indexed catalog of Vultr plans, regions and operating systems"""
+    
+    RANGE_FIELDS = ("monthly_cost", "ram", "vcpu_count", "disk")
+    
+    def __init__(self, plans: Iterable[Plan], regions: Iterable[Region],
+                 os_list: Iterable[OperatingSystem]):
+        """
+        Build the catalog and all of its indexes.
+        
+        Args:
+            plans: Plan records
+            regions: Region records
+            os_list: OperatingSystem records
+        """
+        # Plans ordered by price; a plan's position here is its "rank"
+        self.plans: List[Plan] = sorted(
+            plans, key=lambda p: (p.monthly_cost is None, p.monthly_cost or 0, p.id))
+        self.regions: List[Region] = list(regions)
+        self.os_list: List[OperatingSystem] = list(os_list)
+        
+        self._plan_by_id = {p.id: p for p in self.plans}
+        self._region_by_id = {r.id: r for r in self.regions}
+        self._os_by_id = {o.id: o for o in self.os_list}
+        
+        # Sorted (value, rank) arrays for range queries
+        self._sorted_values: Dict[str, List[Any]] = {}
+        self._sorted_ranks: Dict[str, List[int]] = {}
+        for field in self.RANGE_FIELDS:
+            pairs = sorted((getattr(plan, field), rank) for rank, plan in enumerate(self.plans)
+                           if getattr(plan, field) is not None)
+            self._sorted_values[field] = [value for value, _ in pairs]
+            self._sorted_ranks[field] = [rank for _, rank in pairs]
+        
+        # Hash indexes
+        self._plans_by_type: Dict[str, List[int]] = {}
+        self._plans_by_region: Dict[str, Set[int]] = {}
+        for rank, plan in enumerate(self.plans):
+            self._plans_by_type.setdefault(plan.type, []).append(rank)
+            for location in plan.locations:
+                self._plans_by_region.setdefault(location, set()).add(rank)
+        
+        self._regions_by_country: Dict[str, List[Region]] = {}
+        self._regions_by_continent: Dict[str, List[Region]] = {}
+        for region in self.regions:
+            self._regions_by_country.setdefault(region.country.upper(), []).append(region)
+            self._regions_by_continent.setdefault(region.continent.lower(), []).append(region)
+        
+        self._os_by_family: Dict[str, List[OperatingSystem]] = {}
+        for os_item in self.os_list:
+            self._os_by_family.setdefault(os_item.family.lower(), []).append(os_item)
+    
+    @classmethod
+    def from_retriever(cls, retriever, concurrency: int = 1) -> "VultrCatalog":
+        """
+        Fetch the catalog with a VultrResourceRetriever and index it.
+        
+        Args:
+            retriever: VultrResourceRetriever instance
+            concurrency: Number of endpoints to fetch in parallel
+        
+        Returns:
+            Indexed catalog
+        """
+        plans, regions, os_list = retriever.fetch_all(concurrency=concurrency)
+        return cls(plans, regions, os_list)
+    
+    @classmethod
+    def from_json(cls, json_path: str) -> "VultrCatalog":
+        """
+        Load a vultr_resources_*.json snapshot written by retrieve_and_save_all,
+        decoding it (and decompressing .gz/.zst files) as a stream.
+        
+        Args:
+            json_path: Path to the snapshot file
+        
+        Returns:
+            Indexed catalog
+        """
+        records = {kind: [] for kind in RECORD_KINDS}
+        for kind, record in iter_resources_records(json_path):
+            records[kind].append(record)
+        return cls(records["plans"], records["regions"], records["os"])
+    
+    @classmethod
+    def from_snapshot(cls, directory: str = ".", which: str = "latest") -> "VultrCatalog":
+        """
+        Load a snapshot recorded in a retriever output directory's manifest,
+        reading the combined JSON file or, if it was not written, the CSV
+        file of each kind.
+        
+        Args:
+            directory: Output directory of vultr_resource_retriever.py
+            which: 'latest', 'previous' or a timestamp
+        
+        Returns:
+            Indexed catalog
+        
+        Raises:
+            FileNotFoundError: If the snapshot or one of its files is missing
+        """
+        index = SnapshotIndex(directory)
+        entry = index.resolve(which)
+        if entry is None:
+            raise FileNotFoundError(f"No snapshot '{which}' in {index.path}")
+        output = index.output(entry, "resources", "json")
+        if output is not None and os.path.exists(output["path"]):
+            return cls.from_json(output["path"])
+        records = {}
+        for kind in RECORD_KINDS:
+            output = index.output(entry, kind, "csv")
+            if output is None or not os.path.exists(output["path"]):
+                raise FileNotFoundError(
+                    f"Snapshot {entry.get('timestamp')} has no JSON or {kind} CSV file in {directory}"
+                )
+            records[kind] = list(iter_snapshot_records(output["path"], kind))
+        return cls(records["plans"], records["regions"], records["os"])
+    
+    def plan(self, plan_id: str) -> Optional[Plan]:
+        """Return the plan with the given id, or None."""
+        return self._plan_by_id.get(plan_id)
+    
+    def region(self, region_id: str) -> Optional[Region]:
+        """Return the region with the given id, or None."""
+        return self._region_by_id.get(region_id)
+    
+    def os(self, os_id: int) -> Optional[OperatingSystem]:
+        """Return the operating system with the given id, or None."""
+        return self._os_by_id.get(os_id)
+    
+    def regions_by_country(self, country: str) -> List[Region]:
+        """Return regions in a country (ISO code, case-insensitive)."""
+        return list(self._regions_by_country.get(country.upper(), []))
+    
+    def regions_by_continent(self, continent: str) -> List[Region]:
+        """Return regions on a continent (case-insensitive)."""
+        return list(self._regions_by_continent.get(continent.lower(), []))
+    
+    def os_by_family(self, family: str) -> List[OperatingSystem]:
+        """Return operating systems of a family (case-insensitive)."""
+        return list(self._os_by_family.get(family.lower(), []))
+    
+    def countries(self) -> List[str]:
+        """Return all country codes that have at least one region."""
+        return sorted(self._regions_by_country)
+    
+    def os_families(self) -> List[str]:
+        """Return all OS family names."""
+        return sorted(self._os_by_family)
+    
+    def plans_in_region(self, region_id: str) -> List[Plan]:
+        """Return plans offered in a region, cheapest first."""
+        return [self.plans[rank] for rank in sorted(self._plans_by_region.get(region_id, ()))]
+    
+    def regions_for_plan(self, plan_id: str) -> List[Region]:
+        """Return the known regions where a plan is offered."""
+        plan = self.plan(plan_id)
+        if plan is None:
+            return []
+        return [self._region_by_id[r] for r in plan.locations if r in self._region_by_id]
+    
+    def _range(self, field: str, low: Optional[float], high: Optional[float]) -> Optional[Set[int]]:
+        """
+        Return the ranks of plans with low <= field <= high, or None if
+        the field is unconstrained.
+        """
+        if low is None and high is None:
+            return None
+        values = self._sorted_values[field]
+        start = bisect_left(values, low) if low is not None else 0
+        end = bisect_right(values, high) if high is not None else len(values)
+        return set(self._sorted_ranks[field][start:end])
+    
+    def _candidates(self, min_vcpu: Optional[int] = None, min_ram: Optional[int] = None,
+                    min_disk: Optional[int] = None, max_cost: Optional[float] = None,
+                    plan_type: Optional[str] = None, region: Optional[str] = None,
+                    country: Optional[str] = None) -> Optional[Set[int]]:
+        """
+        Intersect the index lookups for the given constraints.
+        
+        Returns:
+            Set of matching plan ranks, or None if nothing is constrained
+        """
+        sets: List[Set[int]] = []
+        
+        if max_cost is not None:
+            # Plans are already ordered by cost, so this is a prefix of ranks
+            sets.append(set(range(bisect_right(self._sorted_values["monthly_cost"], max_cost))))
+        for field, low in (("vcpu_count", min_vcpu), ("ram", min_ram), ("disk", min_disk)):
+            ranks = self._range(field, low, None)
+            if ranks is not None:
+                sets.append(ranks)
+        if plan_type is not None:
+            sets.append(set(self._plans_by_type.get(plan_type, ())))
+        if region is not None:
+            sets.append(self._plans_by_region.get(region, set()))
+        if country is not None:
+            in_country = set()
+            for r in self._regions_by_country.get(country.upper(), ()):
+                in_country |= self._plans_by_region.get(r.id, set())
+            sets.append(in_country)
+        
+        if not sets:
+            return None
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result &= other
+            if not result:
+                break
+        return result
+    
+    def find_plans(self, min_vcpu: Optional[int] = None, min_ram: Optional[int] = None,
+                   min_disk: Optional[int] = None, max_cost: Optional[float] = None,
+                   plan_type: Optional[str] = None, region: Optional[str] = None,
+                   country: Optional[str] = None, limit: Optional[int] = None) -> List[Plan]:
+        """
+        Find plans matching all given constraints, cheapest first.
+        
+        Args:
+            min_vcpu: Minimum number of vCPUs
+            min_ram: Minimum RAM in MB
+            min_disk: Minimum disk in GB
+            max_cost: Maximum monthly cost in USD
+            plan_type: Plan type (e.g. 'vc2', 'vhf')
+            region: Region id the plan must be offered in (e.g. 'dfw')
+            country: Country code of a region the plan must be offered in
+            limit: Maximum number of plans to return
+        
+        Returns:
+            Matching plans ordered by monthly cost
+        """
+        ranks = self._candidates(min_vcpu, min_ram, min_disk, max_cost, plan_type, region, country)
+        if ranks is None:
+            matches = self.plans
+        else:
+            matches = [self.plans[rank] for rank in sorted(ranks)]
+        return matches[:limit] if limit is not None else list(matches)
+    
+    def cheapest_plan(self, **constraints) -> Optional[Plan]:
+        """
+        Return the cheapest plan matching the constraints of find_plans.
+        
+        Returns:
+            Cheapest matching plan, or None
+        """
+        ranks = self._candidates(**constraints)
+        if ranks is None:
+            return self.plans[0] if self.plans else None
+        return self.plans[min(ranks)] if ranks else None
+    
+    def summary(self) -> Dict[str, int]:
+        """Return item counts for the catalog."""
+        return {
+            "plans": len(self.plans),
+            "regions": len(self.regions),
+            "operating_systems": len(self.os_list),
+        }
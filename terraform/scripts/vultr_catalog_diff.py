@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Vultr Catalog Diff
+Compare catalog snapshots written by VultrResourceRetriever and report added
+and removed plans, regions and operating systems and changed fields (prices,
+locations, RAM, ...) as markdown and JSON.
+
+Each kind is compared in one keyed pass over ``id``: the old snapshot's
+records are indexed by id, the new snapshot's records are streamed from
+their file and matched against that index, and whatever is left over was
+removed. Kinds whose content hash is the same in the snapshot manifest are
+skipped without reading their files. A combined JSON snapshot is read in
+one pass for all kinds, and in changelog mode the records read as the "new"
+side of one step are reused as the "old" side of the next, so a year of
+hourly snapshots reads each snapshot's files at most once.
+"""
+
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from markdown_table import Column, MarkdownTable, MarkdownWriter
+from vultr_records import Record
+from vultr_snapshot_index import RECORD_KINDS, SnapshotIndex, iter_resources_records, iter_snapshot_records
+
+KIND_LABELS = {"plans": "Plans", "regions": "Regions", "os": "Operating Systems"}
+KIND_NAMES = {"plans": "plan", "regions": "region", "os": "OS"}
+
+
+@dataclass
+class FieldChange:
+    """A changed field of a record"""
+    
+    field: str
+    old: Any
+    new: Any
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a dictionary, listing added/removed items of list fields."""
+        data = {"field": self.field, "old": self.old, "new": self.new}
+        if isinstance(self.old, (list, tuple)) and isinstance(self.new, (list, tuple)):
+            data["added"] = [item for item in self.new if item not in self.old]
+            data["removed"] = [item for item in self.old if item not in self.new]
+        return data
+    
+    def describe(self) -> str:
+        """Short markdown description of the change."""
+        change = self.to_dict()
+        if "added" in change:
+            parts = [f"+{item}" for item in change["added"]] + [f"-{item}" for item in change["removed"]]
+            return f"{self.field}: {' '.join(parts)}"
+        return f"{self.field}: {self.old} → {self.new}"
+
+
+@dataclass
+class KindDiff:
+    """Differences between two snapshots for one kind of record"""
+    
+    kind: str
+    added: List[Record] = field(default_factory=list)
+    removed: List[Record] = field(default_factory=list)
+    changed: List[Tuple[str, List[FieldChange]]] = field(default_factory=list)
+    
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a JSON-serializable dictionary."""
+        return {
+            "added": [record.to_dict() for record in self.added],
+            "removed": [record.to_dict() for record in self.removed],
+            "changed": [{"id": record_id, "changes": [change.to_dict() for change in changes]}
+                        for record_id, changes in self.changed],
+        }
+
+
+@dataclass
+class CatalogDiff:
+    """Differences between two catalog snapshots"""
+    
+    old: str
+    new: str
+    kinds: Dict[str, KindDiff]
+    
+    def __bool__(self) -> bool:
+        return any(self.kinds.values())
+    
+    def breaking(self) -> List[str]:
+        """
+        List changes that can break Terraform configurations: removed ids and
+        plans no longer offered in a region.
+        
+        Returns:
+            Human-readable descriptions
+        """
+        found = []
+        for kind, diff in self.kinds.items():
+            found.extend(f"{KIND_NAMES[kind]} {record.id} removed" for record in diff.removed)
+        plans = self.kinds.get("plans")
+        for plan_id, changes in (plans.changed if plans else ()):
+            for change in changes:
+                if change.field == "locations":
+                    for region in change.to_dict()["removed"]:
+                        found.append(f"plan {plan_id} no longer offered in {region}")
+        return found
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a JSON-serializable dictionary."""
+        return {
+            "from": self.old,
+            "to": self.new,
+            "breaking": self.breaking(),
+            "changes": {kind: diff.to_dict() for kind, diff in self.kinds.items()},
+        }
+
+
+def _normalize(value: Any) -> Any:
+    """Treat missing and empty values alike and lists as tuples."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def _csv_text(value: Any) -> str:
+    """Return a normalized value as csv.DictWriter writes it to a snapshot."""
+    if value is None:
+        return ''
+    if isinstance(value, tuple):
+        value = list(value)
+    return str(value)
+
+
+def compare_records(old: Record, new: Record) -> List[FieldChange]:
+    """
+    Compare the fields (modelled and extra) of two records with the same id.
+    
+    Args:
+        old: Record from the older snapshot
+        new: Record from the newer snapshot
+    
+    Returns:
+        Changed fields, modelled fields first
+    """
+    if old == new:
+        return []
+    old_data = old.to_dict()
+    new_data = new.to_dict()
+    changes = []
+    for name in list(old_data) + [key for key in new_data if key not in old_data]:
+        before = _normalize(old_data.get(name))
+        after = _normalize(new_data.get(name))
+        # CSV snapshots hold extra fields as text (lists as "['a', 'b']"),
+        # JSON ones keep their types
+        if before != after and (type(before) is type(after) or _csv_text(before) != _csv_text(after)):
+            changes.append(FieldChange(name, old_data.get(name), new_data.get(name)))
+    return changes
+
+
+def diff_records(kind: str, old: Dict[str, Record], new: Iterable[Record]) -> KindDiff:
+    """
+    Compare records in one keyed pass over id.
+    
+    Args:
+        kind: 'plans', 'regions' or 'os'
+        old: Records of the older snapshot by id (left unchanged)
+        new: Records of the newer snapshot, streamed
+    
+    Returns:
+        Differences for this kind
+    """
+    diff = KindDiff(kind)
+    seen = set()
+    for record in new:
+        record_id = str(record.id)
+        seen.add(record_id)
+        previous = old.get(record_id)
+        if previous is None:
+            diff.added.append(record)
+            continue
+        changes = compare_records(previous, record)
+        if changes:
+            diff.changed.append((record_id, changes))
+    diff.removed = [record for record_id, record in old.items() if record_id not in seen]
+    for records in (diff.added, diff.removed):
+        records.sort(key=lambda record: str(record.id))
+    diff.changed.sort(key=lambda item: item[0])
+    return diff
+
+
+class SnapshotDiffer:
+    """Diffs snapshots recorded in a retriever output directory"""
+    
+    def __init__(self, directory: str = "."):
+        """
+        Initialize the differ.
+        
+        Args:
+            directory: Output directory of vultr_resource_retriever.py
+        """
+        self.index = SnapshotIndex(directory)
+        # Snapshot name and records by kind and id of the last snapshot read
+        self._loaded: Tuple[Optional[str], Dict[str, Dict[str, Record]]] = (None, {})
+    
+    def _digest(self, entry: Dict[str, Any], kind: str) -> Optional[str]:
+        """Return a kind's content hash recorded in a manifest entry, if any."""
+        digest = entry.get("hashes", {}).get(kind)
+        if digest is None:
+            # Entries written before per-kind hashes were recorded: the CSV
+            # output's hash is still there after the file itself was deleted
+            output = self.index.output(entry, kind, "csv")
+            digest = output.get("hash") if output else None
+        return digest
+    
+    def _records(self, entry: Dict[str, Any], kinds: Iterable[str]) -> Dict[str, Dict[str, Record]]:
+        """
+        Return the records by id of some kinds of a snapshot, reusing the
+        last snapshot read. A kind is read from its own CSV file if it
+        still exists; the remaining kinds are all read from the combined
+        JSON snapshot in a single pass.
+        """
+        name = entry.get("snapshot", entry.get("timestamp"))
+        loaded_name, loaded = self._loaded
+        records = dict(loaded) if loaded_name == name else {}
+        missing = [kind for kind in kinds if kind not in records]
+        from_json = []
+        for kind in missing:
+            output = self.index.output(entry, kind, "csv")
+            if output is not None and os.path.exists(output["path"]):
+                records[kind] = {str(record.id): record for record in iter_snapshot_records(output["path"], kind)}
+            else:
+                # update_vultr_docs.py deletes the CSV files unless --keep-csv is used
+                from_json.append(kind)
+        if from_json:
+            output = self.index.output(entry, "resources", "json")
+            if output is None:
+                raise FileNotFoundError(f"Snapshot {entry.get('timestamp')} has no {from_json[0]} file "
+                                        f"in {self.index.path}")
+            # The file is read anyway, so keep every kind in it
+            json_records: Dict[str, Dict[str, Record]] = {kind: {} for kind in RECORD_KINDS}
+            for kind, record in iter_resources_records(output["path"]):
+                json_records[kind][str(record.id)] = record
+            for kind, by_id in json_records.items():
+                records.setdefault(kind, by_id)
+        self._loaded = (name, records)
+        return records
+    
+    def diff_entries(self, old: Dict[str, Any], new: Dict[str, Any]) -> CatalogDiff:
+        """
+        Diff the snapshots written by two manifest entries.
+        
+        Args:
+            old: Entry of the older snapshot
+            new: Entry of the newer snapshot
+        
+        Returns:
+            Catalog differences
+        """
+        kinds = {kind: KindDiff(kind) for kind in RECORD_KINDS}
+        changed = []
+        for kind in RECORD_KINDS:
+            old_hash = self._digest(old, kind)
+            if old_hash is None or old_hash != self._digest(new, kind):
+                changed.append(kind)
+        if changed:
+            old_records = self._records(old, changed)
+            new_records = self._records(new, changed)
+            for kind in changed:
+                kinds[kind] = diff_records(kind, old_records[kind], new_records[kind].values())
+        return CatalogDiff(old.get("timestamp", ""), new.get("timestamp", ""), kinds)
+    
+    def diff(self, old: str = "previous", new: str = "latest") -> CatalogDiff:
+        """
+        Diff two snapshots selected as for SnapshotIndex.resolve.
+        
+        Args:
+            old: 'latest', 'previous' or a timestamp
+            new: 'latest', 'previous' or a timestamp
+        
+        Returns:
+            Catalog differences
+        """
+        entries = []
+        for which in (old, new):
+            entry = self.index.resolve(which)
+            if entry is None:
+                raise FileNotFoundError(f"No snapshot '{which}' in {self.index.path}")
+            entries.append(entry)
+        return self.diff_entries(*entries)
+    
+    def changelog(self, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[CatalogDiff]:
+        """
+        Diff each recorded snapshot against the one before it, oldest first.
+        
+        Args:
+            since: Optional timestamp; start from the snapshot current then
+            until: Optional timestamp; stop after the snapshot current then
+        
+        Yields:
+            Non-empty catalog differences
+        """
+        start = self.index.as_of(since) if since else None
+        low = SnapshotIndex.normalize_timestamp(start["timestamp"]) if start else None
+        high = SnapshotIndex.normalize_timestamp(until) if until else None
+        previous = None
+        for entry in self.index.entries():
+            if entry.get("unchanged"):
+                continue
+            stamp = SnapshotIndex.normalize_timestamp(entry.get("timestamp", ""))
+            if high is not None and stamp > high:
+                break
+            if low is not None and stamp < low:
+                continue
+            if previous is not None:
+                diff = self.diff_entries(previous, entry)
+                if diff:
+                    yield diff
+            previous = entry
+
+
+def diff_json_files(old_path: str, new_path: str) -> CatalogDiff:
+    """
+    Diff two vultr_resources_*.json snapshot files, reading each file once.
+    
+    Args:
+        old_path: Older snapshot
+        new_path: Newer snapshot
+    
+    Returns:
+        Catalog differences
+    """
+    old: Dict[str, Dict[str, Record]] = {kind: {} for kind in RECORD_KINDS}
+    for kind, record in iter_resources_records(old_path):
+        old[kind][str(record.id)] = record
+    kinds = {}
+    # Records of a kind are contiguous in the file, so each group is one kind
+    for kind, group in groupby(iter_resources_records(new_path), key=itemgetter(0)):
+        kinds[kind] = diff_records(kind, old[kind], map(itemgetter(1), group))
+    for kind in RECORD_KINDS:
+        if kind not in kinds:
+            kinds[kind] = diff_records(kind, old[kind], ())
+    return CatalogDiff(old_path, new_path, {kind: kinds[kind] for kind in RECORD_KINDS})
+
+
+def _record_label(record: Record) -> str:
+    """Short description of an added or removed record."""
+    if hasattr(record, "monthly_cost"):
+        return f"{record.vcpu_count} vCPU, {record.ram} MB RAM, ${record.monthly_cost}/mo"
+    if hasattr(record, "city"):
+        return f"{record.city}, {record.country}"
+    return record.name
+
+
+def write_markdown(diffs: Iterable[CatalogDiff], stream: TextIO):
+    """
+    Write catalog differences as a markdown changelog.
+    
+    Args:
+        diffs: Differences, in the order they should appear
+        stream: Text stream to write to
+    """
+    writer = MarkdownWriter(stream)
+    writer.line("# Vultr Catalog Changes")
+    records_table = MarkdownTable([
+        Column("Change", lambda item: item[0]),
+        Column("ID", lambda item: f"`{item[1].id}`"),
+        Column("Details", lambda item: _record_label(item[1])),
+    ])
+    changes_table = MarkdownTable([
+        Column("ID", lambda item: f"`{item[0]}`"),
+        Column("Changes", lambda item: "; ".join(change.describe() for change in item[1]), 200),
+    ])
+    empty = True
+    for diff in diffs:
+        empty = False
+        writer.line()
+        writer.line(f"## {diff.old} → {diff.new}")
+        breaking = diff.breaking()
+        if breaking:
+            writer.line()
+            writer.line("**Breaking changes:**")
+            writer.lines(f"- {item}" for item in breaking)
+        for kind, kind_diff in diff.kinds.items():
+            if not kind_diff:
+                continue
+            writer.line()
+            writer.line(f"### {KIND_LABELS[kind]}")
+            writer.line()
+            writer.line(f"{len(kind_diff.added)} added, {len(kind_diff.removed)} removed, "
+                        f"{len(kind_diff.changed)} changed")
+            if kind_diff.added or kind_diff.removed:
+                writer.line()
+                records_table.write(writer, [("Added", r) for r in kind_diff.added] +
+                                    [("Removed", r) for r in kind_diff.removed])
+            if kind_diff.changed:
+                writer.line()
+                changes_table.write(writer, kind_diff.changed)
+    if empty:
+        writer.line()
+        writer.line("No changes.")
+    stream.write("\n")
+
+
+def write_json(diffs: Iterable[CatalogDiff], stream: TextIO):
+    """
+    Write catalog differences as a JSON list.
+    
+    Args:
+        diffs: Differences, in the order they should appear
+        stream: Text stream to write to
+    """
+    json.dump([diff.to_dict() for diff in diffs], stream, indent=2, ensure_ascii=False)
+    stream.write("\n")
+
+
+def _write_output(path: str, write, diffs: List[CatalogDiff]):
+    if path == "-":
+        write(diffs, sys.stdout)
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        write(diffs, f)
+    print(f"Saved {path}", file=sys.stderr)
+
+
+def main():
+    """Main function to diff catalog snapshots"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Report changes between Vultr catalog snapshots"
+    )
+    parser.add_argument("files", nargs="*", metavar="JSON",
+                        help="Two vultr_resources_*.json files to compare (old, new) instead of the manifest")
+    parser.add_argument("--dir", default=".",
+                        help="Output directory of vultr_resource_retriever.py (default: current directory)")
+    parser.add_argument("--from", dest="old", default="previous",
+                        help="Older snapshot: 'latest', 'previous' or a timestamp (default: previous)")
+    parser.add_argument("--to", dest="new", default="latest",
+                        help="Newer snapshot: 'latest', 'previous' or a timestamp (default: latest)")
+    parser.add_argument("--changelog", action="store_true",
+                        help="Diff every recorded snapshot against the one before it")
+    parser.add_argument("--since", help="With --changelog, start at the snapshot current at this time")
+    parser.add_argument("--until", help="With --changelog, stop at the snapshot current at this time")
+    parser.add_argument("--markdown", metavar="PATH",
+                        help="Write the markdown report to PATH ('-' for stdout)")
+    parser.add_argument("--json", metavar="PATH",
+                        help="Write the JSON report to PATH ('-' for stdout)")
+    parser.add_argument("--exit-code", action="store_true",
+                        help="Exit with status 1 if anything changed and 2 if a change is breaking")
+    
+    args = parser.parse_args()
+    if args.files and len(args.files) != 2:
+        parser.error("pass exactly two snapshot files (old and new)")
+    
+    try:
+        if args.files:
+            diffs = [diff_json_files(*args.files)]
+        elif args.changelog:
+            diffs = list(SnapshotDiffer(args.dir).changelog(args.since, args.until))
+            diffs.reverse()
+        else:
+            diffs = [SnapshotDiffer(args.dir).diff(args.old, args.new)]
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    diffs = [diff for diff in diffs if diff]
+    
+    if args.markdown is None and args.json is None:
+        args.markdown = "-"
+    if args.markdown:
+        _write_output(args.markdown, write_markdown, diffs)
+    if args.json:
+        _write_output(args.json, write_json, diffs)
+    
+    if args.exit_code and diffs:
+        sys.exit(2 if any(diff.breaking() for diff in diffs) else 1)
+
+
+if __name__ == "__main__":
+    main()
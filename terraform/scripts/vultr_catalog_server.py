@@ -0,0 +1,447 @@
+"""
+Vultr Catalog Server
+Long-running daemon that keeps an indexed VultrCatalog in memory, refreshes
+it from the API in the background and answers JSON queries over a Unix
+socket and/or localhost HTTP, so callers don't each start a process, import
+requests and fetch the catalog again.
+
+Queries (same operations on both transports):
+- plan:    {"op": "plan", "id": "vc2-1c-1gb"}
+- plans:   {"op": "plans", "region": "dfw", "min_vcpu": 2, "max_cost": 20, "limit": 5}
+           (also country, type, min_ram, min_disk)
+- region:  {"op": "region", "id": "dfw"}
+- regions: {"op": "regions", "country": "US"} or {"op": "regions", "continent": "Europe"}
+- os:      {"op": "os", "id": 1743} or {"op": "os", "family": "ubuntu"}
+- summary, stats
+
+Unix socket: one JSON request per line, one JSON response per line, any
+number of requests per connection. HTTP: GET /plan/vc2-1c-1gb,
+/plans?region=dfw&min_vcpu=2, /os?family=ubuntu, /stats, ...
+
+Responses carry the result and the catalog age in seconds; stats reports
+the refresh history and hit/miss counts per operation (a miss is a lookup
+that found nothing).
+"""
+
+import http.client
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from vultr_catalog import VultrCatalog
+
+# Query parameters converted from the strings HTTP delivers
+INT_PARAMS = ("min_vcpu", "min_ram", "min_disk", "limit")
+FLOAT_PARAMS = ("max_cost",)
+
+
+class CatalogServer:
+    """Serves an in-memory catalog that is refreshed in the background"""
+    
+    DEFAULT_REFRESH_INTERVAL = 900.0
+    OPERATIONS = ("plan", "plans", "region", "regions", "os", "summary", "stats")
+    
+    def __init__(self, retriever, refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+                 concurrency: int = 3):
+        """
+        Initialize the server (call start() to load the catalog and serve).
+        
+        Args:
+            retriever: VultrResourceRetriever used for refreshes
+            refresh_interval: Seconds between background refreshes
+            concurrency: Number of endpoints fetched in parallel per refresh
+        """
+        self.retriever = retriever
+        self.refresh_interval = refresh_interval
+        self.concurrency = concurrency
+        # (catalog, loaded_at) is swapped as one tuple so readers never see a mix
+        self._current: Optional[Tuple[VultrCatalog, float]] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._servers = []
+        self._threads = []
+        self.socket_path = None
+        self.reset_stats()
+    
+    def reset_stats(self):
+        """Reset query and refresh counters."""
+        with self._lock:
+            self.stats = {"queries": 0, "hits": 0, "misses": 0, "errors": 0, "operations": {},
+                          "refreshes": 0, "refresh_errors": 0, "last_refresh_seconds": None,
+                          "last_error": None}
+    
+    def _record(self, op: str, hit: Optional[bool]):
+        with self._lock:
+            self.stats["queries"] += 1
+            if hit is None:
+                self.stats["errors"] += 1
+                return
+            counts = self.stats["operations"].setdefault(op, {"hits": 0, "misses": 0})
+            key = "hits" if hit else "misses"
+            counts[key] += 1
+            self.stats[key] += 1
+    
+    @property
+    def catalog(self) -> Optional[VultrCatalog]:
+        """The catalog currently served, or None before the first load."""
+        current = self._current
+        return current[0] if current else None
+    
+    def age(self) -> Optional[float]:
+        """Seconds since the served catalog was fetched."""
+        current = self._current
+        return time.time() - current[1] if current else None
+    
+    def refresh(self) -> bool:
+        """
+        Fetch the catalog and swap it in. If any request failed (fetch_all
+        then returns partial or empty lists) the current catalog is kept.
+        
+        Returns:
+            True if a new catalog is being served
+        """
+        with self._refresh_lock:
+            started = time.perf_counter()
+            error = None
+            # The retry budget is per run; give every refresh a fresh one
+            self.retriever.scheduler.reset_budget()
+            failures = self.retriever.failed_requests
+            try:
+                plans, regions, os_list = self.retriever.fetch_all(concurrency=self.concurrency)
+                if self.retriever.failed_requests != failures:
+                    error = f"{self.retriever.failed_requests - failures} request(s) failed"
+                elif not (plans and regions and os_list):
+                    error = "an endpoint returned no items"
+                else:
+                    catalog = VultrCatalog(plans, regions, os_list)
+            except Exception as e:
+                error = str(e)
+            elapsed = time.perf_counter() - started
+            
+            with self._lock:
+                self.stats["last_refresh_seconds"] = round(elapsed, 3)
+                if error is not None:
+                    self.stats["refresh_errors"] += 1
+                    self.stats["last_error"] = error
+                else:
+                    self.stats["refreshes"] += 1
+                    self._current = (catalog, time.time())
+            if error is not None:
+                print(f"Catalog refresh failed: {error}"
+                      + ("; keeping the current catalog" if self._current else ""), file=sys.stderr)
+                return False
+            return True
+    
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+    
+    def query(self, request: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Answer one query.
+        
+        Args:
+            request: Query dictionary with 'op' and its parameters
+        
+        Returns:
+            Tuple of (HTTP-style status, response dictionary)
+        """
+        op = request.get("op")
+        try:
+            status, body, hit = self._answer(op, request)
+        except (TypeError, ValueError) as e:
+            status, body, hit = 400, {"error": f"Invalid query: {e}"}, None
+        self._record(op, hit)
+        return status, body
+    
+    def _answer(self, op: Any, request: Dict[str, Any]) -> Tuple[int, Dict[str, Any], Optional[bool]]:
+        """Return (status, body, hit) for a query; hit is None for errors."""
+        current = self._current
+        if op == "stats":
+            return 200, {"result": self.describe()}, True
+        if op not in self.OPERATIONS:
+            return 400, {"error": f"Unknown op {op!r}; expected one of {', '.join(self.OPERATIONS)}"}, None
+        if current is None:
+            return 503, {"error": "Catalog not loaded yet"}, None
+        catalog, loaded_at = current
+        params = {key: value for key, value in request.items() if key != "op"}
+        for key in INT_PARAMS:
+            if key in params:
+                params[key] = int(params[key])
+        for key in FLOAT_PARAMS:
+            if key in params:
+                params[key] = float(params[key])
+        
+        if op == "plan":
+            result = catalog.plan(str(params["id"])) if "id" in params else None
+        elif op == "plans":
+            if "type" in params:
+                params["plan_type"] = params.pop("type")
+            result = catalog.find_plans(**params)
+        elif op == "region":
+            result = catalog.region(str(params["id"])) if "id" in params else None
+        elif op == "regions":
+            if "country" in params:
+                result = catalog.regions_by_country(params["country"])
+            elif "continent" in params:
+                result = catalog.regions_by_continent(params["continent"])
+            else:
+                result = catalog.regions
+        elif op == "os":
+            if "family" in params:
+                result = catalog.os_by_family(params["family"])
+            else:
+                result = catalog.os(int(params["id"])) if "id" in params else None
+        else:
+            result = catalog.summary()
+        
+        age = round(time.time() - loaded_at, 3)
+        if result is None:
+            return 404, {"error": f"No {op} matches {params}", "age": age}, False
+        if isinstance(result, list):
+            return 200, {"result": [item.to_dict() for item in result], "age": age}, bool(result)
+        if not isinstance(result, dict):
+            result = result.to_dict()
+        return 200, {"result": result, "age": age}, True
+    
+    def describe(self) -> Dict[str, Any]:
+        """Return cache age, refresh history and hit/miss statistics."""
+        current = self._current
+        with self._lock:
+            stats = json.loads(json.dumps(self.stats))
+        stats["refresh_interval"] = self.refresh_interval
+        stats["catalog_age_seconds"] = round(time.time() - current[1], 3) if current else None
+        stats["loaded_at"] = datetime.fromtimestamp(current[1]).isoformat() if current else None
+        stats["summary"] = current[0].summary() if current else None
+        return stats
+    
+    def _http_handler_class(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; don't let Nagle delay the body
+            disable_nagle_algorithm = True
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                parts = [part for part in parsed.path.split("/") if part]
+                request = dict(parse_qsl(parsed.query))
+                if parts:
+                    request["op"] = parts[0]
+                if len(parts) > 1:
+                    request["id"] = parts[1]
+                status, body = server.query(request)
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+        
+        return Handler
+    
+    def _socket_handler_class(self):
+        server = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                        if not isinstance(request, dict):
+                            raise ValueError("request must be a JSON object")
+                    except ValueError as e:
+                        status, body = 400, {"error": f"Invalid request: {e}"}
+                    else:
+                        status, body = server.query(request)
+                    body["status"] = status
+                    self.wfile.write(json.dumps(body, ensure_ascii=False).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+        
+        return Handler
+    
+    def _serve_in_thread(self, server):
+        server.daemon_threads = True
+        self._servers.append(server)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+    
+    def start(self, socket_path: Optional[str] = None, port: Optional[int] = None) -> "CatalogServer":
+        """
+        Load the catalog, start the background refresh and begin serving.
+        
+        Args:
+            socket_path: Unix socket to listen on
+            port: Port to listen on for HTTP, on 127.0.0.1 only (0 picks a free port)
+        
+        Returns:
+            This server
+        """
+        if self._current is None and not self.refresh():
+            raise RuntimeError("Could not load the catalog")
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self._serve_in_thread(socketserver.ThreadingUnixStreamServer(
+                socket_path, self._socket_handler_class()))
+            self.socket_path = socket_path
+        if port is not None:
+            self._serve_in_thread(ThreadingHTTPServer(("127.0.0.1", port), self._http_handler_class()))
+        refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+        refresher.start()
+        self._threads.append(refresher)
+        return self
+    
+    @property
+    def http_port(self) -> Optional[int]:
+        """Port of the HTTP listener, if any."""
+        for server in self._servers:
+            if isinstance(server, ThreadingHTTPServer):
+                return server.server_address[1]
+        return None
+    
+    def stop(self):
+        """Stop serving and refreshing, and remove the Unix socket."""
+        self._stop.set()
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+    
+    def serve_forever(self, socket_path: Optional[str] = None, port: Optional[int] = None):
+        """
+        Start serving and block until interrupted (Ctrl-C or SIGTERM).
+        
+        Args:
+            socket_path: Unix socket to listen on
+            port: Port to listen on for HTTP (127.0.0.1 only)
+        """
+        self.start(socket_path, port)
+        where = [f"unix:{socket_path}"] if socket_path else []
+        if port is not None:
+            where.append(f"http://127.0.0.1:{self.http_port}/")
+        summary = self.catalog.summary()
+        print(f"Serving {summary['plans']} plans, {summary['regions']} regions and "
+              f"{summary['operating_systems']} operating systems on {', '.join(where)} "
+              f"(refresh every {self.refresh_interval:.0f}s)")
+        # Stop cleanly on SIGTERM (service managers, kill) as on Ctrl-C
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._stop.set())
+        try:
+            self._stop.wait()
+        except KeyboardInterrupt:
+            print("\nStopping")
+        finally:
+            self.stop()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class CatalogClient:
+    """Client for a running CatalogServer, keeping one connection open"""
+    
+    def __init__(self, socket_path: Optional[str] = None, url: Optional[str] = None,
+                 timeout: float = 5.0):
+        """
+        Initialize the client.
+        
+        Args:
+            socket_path: Unix socket of the server
+            url: HTTP address of the server (e.g. http://127.0.0.1:8765)
+            timeout: Socket timeout in seconds
+        """
+        if not socket_path and not url:
+            raise ValueError("socket_path or url is required")
+        self.socket_path = socket_path
+        self.url = urlparse(url) if url else None
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._http = None
+    
+    def request(self, op: str, **params) -> Dict[str, Any]:
+        """
+        Send a query and return the full response.
+        
+        Args:
+            op: Operation name
+            **params: Operation parameters
+        
+        Returns:
+            Response dictionary ('result' and 'age', or 'error')
+        """
+        if self.socket_path:
+            if self._sock is None:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.settimeout(self.timeout)
+                self._sock.connect(self.socket_path)
+                self._reader = self._sock.makefile('rb')
+            self._sock.sendall(json.dumps(dict(params, op=op)).encode("utf-8") + b"\n")
+            return json.loads(self._reader.readline())
+        
+        if self._http is None:
+            self._http = http.client.HTTPConnection(self.url.hostname, self.url.port, timeout=self.timeout)
+        identifier = params.pop("id", None)
+        path = f"/{op}" + (f"/{identifier}" if identifier is not None else "")
+        if params:
+            path += "?" + urlencode(params)
+        self._http.request("GET", path)
+        response = self._http.getresponse()
+        body = json.loads(response.read())
+        body["status"] = response.status
+        return body
+    
+    def query(self, op: str, **params) -> Any:
+        """
+        Send a query and return its result.
+        
+        Returns:
+            The result, or None if nothing matched
+        
+        Raises:
+            ValueError: If the server rejected the query
+        """
+        body = self.request(op, **params)
+        if body.get("status") == 404:
+            return None
+        if "error" in body:
+            raise ValueError(body["error"])
+        return body["result"]
+    
+    def close(self):
+        """Close the connection."""
+        if self._reader is not None:
+            self._reader.close()
+        if self._sock is not None:
+            self._sock.close()
+        if self._http is not None:
+            self._http.close()
+        self._sock = self._reader = self._http = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Vultr Catalog Store
+SQLite-backed storage for catalog snapshots written by VultrResourceRetriever.
+
+Each snapshot row records when the catalog was fetched and its content hash;
+plans, regions, operating systems and the exploded plan -> location table are
+stored per snapshot with indexes, so "latest", "as of date X" and "price
+history for plan Y" are indexed queries instead of file scans. An unchanged
+catalog (same content hash as the latest snapshot) only bumps that
+snapshot's last_seen_at instead of inserting duplicate rows.
+"""
+
+import json
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from vultr_records import OperatingSystem, Plan, Region, catalog_hash
+from vultr_snapshot_index import RECORD_KINDS, iter_json_arrays
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    taken_at TEXT NOT NULL,
+    last_seen_at TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    plan_count INTEGER NOT NULL,
+    region_count INTEGER NOT NULL,
+    os_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_taken_at ON snapshots (taken_at);
+
+CREATE TABLE IF NOT EXISTS plans (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    type TEXT,
+    vcpu_count INTEGER,
+    ram INTEGER,
+    disk INTEGER,
+    bandwidth INTEGER,
+    monthly_cost,  -- no type affinity: 5 and 5.0 are stored as the API sent them
+    extra TEXT,
+    PRIMARY KEY (snapshot_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_plans_id ON plans (id, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_plans_cost ON plans (snapshot_id, monthly_cost);
+
+CREATE TABLE IF NOT EXISTS plan_locations (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    plan_id TEXT NOT NULL,
+    region_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (snapshot_id, plan_id, region_id)
+);
+CREATE INDEX IF NOT EXISTS idx_plan_locations_region ON plan_locations (snapshot_id, region_id);
+
+CREATE TABLE IF NOT EXISTS regions (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    city TEXT,
+    country TEXT,
+    continent TEXT,
+    options TEXT,
+    extra TEXT,
+    PRIMARY KEY (snapshot_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_regions_country ON regions (snapshot_id, country);
+
+CREATE TABLE IF NOT EXISTS os (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    id INTEGER NOT NULL,
+    name TEXT,
+    arch TEXT,
+    family TEXT,
+    extra TEXT,
+    PRIMARY KEY (snapshot_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_os_family ON os (snapshot_id, family);
+"""
+
+
+class CatalogStore:
+    """SQLite store of catalog snapshots"""
+    
+    def __init__(self, db_path: str):
+        """
+        Open (and create if needed) the catalog database.
+        
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+    
+    def _migrate(self):
+        """
+        Rebuild a plans table created with monthly_cost NUMERIC, which
+        stored 5.0 as 5. Values already stored keep their converted type.
+        """
+        columns = {row["name"]: row["type"] for row in self.conn.execute("PRAGMA table_info(plans)")}
+        if columns.get("monthly_cost", "").upper() != "NUMERIC":
+            return
+        with self.conn:
+            self.conn.execute("ALTER TABLE plans RENAME TO plans_numeric")
+            self.conn.execute("DROP INDEX IF EXISTS idx_plans_id")
+            self.conn.execute("DROP INDEX IF EXISTS idx_plans_cost")
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            self.conn.execute("INSERT INTO plans SELECT * FROM plans_numeric")
+            self.conn.execute("DROP TABLE plans_numeric")
+    
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def save_snapshot(self, plans: List[Plan], regions: List[Region],
+                      os_list: List[OperatingSystem], content_hash: str,
+                      taken_at: Optional[str] = None) -> int:
+        """
+        Store a catalog snapshot.
+        
+        If the latest snapshot has the same content hash, its last_seen_at
+        is updated and no rows are inserted. Duplicate ids fail the whole
+        snapshot rather than silently keeping only one of the records.
+        
+        Args:
+            plans: Plan records
+            regions: Region records
+            os_list: OperatingSystem records
+            content_hash: Hash of the canonicalized catalog
+            taken_at: ISO timestamp of the fetch (default: now)
+        
+        Returns:
+            Id of the stored (or reused) snapshot
+        
+        Raises:
+            sqlite3.IntegrityError: If a plan, region or OS id (or a plan's
+                location) occurs twice
+        """
+        taken_at = taken_at or datetime.now().isoformat(timespec="seconds")
+        latest = self.latest_snapshot()
+        with self.conn:
+            if latest and latest["content_hash"] == content_hash:
+                self.conn.execute(
+                    "UPDATE snapshots SET last_seen_at = ? WHERE id = ?",
+                    (taken_at, latest["id"])
+                )
+                return latest["id"]
+            
+            cursor = self.conn.execute(
+                "INSERT INTO snapshots (taken_at, last_seen_at, content_hash, "
+                "plan_count, region_count, os_count) VALUES (?, ?, ?, ?, ?, ?)",
+                (taken_at, taken_at, content_hash, len(plans), len(regions), len(os_list))
+            )
+            snapshot_id = cursor.lastrowid
+            
+            self.conn.executemany(
+                "INSERT INTO plans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((snapshot_id, p.id, p.type, p.vcpu_count, p.ram, p.disk, p.bandwidth,
+                  p.monthly_cost, json.dumps(p.extra, ensure_ascii=False)) for p in plans)
+            )
+            self.conn.executemany(
+                "INSERT INTO plan_locations VALUES (?, ?, ?, ?)",
+                ((snapshot_id, p.id, region_id, position)
+                 for p in plans for position, region_id in enumerate(p.locations))
+            )
+            self.conn.executemany(
+                "INSERT INTO regions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((snapshot_id, r.id, r.city, r.country, r.continent,
+                  json.dumps(list(r.options)), json.dumps(r.extra, ensure_ascii=False))
+                 for r in regions)
+            )
+            self.conn.executemany(
+                "INSERT INTO os VALUES (?, ?, ?, ?, ?, ?)",
+                ((snapshot_id, o.id, o.name, o.arch, o.family,
+                  json.dumps(o.extra, ensure_ascii=False)) for o in os_list)
+            )
+        return snapshot_id
+    
+    def snapshots(self) -> List[Dict[str, Any]]:
+        """Return all snapshots, oldest first."""
+        rows = self.conn.execute("SELECT * FROM snapshots ORDER BY taken_at, id")
+        return [dict(row) for row in rows]
+    
+    def latest_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Return the most recent snapshot, or None if the store is empty."""
+        row = self.conn.execute(
+            "SELECT * FROM snapshots ORDER BY taken_at DESC, id DESC LIMIT 1"
+        ).fetchone()
+        return dict(row) if row else None
+    
+    def snapshot_as_of(self, when: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the snapshot that was current at a point in time.
+        
+        Args:
+            when: ISO date or timestamp (e.g. '2026-01-15' or '2026-01-15T12:00:00')
+        
+        Returns:
+            Latest snapshot taken at or before ``when``, or None
+        """
+        if len(when) == 10:
+            when = f"{when}T23:59:59"
+        row = self.conn.execute(
+            "SELECT * FROM snapshots WHERE taken_at <= ? ORDER BY taken_at DESC, id DESC LIMIT 1",
+            (when,)
+        ).fetchone()
+        return dict(row) if row else None
+    
+    def load(self, snapshot_id: int) -> Tuple[List[Plan], List[Region], List[OperatingSystem]]:
+        """
+        Load the records of a snapshot.
+        
+        Args:
+            snapshot_id: Snapshot id
+        
+        Returns:
+            Tuple of (plans, regions, os_list)
+        """
+        locations: Dict[str, List[str]] = {}
+        for row in self.conn.execute(
+                "SELECT plan_id, region_id FROM plan_locations WHERE snapshot_id = ? "
+                "ORDER BY plan_id, position", (snapshot_id,)):
+            locations.setdefault(row["plan_id"], []).append(row["region_id"])
+        
+        plans = [
+            Plan(id=row["id"], type=row["type"], vcpu_count=row["vcpu_count"], ram=row["ram"],
+                 disk=row["disk"], bandwidth=row["bandwidth"], monthly_cost=row["monthly_cost"],
+                 locations=tuple(locations.get(row["id"], ())), extra=json.loads(row["extra"]))
+            for row in self.conn.execute(
+                "SELECT * FROM plans WHERE snapshot_id = ? ORDER BY rowid", (snapshot_id,))
+        ]
+        regions = [
+            Region(id=row["id"], city=row["city"], country=row["country"],
+                   continent=row["continent"], options=tuple(json.loads(row["options"])),
+                   extra=json.loads(row["extra"]))
+            for row in self.conn.execute(
+                "SELECT * FROM regions WHERE snapshot_id = ? ORDER BY rowid", (snapshot_id,))
+        ]
+        os_list = [
+            OperatingSystem(id=row["id"], name=row["name"], arch=row["arch"],
+                            family=row["family"], extra=json.loads(row["extra"]))
+            for row in self.conn.execute(
+                "SELECT * FROM os WHERE snapshot_id = ? ORDER BY rowid", (snapshot_id,))
+        ]
+        return plans, regions, os_list
+    
+    def load_latest(self) -> Tuple[List[Plan], List[Region], List[OperatingSystem]]:
+        """
+        Load the records of the most recent snapshot.
+        
+        Raises:
+            LookupError: If the store has no snapshots
+        """
+        latest = self.latest_snapshot()
+        if latest is None:
+            raise LookupError(f"No snapshots in {self.db_path}")
+        return self.load(latest["id"])
+    
+    def price_history(self, plan_id: str) -> List[Dict[str, Any]]:
+        """
+        Return the monthly cost of a plan across all snapshots.
+        
+        Args:
+            plan_id: Plan id (e.g. 'vc2-1c-1gb')
+        
+        Returns:
+            List of {'taken_at', 'last_seen_at', 'monthly_cost'}, oldest first
+        """
+        rows = self.conn.execute(
+            "SELECT s.taken_at, s.last_seen_at, p.monthly_cost FROM plans p "
+            "JOIN snapshots s ON s.id = p.snapshot_id WHERE p.id = ? ORDER BY s.taken_at, s.id",
+            (plan_id,)
+        )
+        return [dict(row) for row in rows]
+    
+    def import_json(self, json_path: str) -> int:
+        """
+        Import a vultr_resources_*.json snapshot file (possibly compressed).
+        
+        Args:
+            json_path: Path to the snapshot file
+        
+        Returns:
+            Id of the stored (or reused) snapshot
+        """
+        keys = {key: kind for kind, (key, _) in RECORD_KINDS.items()}
+        records = {kind: [] for kind in RECORD_KINDS}
+        timestamp = ""
+        for key, item in iter_json_arrays(json_path, ("timestamp",) + tuple(keys)):
+            if key == "timestamp":
+                timestamp = item
+            else:
+                kind = keys[key]
+                records[kind].append(RECORD_KINDS[kind][1].from_api(item))
+        plans, regions, os_list = records["plans"], records["regions"], records["os"]
+        return self.save_snapshot(
+            plans, regions, os_list,
+            catalog_hash(plans, regions, os_list),
+            taken_at=timestamp[:19] or None
+        )
+
+
+def main():
+    """Main function to inspect or populate a catalog database"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Inspect or populate the SQLite Vultr catalog store"
+    )
+    parser.add_argument("--db", required=True, help="Path to the SQLite database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    subparsers.add_parser("snapshots", help="List stored snapshots")
+    history = subparsers.add_parser("history", help="Show the price history of a plan")
+    history.add_argument("plan_id", help="Plan id (e.g. vc2-1c-1gb)")
+    import_parser = subparsers.add_parser("import", help="Import vultr_resources_*.json files")
+    import_parser.add_argument("json_files", nargs="+", help="Snapshot JSON files, oldest first")
+    
+    args = parser.parse_args()
+    
+    with CatalogStore(args.db) as store:
+        if args.command == "snapshots":
+            for snap in store.snapshots():
+                print(f"{snap['id']:>5}  {snap['taken_at']}  (last seen {snap['last_seen_at']})  "
+                      f"plans={snap['plan_count']} regions={snap['region_count']} "
+                      f"os={snap['os_count']}  {snap['content_hash'][:12]}")
+        elif args.command == "history":
+            rows = store.price_history(args.plan_id)
+            if not rows:
+                print(f"No history for plan {args.plan_id}", file=sys.stderr)
+                sys.exit(1)
+            for row in rows:
+                print(f"{row['taken_at']} .. {row['last_seen_at']}  ${row['monthly_cost']}")
+        elif args.command == "import":
+            for json_file in args.json_files:
+                snapshot_id = store.import_json(json_file)
+                print(f"Imported {json_file} as snapshot {snapshot_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Vultr Catalog Columnar Export
+Writes plans, regions, operating systems and the exploded plan -> location
+table as typed columnar files for analysis tools (pandas, polars, DuckDB).
+
+Two formats are supported, both through the optional pyarrow package:
+- 'arrow': Arrow IPC files (.arrow, the Feather v2 format), left
+  uncompressed so readers can memory-map them without copying
+- 'parquet': Parquet files (.parquet), compressed per column
+
+Modelled fields get fixed column types (ints, floats, lists of strings);
+extra API fields are added as columns with the type pyarrow infers. Either
+kind of column falls back to strings when its values don't fit one type.
+"""
+
+import json
+import sys
+from typing import Any, List, Optional, Sequence, Tuple
+
+from vultr_records import OperatingSystem, Plan, Record, Region
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only needed for columnar output
+    pa = None
+    pq = None
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+FILE_EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+# --compress value -> Parquet codec
+PARQUET_CODECS = {"gzip": "gzip", "zstd": "zstd"}
+
+
+def columnar_available() -> bool:
+    """Return True if pyarrow is installed."""
+    return pa is not None
+
+
+def _schemas():
+    """Column types of the modelled fields, per table."""
+    names = pa.list_(pa.string())
+    return {
+        "plans": [("id", pa.string()), ("type", pa.string()), ("vcpu_count", pa.int64()),
+                  ("ram", pa.int64()), ("disk", pa.int64()), ("bandwidth", pa.int64()),
+                  ("monthly_cost", pa.float64()), ("locations", names)],
+        "regions": [("id", pa.string()), ("city", pa.string()), ("country", pa.string()),
+                    ("continent", pa.string()), ("options", names)],
+        "os": [("id", pa.int64()), ("name", pa.string()), ("arch", pa.string()),
+               ("family", pa.string())],
+    }
+
+
+def _string_column(values: List[Any]) -> "pa.Array":
+    """Build a string column, writing non-string values as JSON."""
+    return pa.array([value if value is None or isinstance(value, str)
+                     else json.dumps(value, ensure_ascii=False) for value in values],
+                    type=pa.string())
+
+
+def _typed_column(values: List[Any], column_type) -> "pa.Array":
+    """
+    Build a column of a fixed type, accepting whole floats in int columns.
+    Values that don't fit the type (e.g. 2.5 or 'n/a' in an int column)
+    turn the column into strings rather than failing the export.
+    """
+    if pa.types.is_integer(column_type):
+        # pyarrow would silently truncate 2.5 to 2
+        if any(isinstance(value, float) and not value.is_integer() for value in values):
+            return _string_column(values)
+        values = [int(value) if isinstance(value, float) else value for value in values]
+    try:
+        return pa.array(values, type=column_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return _string_column(values)
+
+
+def _extra_column(values: List[Any]) -> "pa.Array":
+    """Build a column for an extra field, falling back to strings."""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return _string_column(values)
+
+
+def records_table(records: Sequence[Record], kind: str) -> "pa.Table":
+    """
+    Convert records to an Arrow table.
+    
+    Args:
+        records: Plan, Region or OperatingSystem records
+        kind: 'plans', 'regions' or 'os'
+    
+    Returns:
+        Table with the modelled fields first, then the sorted extra fields
+    """
+    columns = {}
+    for name, column_type in _schemas()[kind]:
+        columns[name] = _typed_column([getattr(record, name) for record in records], column_type)
+    for key in sorted({key for record in records for key in record.extra}):
+        columns[key] = _extra_column([record.extra.get(key) for record in records])
+    return pa.table(columns)
+
+
+def plan_locations_table(plans: Sequence[Plan]) -> "pa.Table":
+    """
+    Build the exploded plan -> location table (one row per plan and region).
+    
+    Args:
+        plans: Plan records
+    
+    Returns:
+        Table with plan_id and region_id columns
+    """
+    plan_ids = []
+    region_ids = []
+    for plan in plans:
+        for location in plan.locations:
+            plan_ids.append(plan.id)
+            region_ids.append(location)
+    return pa.table({"plan_id": pa.array(plan_ids, type=pa.string()),
+                     "region_id": pa.array(region_ids, type=pa.string())})
+
+
+def write_table(table: "pa.Table", path: str, fmt: str, compression: Optional[str] = None):
+    """
+    Write a table in a columnar format.
+    
+    Args:
+        table: Arrow table
+        path: Output file
+        fmt: 'parquet' or 'arrow'
+        compression: 'gzip' or 'zstd' for Parquet (default: snappy);
+            Arrow IPC files are never compressed
+    """
+    if fmt == "parquet":
+        pq.write_table(table, path, compression=PARQUET_CODECS.get(compression or "", "snappy"))
+    elif fmt == "arrow":
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Unknown columnar format: {fmt}")
+
+
+def save_columnar(plans: Sequence[Plan], regions: Sequence[Region],
+                  os_list: Sequence[OperatingSystem], output_dir: str, timestamp: str,
+                  fmt: str, compression: Optional[str] = None) -> List[Tuple[str, str, int]]:
+    """
+    Write the catalog as columnar files, one per table.
+    
+    Args:
+        plans: Plan records
+        regions: Region records
+        os_list: OperatingSystem records
+        output_dir: Directory to write to
+        timestamp: Snapshot timestamp used in the file names
+        fmt: 'parquet' or 'arrow'
+        compression: Parquet codec requested with --compress
+    
+    Returns:
+        List of (kind, file name, rows) for the files written; files that
+        could not be written are reported and left out
+    """
+    if pa is None:
+        raise RuntimeError(f"{fmt} output requires the pyarrow package (pip install pyarrow)")
+    tables = (
+        ("plans", records_table(plans, "plans")),
+        ("regions", records_table(regions, "regions")),
+        ("os", records_table(os_list, "os")),
+        ("plan_locations", plan_locations_table(plans)),
+    )
+    written = []
+    for kind, table in tables:
+        name = f"vultr_{kind}_{timestamp}.{FILE_EXTENSIONS[fmt]}"
+        try:
+            write_table(table, f"{output_dir}/{name}", fmt, compression)
+        except (OSError, pa.ArrowException) as e:
+            print(f"Error saving to {output_dir}/{name}: {e}", file=sys.stderr)
+            continue
+        print(f"Data saved to {output_dir}/{name}")
+        written.append((kind, name, table.num_rows))
+    return written
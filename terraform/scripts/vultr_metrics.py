@@ -0,0 +1,267 @@
+"""
+Vultr Metrics
+Structured instrumentation for the retriever and the docs updater: per
+endpoint request latency histograms, time to first byte, JSON decode time,
+bytes in and out, retries and cache results, plus wall-clock timings of
+processing stages (fetch, write_json, render, ...).
+
+Everything is kept in memory and can be exported as:
+- JSON lines: one event per request and per stage, appended to a log file
+  as it happens
+- a Prometheus textfile-collector file for node_exporter, written when the
+  run finishes and replaced atomically so it is never read half-written
+
+requests does not expose DNS/connect/TLS timings separately; they are part
+of the time to first byte, together with the server's processing time.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Metric name -> (Prometheus type, help text)
+METRICS = {
+    "vultr_http_request_duration_seconds": ("histogram", "API request time including retries, download and decode"),
+    "vultr_http_ttfb_seconds_total": ("counter", "Time to response headers (DNS, connect, TLS and server time)"),
+    "vultr_json_decode_seconds_total": ("counter", "Time spent decoding JSON responses"),
+    "vultr_http_requests_total": ("counter", "API requests by final status"),
+    "vultr_http_request_bytes_total": ("counter", "Approximate request bytes sent (request line and headers)"),
+    "vultr_http_response_bytes_total": ("counter", "Response body bytes received, as sent on the wire"),
+    "vultr_http_retries_total": ("counter", "Retried API requests (429, 5xx and network errors)"),
+    "vultr_cache_lookups_total": ("counter", "Response cache results: hit, miss, revalidated, refreshed or stale"),
+    "vultr_stage_duration_seconds": ("gauge", "Wall-clock time of a processing stage in the last run"),
+    "vultr_run_duration_seconds": ("gauge", "Wall-clock time of the last run"),
+    "vultr_last_run_success": ("gauge", "1 if the last run succeeded, else 0"),
+    "vultr_last_run_timestamp_seconds": ("gauge", "Unix time the last run finished"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def endpoint_label(endpoint: str) -> str:
+    """
+    Collapse ids in an API path so metric labels stay low-cardinality.
+    
+    Args:
+        endpoint: Path relative to the API base (e.g. 'instances/abc/bandwidth')
+    
+    Returns:
+        Label value (e.g. 'instances/{id}/bandwidth')
+    """
+    parts = endpoint.strip("/").split("/")
+    return "/".join("{id}" if i % 2 else part for i, part in enumerate(parts))
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value at full precision (integral values without '.0')."""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metrics:
+    """Thread-safe in-memory metrics with JSON-lines and Prometheus output"""
+    
+    def __init__(self, job: str, log_path: Optional[str] = None):
+        """
+        Initialize the metrics of one run.
+        
+        Args:
+            job: Name of the program, added as the 'job' label/field
+            log_path: Append JSON-lines events to this file (disabled if
+                None); its directory is created if missing
+        
+        Raises:
+            OSError: If the log file cannot be opened
+        """
+        self.job = job
+        self.log_path = log_path
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._log = None
+        if log_path:
+            # The log may go into an output directory this run creates
+            directory = os.path.dirname(os.path.abspath(log_path))
+            os.makedirs(directory, exist_ok=True)
+            self._log = open(log_path, 'a', encoding='utf-8', buffering=1)
+        self._values: Dict[str, Dict[Labels, float]] = {}
+        # name -> labels -> [count per bucket..., sum, count]
+        self._histograms: Dict[str, Dict[Labels, List[float]]] = {}
+        # Called with (stage, seconds) after each stage, e.g. by the profiler
+        self.on_stage: Optional[Callable[[str, float], None]] = None
+    
+    def __reduce__(self):
+        # Locks and files can't be pickled: worker processes get an empty,
+        # log-less instance and report their timings back to the parent
+        return (Metrics, (self.job,))
+    
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+    
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Add value to a counter."""
+        key = self._labels(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+    
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge."""
+        with self._lock:
+            self._values.setdefault(name, {})[self._labels(labels)] = value
+    
+    def observe(self, name: str, value: float, **labels):
+        """Record a value in a histogram with LATENCY_BUCKETS."""
+        key = self._labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            counts = series.get(key)
+            if counts is None:
+                counts = series[key] = [0.0] * (len(LATENCY_BUCKETS) + 2)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+    
+    def event(self, event: str, **fields):
+        """Append an event to the JSON-lines log, if one is configured."""
+        if self._log is None:
+            return
+        line = json.dumps(dict({"ts": round(time.time(), 6), "job": self.job, "event": event}, **fields),
+                          default=str)
+        with self._lock:
+            self._log.write(line + "\n")
+    
+    def cache(self, endpoint: str, result: str):
+        """Record a response cache lookup ('hit', 'miss', 'revalidated', ...)."""
+        self.inc("vultr_cache_lookups_total", endpoint=endpoint, result=result)
+        if result == "hit":
+            self.event("cache_hit", endpoint=endpoint)
+    
+    def request(self, endpoint: str, status: Any, seconds: float, ttfb: float = 0.0,
+                decode: float = 0.0, bytes_in: int = 0, bytes_out: int = 0, retries: int = 0):
+        """
+        Record one API request (after its retries).
+        
+        Args:
+            endpoint: Endpoint label (see endpoint_label)
+            status: Final HTTP status, or 'error'
+            seconds: Total time including retries, download and decode
+            ttfb: Time to the final response's headers
+            decode: Time spent decoding the JSON body
+            bytes_in: Response body bytes received
+            bytes_out: Approximate request bytes sent
+            retries: Number of retries
+        """
+        self.observe("vultr_http_request_duration_seconds", seconds, endpoint=endpoint)
+        self.inc("vultr_http_requests_total", endpoint=endpoint, status=status)
+        self.inc("vultr_http_ttfb_seconds_total", ttfb, endpoint=endpoint)
+        self.inc("vultr_json_decode_seconds_total", decode, endpoint=endpoint)
+        self.inc("vultr_http_response_bytes_total", bytes_in, endpoint=endpoint)
+        self.inc("vultr_http_request_bytes_total", bytes_out, endpoint=endpoint)
+        self.event("request", endpoint=endpoint, status=status, seconds=round(seconds, 6),
+                   ttfb=round(ttfb, 6), decode=round(decode, 6), bytes_in=bytes_in,
+                   bytes_out=bytes_out, retries=retries)
+    
+    def record_stage(self, stage: str, seconds: float, ok: bool = True):
+        """Record the wall-clock time of a stage timed elsewhere."""
+        self.set("vultr_stage_duration_seconds", seconds, stage=stage)
+        self.event("stage", stage=stage, seconds=round(seconds, 6), ok=ok)
+        if self.on_stage is not None:
+            self.on_stage(stage, seconds)
+    
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as a stage."""
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record_stage(stage, time.perf_counter() - start, ok)
+    
+    def stages(self) -> Dict[str, float]:
+        """Return the recorded stage timings in seconds."""
+        with self._lock:
+            series = self._values.get("vultr_stage_duration_seconds", {})
+            return {dict(labels)["stage"]: value for labels, value in series.items()}
+    
+    def prometheus_text(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, (metric_type, help_text) in METRICS.items():
+                values = self._values.get(name, {})
+                histograms = self._histograms.get(name, {})
+                if not values and not histograms:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in sorted(values.items()):
+                    lines.append(f"{name}{self._format_labels(labels)} {_format_value(value)}")
+                for labels, counts in sorted(histograms.items()):
+                    cumulative = 0.0
+                    for bound, count in zip(LATENCY_BUCKETS, counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{self._format_labels(labels, le=f'{bound:g}')} "
+                                     f"{_format_value(cumulative)}")
+                    lines.append(f"{name}_bucket{self._format_labels(labels, le='+Inf')} {_format_value(counts[-1])}")
+                    lines.append(f"{name}_sum{self._format_labels(labels)} {_format_value(counts[-2])}")
+                    lines.append(f"{name}_count{self._format_labels(labels)} {_format_value(counts[-1])}")
+        return "\n".join(lines) + "\n"
+    
+    def _format_labels(self, labels: Labels, **extra: str) -> str:
+        pairs = [("job", self.job)] + list(labels) + list(extra.items())
+        return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+    
+    def write_prometheus(self, path: str):
+        """
+        Atomically write the metrics for node_exporter's textfile collector
+        (the file name must end in .prom).
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".vultr_metrics.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    def finish(self, success: bool, textfile: Optional[str] = None):
+        """
+        Record the run's outcome, write the textfile and close the log.
+        
+        Args:
+            success: Whether the run succeeded
+            textfile: Prometheus textfile to write (skipped if None)
+        """
+        duration = time.monotonic() - self.started
+        self.set("vultr_run_duration_seconds", duration)
+        self.set("vultr_last_run_success", 1 if success else 0)
+        self.set("vultr_last_run_timestamp_seconds", time.time())
+        self.event("run", seconds=round(duration, 6), success=success)
+        if textfile:
+            self.write_prometheus(textfile)
+        if self._log is not None:
+            self._log.close()
+            self._log = None
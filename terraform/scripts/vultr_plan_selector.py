@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Vultr Plan Selector
+Picks plan_id, region_id and os_id for terraform/variables.tf from a cached
+catalog, given constraints: minimum vCPUs, RAM and disk, maximum monthly
+cost, plan type, region or country, and OS family.
+
+Matches are answered from the VultrCatalog indexes (cost-ordered plan
+ranks, sorted range arrays and the region -> plans inverted index), so the
+cheapest plans come out already ranked without sorting the plan list.
+
+The catalog is read from local files only: the latest snapshot recorded in
+a retriever output directory (default), a vultr_resources_*.json file, a
+catalog database, or the retriever's response cache. The API is contacted
+only with --fetch, so the selector is safe to run from `terraform plan`.
+
+Output formats:
+- 'tfvars': a terraform.tfvars fragment, with the runners-up as comments
+- 'external': the JSON object expected from a program run by terraform's
+  `external` data source (string values only); the data source's query is
+  read from stdin and overrides the command-line constraints
+- 'json': all ranked matches, for scripts
+"""
+
+import json
+import sys
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from vultr_catalog import VultrCatalog
+from vultr_records import OperatingSystem, Plan, Region
+from vultr_snapshot_index import SnapshotIndex
+
+OUTPUT_FORMATS = ("tfvars", "external", "json")
+
+
+def parse_ram(value: Any) -> int:
+    """
+    Parse a RAM size in MB, accepting 'GB'/'MB' suffixes (e.g. '4gb', '512').
+    
+    Raises:
+        ValueError: If the value is not a size
+    """
+    text = str(value).strip().lower()
+    for suffix, factor in (("gb", 1024), ("g", 1024), ("mb", 1), ("m", 1)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+def _text(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+# Constraint name -> parser for values given as strings (external queries)
+CONSTRAINTS = {
+    "min_vcpu": int,
+    "min_ram": parse_ram,
+    "min_disk": int,
+    "max_cost": float,
+    "plan_type": _text,
+    "region": _text,
+    "country": _text,
+    "os_family": _text,
+    "os_name": _text,
+    "arch": _text,
+}
+
+
+def parse_constraints(values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Parse constraints given as strings, dropping empty ones.
+    
+    Args:
+        values: Constraint name -> value (e.g. an external data source query)
+    
+    Returns:
+        Constraint name -> parsed value
+    
+    Raises:
+        ValueError: For unknown names or unparseable values
+    """
+    parsed = {}
+    for name, value in values.items():
+        if name not in CONSTRAINTS:
+            raise ValueError(f"Unknown constraint '{name}' (expected one of: {', '.join(CONSTRAINTS)})")
+        if value in (None, ""):
+            continue
+        try:
+            parsed[name] = CONSTRAINTS[name](value)
+        except ValueError:
+            raise ValueError(f"Invalid value for {name}: {value!r}") from None
+    return parsed
+
+
+@dataclass
+class Selection:
+    """A plan with the region and operating system chosen for it"""
+    plan: Plan
+    region: Region
+    os: Optional[OperatingSystem] = None
+    
+    def variables(self) -> Dict[str, Any]:
+        """Return the terraform variables for this selection."""
+        values: Dict[str, Any] = {"plan_id": self.plan.id, "region_id": self.region.id}
+        if self.os is not None:
+            values["os_id"] = self.os.id
+        return values
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the variables plus the plan's specs."""
+        return dict(self.variables(), type=self.plan.type, vcpu_count=self.plan.vcpu_count,
+                    ram=self.plan.ram, disk=self.plan.disk, monthly_cost=self.plan.monthly_cost)
+
+
+def pick_os(catalog: VultrCatalog, family: str, name: Optional[str] = None,
+            arch: Optional[str] = "x64") -> OperatingSystem:
+    """
+    Pick the newest operating system image of a family.
+    
+    Args:
+        catalog: Indexed catalog
+        family: OS family (e.g. 'ubuntu', 'debian')
+        name: Optional substring the image name must contain (e.g. '24.04')
+        arch: Required architecture (None for any)
+    
+    Returns:
+        The matching image with the highest id (the most recently added)
+    
+    Raises:
+        LookupError: If no image matches
+    """
+    candidates = [
+        os_item for os_item in catalog.os_by_family(family)
+        if (arch is None or os_item.arch.lower() == arch.lower())
+        and (name is None or name.lower() in os_item.name.lower())
+    ]
+    if not candidates:
+        detail = "".join(f", {label} {value!r}" for label, value in (("name", name), ("arch", arch)) if value)
+        raise LookupError(f"No operating system of family '{family}'{detail}")
+    return max(candidates, key=lambda os_item: os_item.id)
+
+
+def pick_region(catalog: VultrCatalog, plan: Plan, region: Optional[str] = None,
+                country: Optional[str] = None) -> Optional[Region]:
+    """
+    Pick the region to deploy a plan in.
+    
+    Args:
+        catalog: Indexed catalog
+        plan: Selected plan
+        region: Requested region id
+        country: Requested country code
+    
+    Returns:
+        The requested region, else the plan's first location (in the
+        country, if given), or None if the plan is offered nowhere suitable
+    """
+    if region is not None:
+        return catalog.region(region) if region in plan.locations else None
+    for candidate in catalog.regions_for_plan(plan.id):
+        if country is None or candidate.country.upper() == country.upper():
+            return candidate
+    return None
+
+
+def select(catalog: VultrCatalog, min_vcpu: Optional[int] = None, min_ram: Optional[int] = None,
+           min_disk: Optional[int] = None, max_cost: Optional[float] = None,
+           plan_type: Optional[str] = None, region: Optional[str] = None,
+           country: Optional[str] = None, os_family: Optional[str] = None,
+           os_name: Optional[str] = None, arch: Optional[str] = "x64",
+           limit: Optional[int] = 5) -> List[Selection]:
+    """
+    Rank the cheapest plans matching the constraints.
+    
+    Args:
+        catalog: Indexed catalog
+        min_vcpu: Minimum number of vCPUs
+        min_ram: Minimum RAM in MB
+        min_disk: Minimum disk in GB
+        max_cost: Maximum monthly cost in USD
+        plan_type: Plan type (e.g. 'vc2', 'vhf')
+        region: Region id to deploy in
+        country: Country code to deploy in (ignored if region is given)
+        os_family: OS family to pick the image from (no os_id if None)
+        os_name: Substring of the image name (e.g. '24.04')
+        arch: Image architecture (default: x64)
+        limit: Maximum number of selections (None for all)
+    
+    Returns:
+        Selections ordered by monthly cost
+    
+    Raises:
+        LookupError: If the region, country or OS constraints match nothing
+    """
+    if region is not None:
+        if catalog.region(region) is None:
+            raise LookupError(f"Unknown region '{region}'")
+        country = None
+    elif country is not None and not catalog.regions_by_country(country):
+        raise LookupError(f"No regions in country '{country}'")
+    os_item = pick_os(catalog, os_family, os_name, arch) if os_family else None
+    
+    selections = []
+    for plan in catalog.find_plans(min_vcpu=min_vcpu, min_ram=min_ram, min_disk=min_disk,
+                                   max_cost=max_cost, plan_type=plan_type, region=region, country=country):
+        # Plans without a known location can't be deployed
+        chosen = pick_region(catalog, plan, region, country)
+        if chosen is None:
+            continue
+        selections.append(Selection(plan, chosen, os_item))
+        if limit is not None and len(selections) >= limit:
+            break
+    return selections
+
+
+def _describe_plan(plan: Plan) -> str:
+    cost = "price unknown" if plan.monthly_cost is None else f"${plan.monthly_cost:.2f}/mo"
+    return f"{plan.vcpu_count} vCPU, {plan.ram} MB RAM, {plan.disk} GB disk, {cost}"
+
+
+def write_tfvars(out: TextIO, selections: List[Selection], source: str, constraints: Dict[str, Any]):
+    """
+    Write the best selection as a terraform.tfvars fragment.
+    
+    Args:
+        out: Text stream to write to
+        selections: Ranked selections (at least one)
+        source: Description of the catalog the selection was made from
+        constraints: Constraints used, for the header comment
+    """
+    best = selections[0]
+    out.write(f"# Selected by vultr_plan_selector.py from {source}\n")
+    if constraints:
+        out.write("# Constraints: " + ", ".join(f"{name}={value}" for name, value in constraints.items()) + "\n")
+    if len(selections) > 1:
+        out.write("# Runners-up:\n")
+        for selection in selections[1:]:
+            out.write(f"#   {selection.plan.id} in {selection.region.id} ({_describe_plan(selection.plan)})\n")
+    
+    comments = {
+        "plan_id": _describe_plan(best.plan),
+        "region_id": f"{best.region.city}, {best.region.country}",
+        "os_id": best.os.name if best.os else "",
+    }
+    assignments = [(name, json.dumps(value)) for name, value in best.variables().items()]
+    name_width = max(len(name) for name, _ in assignments)
+    value_width = max(len(value) for _, value in assignments)
+    for name, value in assignments:
+        out.write(f"{name.ljust(name_width)} = {value.ljust(value_width)}  # {comments[name]}\n")
+
+
+def external_result(selection: Selection, source: str) -> Dict[str, str]:
+    """
+    Build the result object of a terraform `external` data source.
+    
+    Args:
+        selection: Best selection
+        source: Description of the catalog the selection was made from
+    
+    Returns:
+        Flat mapping of string values
+    """
+    result = {name: str(value) for name, value in selection.to_dict().items()}
+    result["source"] = source
+    return result
+
+
+def load_catalog(args) -> Tuple[VultrCatalog, str]:
+    """
+    Load the catalog named by the command-line arguments.
+    
+    Returns:
+        Tuple of (catalog, description of its source)
+    """
+    if args.json:
+        return VultrCatalog.from_json(args.json), args.json
+    if args.db:
+        from vultr_catalog_store import CatalogStore
+        
+        with CatalogStore(args.db) as store:
+            latest = store.latest_snapshot()
+            plans, regions, os_list = store.load_latest()
+        return VultrCatalog(plans, regions, os_list), f"{args.db} snapshot {latest['taken_at']}"
+    if args.cache_dir or args.fetch:
+        from vultr_resource_retriever import VultrResourceRetriever
+        
+        # Without --fetch, only responses already in the cache are used
+        with VultrResourceRetriever(cache_dir=args.cache_dir, offline=not args.fetch) as retriever:
+            catalog = VultrCatalog.from_retriever(retriever, concurrency=3)
+            if retriever.failed_requests:
+                raise FileNotFoundError(f"The response cache in {args.cache_dir} is incomplete (use --fetch)")
+        return catalog, "the API" if args.fetch else f"the response cache in {args.cache_dir}"
+    
+    entry = SnapshotIndex(args.dir).resolve(args.snapshot)
+    catalog = VultrCatalog.from_snapshot(args.dir, args.snapshot)
+    return catalog, f"snapshot {entry.get('timestamp')}"
+
+
+def main():
+    """Main function to select a plan and print terraform variables"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Select the cheapest Vultr plan, region and OS matching constraints "
+                    "and print them as terraform variables"
+    )
+    parser.add_argument("--min-vcpu", type=int, help="Minimum number of vCPUs")
+    parser.add_argument("--min-ram", type=parse_ram, help="Minimum RAM in MB, or with a GB suffix (e.g. 4gb)")
+    parser.add_argument("--min-disk", type=int, help="Minimum disk in GB")
+    parser.add_argument("--max-cost", type=float, help="Maximum monthly cost in USD")
+    parser.add_argument("--type", dest="plan_type", help="Plan type (e.g. vc2, vhf, vhp)")
+    parser.add_argument("--region", help="Region id to deploy in (e.g. ewr)")
+    parser.add_argument("--country", help="Country code to deploy in (e.g. US); picks a region there")
+    parser.add_argument("--os-family", help="OS family to pick os_id from (e.g. ubuntu)")
+    parser.add_argument("--os-name", help="Substring the OS name must contain (e.g. 24.04)")
+    parser.add_argument("--arch", default="x64", help="OS architecture (default: x64)")
+    parser.add_argument("--limit", type=int, default=5, help="Number of ranked matches (default: 5)")
+    parser.add_argument("--output", choices=OUTPUT_FORMATS, default="tfvars",
+                        help="Output format (default: tfvars)")
+    parser.add_argument("--dir", default=".",
+                        help="Output directory of vultr_resource_retriever.py (default: current directory)")
+    parser.add_argument("--snapshot", default="latest",
+                        help="Snapshot to read from --dir: 'latest', 'previous' or a timestamp (default: latest)")
+    parser.add_argument("--json", metavar="PATH", help="Read a vultr_resources_*.json file instead of --dir")
+    parser.add_argument("--db", help="Read the latest snapshot of a catalog database instead of --dir")
+    parser.add_argument("--cache-dir", help="Read the retriever's response cache instead of --dir")
+    parser.add_argument("--fetch", action="store_true",
+                        help="Allow fetching the catalog from the API (through --cache-dir if given)")
+    
+    args = parser.parse_args()
+    
+    constraints = {name: getattr(args, name) for name in CONSTRAINTS if getattr(args, name) is not None}
+    if not args.os_family:
+        constraints.pop("arch")
+    try:
+        if args.output == "external" and not sys.stdin.isatty():
+            # terraform passes the data source's query as a JSON object on stdin
+            query = json.loads(sys.stdin.read() or "{}")
+            if not isinstance(query, dict):
+                raise ValueError("The external data source query must be a JSON object")
+            constraints.update(parse_constraints(query))
+        # Keep stdout for the result; the retriever reports progress there
+        with redirect_stdout(sys.stderr):
+            catalog, source = load_catalog(args)
+        selections = select(catalog, limit=max(args.limit, 1), **constraints)
+    except (FileNotFoundError, LookupError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not selections:
+        detail = ", ".join(f"{name}={value}" for name, value in constraints.items()) or "none"
+        print(f"Error: No plan in {source} matches the constraints ({detail})", file=sys.stderr)
+        sys.exit(1)
+    
+    if args.output == "tfvars":
+        write_tfvars(sys.stdout, selections, source, constraints)
+    elif args.output == "external":
+        json.dump(external_result(selections[0], source), sys.stdout)
+        print()
+    else:
+        json.dump({"source": source, "constraints": constraints,
+                   "matches": [selection.to_dict() for selection in selections]}, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Vultr Profiler
+Profiling mode (--profile DIR) for the retriever and the docs updater: one
+run writes everything needed to find out where the time and memory went.
+
+Files written to DIR, named <job>_YYYYMMDD_HHMMSS.*:
+- .pstats: cProfile statistics of the main thread, for pstats or snakeviz
+- .collapsed: stack samples of all threads in the collapsed format read by
+  flamegraph.pl, speedscope and inferno
+- .txt: report with the wall-clock stage breakdown (from Metrics), the top
+  functions by cumulative time and the top allocation sites (tracemalloc)
+  at the end of the stage that held the most memory
+
+cProfile only sees the thread that started it, so time spent in worker
+threads shows up in the stack samples but not in the pstats file. Worker
+processes (update_vultr_docs.py --workers > 1) are seen by neither; their
+stage timings are still reported.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from vultr_metrics import Metrics
+
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class StackSampler:
+    """Periodically samples the Python stacks of all other threads"""
+    
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        """
+        Initialize the sampler.
+        
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Start sampling in a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, "thread"))
+                self.samples[";".join(reversed(stack))] += 1
+    
+    def collapsed(self) -> str:
+        """Return the samples in collapsed-stack format ('a;b;c count' lines)."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+
+class Profiler:
+    """Context manager profiling CPU time and allocations of the enclosed block"""
+    
+    def __init__(self, directory: str, metrics: Metrics, notes: Optional[List[str]] = None):
+        """
+        Initialize the profiler.
+        
+        Args:
+            directory: Directory to write the profile files to (created if
+                missing)
+            metrics: Metrics of the run, for the job name and stage timings
+            notes: Lines added to the top of the report (e.g. what the
+                profile can't see)
+        """
+        self.directory = directory
+        self.metrics = metrics
+        self.notes = list(notes or [])
+        self.prefix = os.path.join(directory, f"{metrics.job}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        self._profile = cProfile.Profile()
+        self._sampler = StackSampler()
+        self._started = 0.0
+        self._tracing = False
+        # (traced bytes, stage, snapshot) at the stage end holding the most memory
+        self._largest = None
+    
+    def __enter__(self) -> "Profiler":
+        os.makedirs(self.directory, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        self._started = time.perf_counter()
+        self._sampler.start()
+        self.metrics.on_stage = self._stage_done
+        self._profile.enable()
+        return self
+    
+    def _stage_done(self, stage: str, seconds: float):
+        current, _ = tracemalloc.get_traced_memory()
+        if self._largest is None or current > self._largest[0]:
+            self._largest = (current, stage, tracemalloc.take_snapshot())
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        self._sampler.stop()
+        self.metrics.on_stage = None
+        elapsed = time.perf_counter() - self._started
+        self._stage_done("end of run", 0.0)
+        _, peak = tracemalloc.get_traced_memory()
+        if self._tracing:
+            tracemalloc.stop()
+        if exc_type is SystemExit:
+            if exc.code:
+                self.notes.append(f"the run exited with status {exc.code}")
+        elif exc_type is not None:
+            self.notes.append(f"the run failed: {exc_type.__name__}: {exc}")
+        
+        self._profile.dump_stats(self.prefix + ".pstats")
+        with open(self.prefix + ".collapsed", 'w', encoding='utf-8') as f:
+            f.write(self._sampler.collapsed())
+        with open(self.prefix + ".txt", 'w', encoding='utf-8') as f:
+            f.write(self.report(elapsed, self.metrics.stages(), peak))
+        print(f"Profile written to {self.prefix}.{{txt,pstats,collapsed}}", file=sys.stderr)
+        return False
+    
+    def report(self, elapsed: float, stages: Dict[str, float], peak: int) -> str:
+        """
+        Render the text report.
+        
+        Args:
+            elapsed: Wall-clock seconds of the profiled block
+            stages: Stage name -> seconds (see Metrics.stages)
+            peak: Peak traced memory in bytes
+        
+        Returns:
+            Report text
+        """
+        out = io.StringIO()
+        out.write(f"Profile of {self.metrics.job}: {elapsed:.3f}s wall clock, "
+                  f"{sum(self._sampler.samples.values())} stack samples, "
+                  f"peak traced memory {peak / 1024 / 1024:.1f} MiB\n")
+        for note in self.notes:
+            out.write(f"Note: {note}\n")
+        
+        out.write("\nStages (wall clock, in the order they finished; nested stages overlap)\n")
+        width = max((len(stage) for stage in stages), default=0)
+        for stage, seconds in stages.items():
+            share = seconds / elapsed * 100 if elapsed else 0.0
+            out.write(f"  {stage:<{width}}  {seconds:9.3f}s  {share:5.1f}%\n")
+        if not stages:
+            out.write("  (none recorded)\n")
+        
+        out.write(f"\nTop {TOP_FUNCTIONS} functions by cumulative time (main thread)\n")
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+        
+        traced, stage, snapshot = self._largest
+        out.write(f"Top {TOP_ALLOCATIONS} allocation sites after '{stage}' "
+                  f"({traced / 1024 / 1024:.1f} MiB traced)\n")
+        statistics = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        )).statistics("lineno")
+        for stat in statistics[:TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            out.write(f"  {stat.size / 1024:10.1f} KiB  {stat.count:8d} blocks  "
+                      f"{os.path.basename(frame.filename)}:{frame.lineno}\n")
+        return out.getvalue()
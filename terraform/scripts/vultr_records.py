@@ -0,0 +1,249 @@
+"""
+Vultr Catalog Record Types
+Typed, compact records for plans, regions and operating systems.
+
+Records are parsed once when they are fetched (or read back from CSV), so
+numeric fields are real numbers and list fields are tuples. Numeric fields the
+API did not send are None and left out of to_dict(), so a record converts back
+to the fields it was built from. Fields that are not modelled explicitly are
+kept in ``extra`` so no API data is dropped.
+"""
+
+import ast
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+Number = Union[int, float]
+
+
+def to_number(value: Any) -> Optional[Number]:
+    """
+    Parse an API or CSV value as a number, keeping ints as ints.
+    
+    Args:
+        value: Raw value (number, numeric string, empty or None)
+    
+    Returns:
+        Parsed number, None if the value is missing, or 0 if it is not
+        numeric
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def to_tuple(value: Any) -> Tuple[str, ...]:
+    """
+    Parse an API list, or its stringified CSV form, as a tuple of strings.
+    
+    Args:
+        value: List, tuple, "['a', 'b']" string, comma-separated string or None
+    
+    Returns:
+        Tuple of string items
+    """
+    if value is None or value == '':
+        return ()
+    if isinstance(value, (list, tuple)):
+        return tuple(str(item) for item in value)
+    text = str(value).strip()
+    if text.startswith('['):
+        try:
+            return tuple(str(item) for item in ast.literal_eval(text))
+        except (ValueError, SyntaxError):
+            text = text.strip('[]').replace("'", "").replace('"', '')
+    return tuple(item.strip() for item in text.split(',') if item.strip())
+
+
+class Record:
+    """Base class for catalog records"""
+    
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    LIST_FIELDS: Tuple[str, ...] = ()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the record to a plain dictionary with 'id' as first key.
+        
+        Returns:
+            Dictionary of modelled fields followed by extra fields, without
+            the modelled fields that are None (not sent by the API)
+        """
+        data = {}
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            data[name] = list(value) if isinstance(value, tuple) else value
+        data.update(self.extra)
+        return data
+
+
+@dataclass
+class Plan(Record):
+    """A Vultr plan (resource code)"""
+    
+    __slots__ = ("id", "type", "vcpu_count", "ram", "disk", "bandwidth",
+                 "monthly_cost", "locations", "extra")
+    FIELDS = ("id", "type", "vcpu_count", "ram", "disk", "bandwidth",
+              "monthly_cost", "locations")
+    LIST_FIELDS = ("locations",)
+    
+    id: str
+    type: str
+    vcpu_count: Optional[int]
+    ram: Optional[int]
+    disk: Optional[int]
+    bandwidth: Optional[int]
+    monthly_cost: Optional[Number]
+    locations: Tuple[str, ...]
+    extra: Dict[str, Any]
+    
+    @classmethod
+    def from_api(cls, item: Dict[str, Any]) -> "Plan":
+        """
+        Build a plan from an API item or CSV row.
+        
+        Args:
+            item: Plan dictionary
+        
+        Returns:
+            Parsed plan
+        """
+        return cls(
+            id=str(item.get('id', '')),
+            type=item.get('type', '') or '',
+            vcpu_count=to_number(item.get('vcpu_count')),
+            ram=to_number(item.get('ram')),
+            disk=to_number(item.get('disk')),
+            bandwidth=to_number(item.get('bandwidth')),
+            monthly_cost=to_number(item.get('monthly_cost')),
+            locations=to_tuple(item.get('locations')),
+            extra={k: v for k, v in item.items() if k not in cls.FIELDS},
+        )
+
+
+@dataclass
+class Region(Record):
+    """A Vultr region (data center location)"""
+    
+    __slots__ = ("id", "city", "country", "continent", "options", "extra")
+    FIELDS = ("id", "city", "country", "continent", "options")
+    LIST_FIELDS = ("options",)
+    
+    id: str
+    city: str
+    country: str
+    continent: str
+    options: Tuple[str, ...]
+    extra: Dict[str, Any]
+    
+    @classmethod
+    def from_api(cls, item: Dict[str, Any]) -> "Region":
+        """
+        Build a region from an API item or CSV row.
+        
+        Args:
+            item: Region dictionary
+        
+        Returns:
+            Parsed region
+        """
+        return cls(
+            id=str(item.get('id', '')),
+            city=item.get('city', '') or '',
+            country=item.get('country', '') or '',
+            continent=item.get('continent', '') or '',
+            options=to_tuple(item.get('options')),
+            extra={k: v for k, v in item.items() if k not in cls.FIELDS},
+        )
+
+
+@dataclass
+class OperatingSystem(Record):
+    """A Vultr operating system image"""
+    
+    __slots__ = ("id", "name", "arch", "family", "extra")
+    FIELDS = ("id", "name", "arch", "family")
+    
+    id: int
+    name: str
+    arch: str
+    family: str
+    extra: Dict[str, Any]
+    
+    @classmethod
+    def from_api(cls, item: Dict[str, Any]) -> "OperatingSystem":
+        """
+        Build an operating system from an API item or CSV row.
+        
+        Args:
+            item: OS dictionary
+        
+        Returns:
+            Parsed operating system
+        """
+        return cls(
+            id=to_number(item.get('id')),
+            name=item.get('name', '') or '',
+            arch=item.get('arch', '') or '',
+            family=item.get('family', '') or '',
+            extra={k: v for k, v in item.items() if k not in cls.FIELDS},
+        )
+
+
+def catalog_hashes(plans: Iterable[Plan], regions: Iterable[Region],
+                   os_list: Iterable[OperatingSystem]) -> Tuple[str, Dict[str, str]]:
+    """
+    Hash the canonicalized catalog (sorted keys and ids, no timestamp) and
+    each of its parts in a single pass.
+    
+    Args:
+        plans: Plan records
+        regions: Region records
+        os_list: OperatingSystem records
+    
+    Returns:
+        Tuple of (catalog hex digest, {'plans'|'regions'|'os': hex digest})
+    """
+    digest = hashlib.sha256()
+    parts = {}
+    for kind, name, items in (("plans", "plans", plans), ("regions", "regions", regions),
+                              ("os", "operating_systems", os_list)):
+        part = hashlib.sha256()
+        digest.update(name.encode('utf-8'))
+        for item in sorted(items, key=lambda x: str(x.id)):
+            data = json.dumps(item.to_dict(), sort_keys=True, separators=(',', ':'),
+                              ensure_ascii=False).encode('utf-8') + b"\n"
+            digest.update(data)
+            part.update(data)
+        parts[kind] = part.hexdigest()
+    return digest.hexdigest(), parts
+
+
+def catalog_hash(plans: Iterable[Plan], regions: Iterable[Region],
+                 os_list: Iterable[OperatingSystem]) -> str:
+    """
+    Hash the canonicalized catalog (sorted keys and ids, no timestamp).
+    
+    Args:
+        plans: Plan records
+        regions: Region records
+        os_list: OperatingSystem records
+    
+    Returns:
+        Hex SHA-256 digest of the catalog content
+    """
+    return catalog_hashes(plans, regions, os_list)[0]
@@ -5,171 +5,933 @@ This script retrieves and saves resource codes, regions, and OS information from
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import hashlib
 import json
 import csv
+import os
+import random
+import sqlite3
 import sys
-from datetime import datetime
-from typing import Dict, List, Any
+import tempfile
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from itertools import chain, islice
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Iterator, Optional, Tuple
+
+from vultr_records import OperatingSystem, Plan, Record, Region, catalog_hash, catalog_hashes
+from vultr_availability import AvailabilityMatrix
+from vultr_metrics import Metrics, endpoint_label
+from vultr_columnar import COLUMNAR_FORMATS, columnar_available, save_columnar
+from vultr_snapshot_index import SnapshotIndex, available_compression, open_snapshot, snapshot_suffix
+
+
+class ResponseCache:
+    """Persistent on-disk cache of API responses with validator headers"""
+    
+    def __init__(self, cache_dir: str, ttl: float):
+        """
+        Initialize the cache.
+        
+        Args:
+            cache_dir: Directory where cached responses are stored
+            ttl: Seconds a cached response is served without revalidation
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+    
+    def _path(self, url: str, params: Optional[Dict[str, Any]], scope: str) -> Path:
+        """
+        Build the cache file path for a request (one file per endpoint and page).
+        
+        Args:
+            url: Request URL
+            params: Query string parameters
+            scope: Extra key material, e.g. a fingerprint of the API key
+        
+        Returns:
+            Path of the cache entry
+        """
+        key = json.dumps([url, sorted((params or {}).items()), scope])
+        return self.cache_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+    
+    def get(self, url: str, params: Optional[Dict[str, Any]], scope: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+        
+        Returns:
+            Cache entry with 'body', 'etag', 'last_modified' and
+            'fetched_at', or None if nothing usable is cached
+        """
+        try:
+            with open(self._path(url, params, scope), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+    
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """Return True if the entry is younger than the TTL."""
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+    
+    def store(self, url: str, params: Optional[Dict[str, Any]], entry: Dict[str, Any], scope: str = ""):
+        """
+        Write a cache entry atomically.
+        
+        Args:
+            url: Request URL
+            params: Query string parameters
+            entry: Entry with 'body', 'etag' and 'last_modified'
+            scope: Extra key material, e.g. a fingerprint of the API key
+        """
+        entry["fetched_at"] = time.time()
+        path = self._path(url, params, scope)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except IOError as e:
+            print(f"Error writing cache entry {path}: {e}", file=sys.stderr)
+
+
+class RequestScheduler:
+    """Token-bucket rate limiter with jittered backoff and a shared retry budget"""
+    
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    
+    def __init__(self, rate: float, max_retries: int, retry_budget: int,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            rate: Maximum requests per second (also the bucket size)
+            max_retries: Maximum retries for a single request
+            retry_budget: Maximum retries across all requests of this scheduler
+            backoff_base: Base delay in seconds for exponential backoff
+            backoff_max: Upper bound for a computed backoff delay
+        """
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget
+        self.retries_remaining = retry_budget
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def reset_budget(self):
+        """Restore the full retry budget (e.g. before each refresh of a long-running process)."""
+        with self._lock:
+            self.retries_remaining = self.retry_budget
+    
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+    
+    def retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> Optional[float]:
+        """
+        Reserve a retry and compute how long to wait before it.
+        
+        A Retry-After value pauses every request sharing this scheduler,
+        not just the caller.
+        
+        Args:
+            attempt: Number of retries already made for this request
+            retry_after: Value of the Retry-After response header, if any
+        
+        Returns:
+            Delay in seconds, or None if no retry is allowed
+        """
+        if attempt >= self.max_retries:
+            return None
+        with self._lock:
+            if self.retries_remaining <= 0:
+                return None
+            self.retries_remaining -= 1
+            
+            delay = self._parse_retry_after(retry_after)
+            if delay is not None:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                return delay
+        
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """
+        Parse a Retry-After header given as seconds or an HTTP date.
+        
+        Returns:
+            Delay in seconds, or None if the value is missing or invalid
+        """
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
 
 class VultrResourceRetriever:
     """Class to handle Vultr API interactions and data retrieval"""
     
     BASE_URL = "https://api.vultr.com/v2"
+    DEFAULT_PER_PAGE = 500  # Maximum page size accepted by the Vultr API
+    DEFAULT_POOL_SIZE = 32  # Room for one availability request per region in flight
+    DEFAULT_CONNECT_TIMEOUT = 5.0
+    DEFAULT_READ_TIMEOUT = 30.0
+    DEFAULT_CACHE_TTL = 3600.0
+    DEFAULT_RATE_LIMIT = 30.0  # Vultr API limit: 30 requests per second
+    DEFAULT_MAX_RETRIES = 4
+    DEFAULT_RETRY_BUDGET = 20
+    MANIFEST_NAME = SnapshotIndex.MANIFEST_NAME
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, per_page: int = DEFAULT_PER_PAGE,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 cache_dir: str = None,
+                 cache_ttl: float = DEFAULT_CACHE_TTL,
+                 offline: bool = False,
+                 rate_limit: float = DEFAULT_RATE_LIMIT,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 retry_budget: int = DEFAULT_RETRY_BUDGET,
+                 base_url: str = None,
+                 metrics: Optional[Metrics] = None):
         """
         Initialize the retriever with optional API key.
         
         Args:
             api_key: Vultr API key (optional for public endpoints)
+            per_page: Number of items to request per page on list endpoints
+            pool_size: Maximum number of kept-alive connections to the API host
+            connect_timeout: Seconds to wait for a connection to be established
+            read_timeout: Seconds to wait for the server between bytes
+            cache_dir: Directory for the persistent response cache (disabled if None)
+            cache_ttl: Seconds a cached response is used without revalidation
+            offline: Serve responses only from the cache, never contact the API
+            rate_limit: Maximum API requests per second, shared by all threads
+            max_retries: Maximum retries of a single request on 429/5xx/network errors
+            retry_budget: Maximum retries across all requests of this retriever
+            base_url: API base URL (default: $VULTR_API_BASE_URL or BASE_URL),
+                e.g. a local mock_vultr_api server
+            metrics: Metrics to record requests and stages in (default: a
+                new in-memory Metrics)
         """
+        if offline and not cache_dir:
+            raise ValueError("offline mode requires a cache directory")
+        
         self.api_key = api_key
-        self.headers = {}
+        self.base_url = (base_url or os.environ.get("VULTR_API_BASE_URL") or self.BASE_URL).rstrip("/")
+        self.per_page = per_page
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = ResponseCache(cache_dir, cache_ttl) if cache_dir else None
+        self.offline = offline
+        self.scheduler = RequestScheduler(rate_limit, max_retries, retry_budget)
+        self.metrics = metrics or Metrics("retriever")
+        # Requests that returned no data; pagination stops early after one
+        self.failed_requests = 0
+        self._failures_lock = threading.Lock()
+        self._cache_scope = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16] if api_key else ""
+        self.headers = {
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        }
         if api_key:
             self.headers["Authorization"] = f"Bearer {api_key}"
+        self.session = self._create_session(pool_size)
     
-    def _make_request(self, endpoint: str) -> Dict[str, Any]:
+    def _create_session(self, pool_size: int) -> requests.Session:
+        """
+        Create a long-lived HTTP session so consecutive requests reuse
+        the same TCP+TLS connections.
+        
+        Args:
+            pool_size: Maximum number of pooled connections per host
+        
+        Returns:
+            Configured requests session
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+        return session
+    
+    def close(self):
+        """Close the HTTP session and release pooled connections."""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _send(self, url: str, params: Optional[Dict[str, Any]],
+              headers: Dict[str, str], stats: Optional[Dict[str, int]] = None) -> requests.Response:
+        """
+        Send a GET request through the rate limiter, retrying rate-limited,
+        transient server and network errors with backoff.
+        
+        Args:
+            url: Request URL
+            params: Query string parameters
+            headers: Extra request headers
+            stats: Optional dictionary whose 'retries' is set to the number
+                of retries made
+        
+        Returns:
+            The final response (which may still be an error status)
+        
+        Raises:
+            requests.exceptions.RequestException: If the request keeps failing
+        """
+        attempt = 0
+        while True:
+            self.scheduler.acquire()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                delay = self.scheduler.retry_delay(attempt)
+                if delay is None:
+                    raise
+                reason = str(e)
+            else:
+                if response.status_code not in RequestScheduler.RETRY_STATUSES:
+                    return response
+                delay = self.scheduler.retry_delay(attempt, response.headers.get("Retry-After"))
+                if delay is None:
+                    return response
+                reason = f"HTTP {response.status_code}"
+            
+            attempt += 1
+            if stats is not None:
+                stats["retries"] = attempt
+            self.metrics.inc("vultr_http_retries_total", endpoint=endpoint_label(url[len(self.base_url):]))
+            print(f"Retrying {url} in {delay:.1f}s (attempt {attempt}, {reason})", file=sys.stderr)
+            time.sleep(delay)
+    
+    def _record_failure(self):
+        with self._failures_lock:
+            self.failed_requests += 1
+    
+    def _record_request(self, label: str, response: Optional[requests.Response], start: float,
+                        retries: int, decode: float = 0.0):
+        """Record a finished request (response is None if it raised) in the metrics."""
+        seconds = time.perf_counter() - start
+        if response is None:
+            self.metrics.request(label, "error", seconds, retries=retries)
+            return
+        request = response.request
+        # Request line and headers; GET requests have no body
+        bytes_out = len(request.method) + len(request.url) + 12 + sum(
+            len(name) + len(value) + 4 for name, value in request.headers.items()
+        )
+        self.metrics.request(label, response.status_code, seconds,
+                             ttfb=response.elapsed.total_seconds(), decode=decode,
+                             bytes_in=int(response.headers.get("Content-Length") or len(response.content)),
+                             bytes_out=bytes_out, retries=retries)
+    
+    def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                      revalidate: bool = False) -> Dict[str, Any]:
         """
         Make a GET request to Vultr API.
         
         Args:
             endpoint: API endpoint path
-            
+            params: Optional query string parameters
+            revalidate: Always check a cached response with the API, even
+                within the cache TTL (e.g. for account state)
+        
         Returns:
             JSON response as dictionary
         """
-        url = f"{self.BASE_URL}/{endpoint}"
+        url = f"{self.base_url}/{endpoint}"
+        label = endpoint_label(endpoint)
+        
+        entry = self.cache.get(url, params, self._cache_scope) if self.cache else None
+        if entry is not None and (self.offline or (not revalidate and self.cache.is_fresh(entry))):
+            self.metrics.cache(label, "hit")
+            return entry["body"]
+        if self.offline:
+            self.metrics.cache(label, "miss")
+            print(f"Error fetching {endpoint}: not in cache (offline mode)", file=sys.stderr)
+            self._record_failure()
+            return {}
+        
+        # Revalidate a stale cache entry with a conditional request
+        conditional_headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                conditional_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                conditional_headers["If-Modified-Since"] = entry["last_modified"]
+        
+        stats = {"retries": 0}
+        start = time.perf_counter()
+        response = None
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self._send(url, params, conditional_headers, stats)
+            if response.status_code == 304 and entry is not None:
+                self._record_request(label, response, start, stats["retries"])
+                self.metrics.cache(label, "revalidated")
+                self.cache.store(url, params, entry, self._cache_scope)
+                return entry["body"]
             response.raise_for_status()
-            return response.json()
+            decode_start = time.perf_counter()
+            data = response.json()
+            decode = time.perf_counter() - decode_start
         except requests.exceptions.RequestException as e:
+            self._record_request(label, response, start, stats["retries"])
+            if entry is not None:
+                self.metrics.cache(label, "stale")
+                print(f"Error fetching {endpoint}: {e} (using stale cached copy)", file=sys.stderr)
+                return entry["body"]
+            if self.cache:
+                self.metrics.cache(label, "miss")
             print(f"Error fetching {endpoint}: {e}", file=sys.stderr)
+            self._record_failure()
             return {}
+        
+        self._record_request(label, response, start, stats["retries"], decode)
+        if self.cache:
+            self.metrics.cache(label, "refreshed" if entry is not None else "miss")
+            self.cache.store(url, params, {
+                "body": data,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }, self._cache_scope)
+        return data
     
-    def _reorder_with_id_first(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _paginate(self, endpoint: str, key: str,
+                  parse: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                  revalidate: bool = False) -> Iterator[Any]:
         """
-        Reorder dictionary keys to put 'id' first.
+        Yield items from a list endpoint, following the cursor in
+        meta.links.next until the API stops returning one.
+        
+        Items are yielded as each page arrives; raw pages are not kept.
         
         Args:
-            data: List of dictionaries
+            endpoint: API endpoint path
+            key: Name of the list field in the response (e.g. 'plans')
+            parse: Optional function turning each raw item into a record
+            revalidate: Passed to _make_request
+        
+        Yields:
+            Parsed records, or raw item dictionaries if no parser is given
+        """
+        params = {"per_page": self.per_page}
+        seen_cursors = set()
+        while True:
+            data = self._make_request(endpoint, params=params, revalidate=revalidate)
+            items = data.get(key, [])
+            if parse is None:
+                yield from items
+            else:
+                yield from map(parse, items)
             
+            next_cursor = data.get("meta", {}).get("links", {}).get("next")
+            # Stop when the cursor runs out (or the API repeats itself)
+            if not next_cursor or next_cursor in seen_cursors:
+                break
+            seen_cursors.add(next_cursor)
+            params = {"per_page": self.per_page, "cursor": next_cursor}
+    
+    @staticmethod
+    def _as_dict(item: Any) -> Any:
+        """
+        Convert a record to a dictionary for output, with 'id' as first key.
+        
+        Args:
+            item: Record or dictionary
+        
         Returns:
-            List of dictionaries with 'id' as first key
+            Dictionary with 'id' as first key (other values are returned as-is)
         """
-        reordered = []
-        for item in data:
-            if 'id' in item:
-                # Create new dict with id first
-                new_item = {'id': item['id']}
-                new_item.update({k: v for k, v in item.items() if k != 'id'})
-                reordered.append(new_item)
-            else:
-                reordered.append(item)
-        return reordered
+        if isinstance(item, Record):
+            return item.to_dict()
+        if isinstance(item, dict) and 'id' in item and next(iter(item)) != 'id':
+            new_item = {'id': item['id']}
+            new_item.update({k: v for k, v in item.items() if k != 'id'})
+            return new_item
+        return item
+    
+    def iter_plans(self) -> Iterator[Plan]:
+        """
+        Stream all available Vultr plans across every page.
+        
+        Yields:
+            Plan records
+        """
+        return self._paginate("plans", "plans", Plan.from_api)
+    
+    def iter_regions(self) -> Iterator[Region]:
+        """
+        Stream all available Vultr regions across every page.
+        
+        Yields:
+            Region records
+        """
+        return self._paginate("regions", "regions", Region.from_api)
+    
+    def iter_os_list(self) -> Iterator[OperatingSystem]:
+        """
+        Stream all available operating systems across every page.
+        
+        Yields:
+            OperatingSystem records
+        """
+        return self._paginate("os", "os", OperatingSystem.from_api)
     
-    def get_plans(self) -> List[Dict[str, Any]]:
+    def get_plans(self) -> List[Plan]:
         """
         Retrieve all available Vultr plans/resource codes.
         
         Returns:
-            List of plan dictionaries with 'id' as first key
+            List of Plan records
         """
         print("Fetching Vultr plans...")
-        data = self._make_request("plans")
-        plans = data.get("plans", [])
-        plans = self._reorder_with_id_first(plans)
+        plans = list(self.iter_plans())
         print(f"Retrieved {len(plans)} plans")
         return plans
     
-    def get_regions(self) -> List[Dict[str, Any]]:
+    def get_regions(self) -> List[Region]:
         """
         Retrieve all available Vultr regions.
         
         Returns:
-            List of region dictionaries with 'id' as first key
+            List of Region records
         """
         print("Fetching Vultr regions...")
-        data = self._make_request("regions")
-        regions = data.get("regions", [])
-        regions = self._reorder_with_id_first(regions)
+        regions = list(self.iter_regions())
         print(f"Retrieved {len(regions)} regions")
         return regions
     
-    def get_os_list(self) -> List[Dict[str, Any]]:
+    def get_os_list(self) -> List[OperatingSystem]:
         """
         Retrieve all available operating systems.
         
         Returns:
-            List of OS dictionaries with 'id' as first key
+            List of OperatingSystem records
         """
         print("Fetching Vultr operating systems...")
-        data = self._make_request("os")
-        os_list = data.get("os", [])
-        os_list = self._reorder_with_id_first(os_list)
+        os_list = list(self.iter_os_list())
         print(f"Retrieved {len(os_list)} operating systems")
         return os_list
     
+    def get_region_availability(self, region_id: str) -> Optional[List[str]]:
+        """
+        Retrieve the plans that can currently be deployed in a region.
+        
+        A cached response is always revalidated, since availability changes
+        as plans sell out.
+        
+        Args:
+            region_id: Region id (e.g. 'dfw')
+        
+        Returns:
+            Available plan ids, or None if the request failed
+        """
+        try:
+            data = self._make_request(f"regions/{region_id}/availability", revalidate=True)
+        except Exception as e:
+            print(f"Error fetching availability for {region_id}: {e}", file=sys.stderr)
+            self._record_failure()
+            return None
+        plan_ids = data.get("available_plans")
+        return list(plan_ids) if plan_ids is not None else None
+    
+    def get_availability_matrix(self, regions: Optional[Iterable[Any]] = None,
+                                plans: Optional[Iterable[Any]] = None,
+                                concurrency: Optional[int] = None) -> AvailabilityMatrix:
+        """
+        Retrieve which plans are deployable in which region.
+        
+        One request is sent per region, fanned out over a bounded thread
+        pool. The threads share this retriever's session (so connections
+        are reused), rate limiter and retry budget, so a full refresh takes
+        about as long as the slowest few requests instead of one round trip
+        per region.
+        
+        Args:
+            regions: Regions or region ids to query (default: get_regions())
+            plans: Plans or plan ids to use as the first matrix rows, so
+                plans that are available nowhere still have a row
+            concurrency: Maximum requests in flight (default: the connection
+                pool size)
+        
+        Returns:
+            Availability matrix; regions whose request failed are listed in
+            its failed_regions
+        """
+        if regions is None:
+            regions = self.get_regions()
+        region_ids = [region.id if isinstance(region, Region) else region for region in regions]
+        plan_ids = [plan.id if isinstance(plan, Plan) else plan for plan in plans or ()]
+        matrix = AvailabilityMatrix(region_ids, plan_ids, datetime.now().isoformat())
+        
+        print(f"Fetching plan availability for {len(region_ids)} regions...")
+        workers = max(1, min(concurrency or self.pool_size, len(region_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for region_id, plan_ids in zip(region_ids, executor.map(self.get_region_availability, region_ids)):
+                matrix.set_region(region_id, plan_ids)
+        
+        summary = matrix.summary()
+        print(f"Retrieved availability of {summary['plans']} plans in {summary['regions']} regions "
+              f"({summary['available']} deployable pairs)")
+        if matrix.failed_regions:
+            print(f"Warning: no availability for {', '.join(matrix.failed_regions)}", file=sys.stderr)
+        return matrix
+    
+    def _write_json_stream(self, f, data: Any):
+        """
+        Write data as indented JSON, streaming list and iterator values of a
+        top-level dict one item at a time.
+        
+        Records are written as dictionaries with 'id' as first key; otherwise
+        the output is byte-for-byte what json.dump(data, indent=2) produces.
+        
+        Args:
+            f: Open text file
+            data: Data to write
+        """
+        if not isinstance(data, dict) or not data:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            return
+        
+        f.write("{")
+        for index, (key, value) in enumerate(data.items()):
+            f.write(",\n  " if index else "\n  ")
+            f.write(json.dumps(key, ensure_ascii=False) + ": ")
+            if isinstance(value, (list, tuple)) or (
+                    isinstance(value, Iterable) and not isinstance(value, (str, bytes, dict))):
+                count = 0
+                for item in value:
+                    f.write(",\n    " if count else "[\n    ")
+                    f.write(json.dumps(self._as_dict(item), indent=2,
+                                       ensure_ascii=False).replace("\n", "\n    "))
+                    count += 1
+                f.write("\n  ]" if count else "[]")
+            else:
+                f.write(json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+        f.write("\n}")
+    
     def save_to_json(self, data: Dict[str, Any], filename: str):
         """
         Save data to JSON file.
         
+        List or iterator values are written incrementally, so records can be
+        passed straight from the iter_* methods without collecting them first.
+        A filename ending in .gz or .zst is compressed as it is written.
+        
         Args:
             data: Data to save
             filename: Output filename
         """
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with open_snapshot(filename, 'w') as f:
+                self._write_json_stream(f, data)
             print(f"Data saved to {filename}")
         except IOError as e:
             print(f"Error saving to {filename}: {e}", file=sys.stderr)
     
-    def save_to_csv(self, data: List[Dict[str, Any]], filename: str):
+    def _csv_fieldnames(self, keys: Iterable[str]) -> List[str]:
         """
-        Save data to CSV file with 'id' as the first column.
+        Sort column names, ensuring 'id' is first.
         
         Args:
-            data: List of dictionaries to save
-            filename: Output filename
+            keys: Column names
+        
+        Returns:
+            Ordered list of column names
         """
-        if not data:
+        fieldnames = sorted(set(keys))
+        if 'id' in fieldnames:
+            fieldnames.remove('id')
+            fieldnames = ['id'] + fieldnames
+        return fieldnames
+    
+    def _widen_csv(self, filename: str, fieldnames: List[str], spill) -> None:
+        """
+        Rewrite a CSV file with a wider header, merging in the late-key
+        values recorded in the spill file. Rows are streamed, not loaded.
+        
+        Args:
+            filename: CSV file to rewrite in place
+            fieldnames: Final column names
+            spill: Open spill file of JSON lines [row_index, {key: value}]
+        """
+        spill.seek(0)
+        pending = (json.loads(line) for line in spill)
+        next_extra = next(pending, None)
+        # Keep the compression suffix last so the temporary file uses the same codec
+        root, suffix = os.path.splitext(filename)
+        tmp_filename = f"{root}.tmp{suffix}"
+        with open_snapshot(filename) as src, open_snapshot(tmp_filename, 'w') as dst:
+            writer = csv.DictWriter(dst, fieldnames=fieldnames)
+            writer.writeheader()
+            for index, row in enumerate(csv.DictReader(src)):
+                if next_extra is not None and next_extra[0] == index:
+                    row.update(next_extra[1])
+                    next_extra = next(pending, None)
+                writer.writerow(row)
+        os.replace(tmp_filename, filename)
+    
+    def save_to_csv(self, data: Iterable[Any], filename: str,
+                    fieldnames: Optional[List[str]] = None) -> int:
+        """
+        Save records to CSV file with 'id' as the first column, in one pass.
+        
+        The header comes from ``fieldnames`` if given, otherwise from the
+        keys of the first page of records. Keys first seen after that are
+        spilled to a temporary file and the CSV is rewritten once with the
+        widened header, so no values are lost and memory stays bounded.
+        
+        Args:
+            data: List or iterator of records or dictionaries to save
+            filename: Output filename (compressed if it ends in .gz or .zst)
+            fieldnames: Optional declared column order
+        
+        Returns:
+            Number of rows written
+        """
+        records = map(self._as_dict, data)
+        head = list(islice(records, self.per_page))
+        if not head:
             print(f"No data to save to {filename}")
-            return
+            return 0
+        
+        declared = fieldnames is not None
+        if declared:
+            fieldnames = list(fieldnames)
+        else:
+            fieldnames = self._csv_fieldnames(key for item in head for key in item)
+        known = set(fieldnames)
+        late_keys = set()
+        spill = None
+        count = 0
         
         try:
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                # Get all unique keys from all dictionaries
-                fieldnames = set()
-                for item in data:
-                    fieldnames.update(item.keys())
-                
-                # Sort fieldnames but ensure 'id' is first
-                fieldnames = sorted(fieldnames)
-                if 'id' in fieldnames:
-                    fieldnames.remove('id')
-                    fieldnames = ['id'] + fieldnames
-                
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
+            with open_snapshot(filename, 'w') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
                 writer.writeheader()
-                writer.writerows(data)
+                for item in chain(head, records):
+                    extra = item.keys() - known
+                    if extra:
+                        if spill is None:
+                            spill = tempfile.TemporaryFile('w+', encoding='utf-8')
+                        late_keys.update(extra)
+                        spill.write(json.dumps([count, {k: item[k] for k in extra}],
+                                               ensure_ascii=False) + "\n")
+                    writer.writerow(item)
+                    count += 1
+            
+            if spill is not None:
+                print(f"Late columns in {filename}: {', '.join(sorted(late_keys))}; rewriting header")
+                if declared:
+                    fieldnames = fieldnames + sorted(late_keys)
+                else:
+                    fieldnames = self._csv_fieldnames(known | late_keys)
+                self._widen_csv(filename, fieldnames, spill)
             print(f"Data saved to {filename}")
         except IOError as e:
             print(f"Error saving to {filename}: {e}", file=sys.stderr)
+        finally:
+            if spill is not None:
+                spill.close()
+        return count
+    
+    def _safe_fetch(self, name: str, fetch: Callable[[], List[Record]]) -> List[Record]:
+        """
+        Run a single endpoint fetch, turning unexpected failures into an
+        empty result so one endpoint cannot abort the others.
+        
+        Args:
+            name: Endpoint name used in error messages
+            fetch: Zero-argument callable returning the endpoint's items
+        
+        Returns:
+            Fetched items, or an empty list on failure (counted in
+            failed_requests)
+        """
+        try:
+            return fetch()
+        except Exception as e:
+            print(f"Error fetching {name}: {e}", file=sys.stderr)
+            self._record_failure()
+            return []
     
-    def retrieve_and_save_all(self, output_dir: str = "."):
+    def fetch_all(self, concurrency: int = 1) -> Tuple[List[Plan], List[Region], List[OperatingSystem]]:
+        """
+        Retrieve plans, regions and operating systems.
+        
+        Args:
+            concurrency: Number of endpoints to fetch in parallel (1 = serial)
+        
+        Returns:
+            Tuple of (plans, regions, os_list)
+        """
+        fetchers = [
+            ("plans", self.get_plans),
+            ("regions", self.get_regions),
+            ("os", self.get_os_list),
+        ]
+        
+        if concurrency <= 1:
+            return tuple(self._safe_fetch(name, fetch) for name, fetch in fetchers)
+        
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(fetchers))) as executor:
+            futures = [executor.submit(self._safe_fetch, name, fetch) for name, fetch in fetchers]
+            return tuple(future.result() for future in futures)
+    
+    def save_to_db(self, plans: List[Plan], regions: List[Region],
+                   os_list: List[OperatingSystem], db_path: str,
+                   content_hash: Optional[str] = None) -> Optional[int]:
+        """
+        Save a catalog snapshot to the SQLite catalog store.
+        
+        Args:
+            plans: Plan records
+            regions: Region records
+            os_list: OperatingSystem records
+            db_path: Path to the SQLite database
+            content_hash: Precomputed catalog hash (computed if omitted)
+        
+        Returns:
+            Snapshot id, or None on error
+        """
+        from vultr_catalog_store import CatalogStore
+        
+        content_hash = content_hash or catalog_hash(plans, regions, os_list)
+        try:
+            with CatalogStore(db_path) as store:
+                snapshot_id = store.save_snapshot(plans, regions, os_list, content_hash)
+            print(f"Data saved to {db_path} (snapshot {snapshot_id})")
+            return snapshot_id
+        except sqlite3.Error as e:
+            print(f"Error saving to {db_path}: {e}", file=sys.stderr)
+            return None
+    
+    @staticmethod
+    def _snapshot_reusable(entry: Dict[str, Any], formats: Iterable[str], output_dir: str) -> bool:
+        """
+        Return True if a manifest entry's snapshot has files in all requested
+        formats and they all still exist.
+        
+        CSV files that were deleted (update_vultr_docs.py does so unless
+        --keep-csv is used) don't count as missing while the snapshot's
+        JSON file, which holds the same records, still exists.
+        """
+        outputs = entry.get("outputs")
+        if outputs is None:
+            # Entries written before outputs were recorded had JSON and CSV files
+            outputs = [{"format": "csv" if key.endswith("_csv") else "json", "path": name}
+                       for key, name in entry.get("files", {}).items()]
+        if not set(formats) <= {output["format"] for output in outputs}:
+            return False
+        exists = {output["path"]: os.path.exists(os.path.join(output_dir, output["path"]))
+                  for output in outputs}
+        has_json = any(exists[output["path"]] for output in outputs if output["format"] == "json")
+        return all(exists[output["path"]] or (output["format"] == "csv" and has_json)
+                   for output in outputs)
+    
+    def retrieve_and_save_all(self, output_dir: str = ".", concurrency: int = 1,
+                              force: bool = False, db_path: Optional[str] = None,
+                              compression: Optional[str] = None,
+                              formats: Iterable[str] = ("json", "csv")):
         """
         Retrieve all resource information and save to files.
         
+        If the catalog is identical to the last recorded snapshot and that
+        snapshot's files still exist, no new files are written; only a
+        manifest entry pointing at the existing snapshot is appended.
+        
         Args:
             output_dir: Directory to save output files
+            concurrency: Number of endpoints to fetch in parallel (1 = serial)
+            force: Write a new snapshot even if the catalog is unchanged
+            db_path: Also store the snapshot in this SQLite catalog database
+            compression: Compress the snapshot files with 'gzip' or 'zstd'
+                (zstd needs the zstandard package, otherwise gzip is used)
+            formats: Output formats to write: 'json', 'csv', 'parquet' and/or
+                'arrow' (the columnar formats need pyarrow)
+        
+        Returns:
+            True if the catalog was saved (or found unchanged), False if a
+            request failed; an incomplete catalog is never written
         """
+        formats = tuple(formats)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # Retrieve data
-        plans = self.get_plans()
-        regions = self.get_regions()
-        os_list = self.get_os_list()
+        failures_before = self.failed_requests
+        with self.metrics.stage("fetch"):
+            plans, regions, os_list = self.fetch_all(concurrency=concurrency)
+        failed = self.failed_requests - failures_before
+        if failed:
+            print(f"Error: {failed} request(s) failed; the catalog is incomplete, nothing was saved",
+                  file=sys.stderr)
+            return False
+        
+        with self.metrics.stage("hash"):
+            content_hash, kind_hashes = catalog_hashes(plans, regions, os_list)
+        if db_path:
+            with self.metrics.stage("write_db"):
+                self.save_to_db(plans, regions, os_list, db_path, content_hash)
+        
+        index = SnapshotIndex(output_dir)
+        last = index.last()
+        if (not force and last and last.get("content_hash") == content_hash
+                and self._snapshot_reusable(last, formats, output_dir)):
+            index.append({
+                "timestamp": timestamp,
+                "content_hash": content_hash,
+                "hashes": kind_hashes,
+                "unchanged": True,
+                "snapshot": last.get("snapshot", last.get("timestamp")),
+                "files": last.get("files", {}),
+                "outputs": last.get("outputs", []),
+            })
+            print("\n=== Summary ===")
+            print(f"Catalog unchanged since snapshot {last.get('snapshot', last.get('timestamp'))}; "
+                  f"no files written")
+            return True
         
         # Prepare combined data
         all_data = {
@@ -178,29 +940,154 @@ class VultrResourceRetriever:
             "regions": regions,
             "operating_systems": os_list
         }
+        files = {}
+        outputs = []
+        
+        def record(key, kind, fmt, name, rows, content):
+            files[key] = name
+            outputs.append({"kind": kind, "format": fmt, "path": name, "rows": rows, "hash": content})
+        
+        suffix = snapshot_suffix(available_compression(compression))
         
         # Save to JSON
-        json_file = f"{output_dir}/vultr_resources_{timestamp}.json"
-        self.save_to_json(all_data, json_file)
+        if "json" in formats:
+            json_name = f"vultr_resources_{timestamp}.json{suffix}"
+            with self.metrics.stage("write_json"):
+                self.save_to_json(all_data, f"{output_dir}/{json_name}")
+            record("json", "resources", "json", json_name,
+                   len(plans) + len(regions) + len(os_list), content_hash)
         
         # Save individual CSV files
-        if plans:
-            csv_file = f"{output_dir}/vultr_plans_{timestamp}.csv"
-            self.save_to_csv(plans, csv_file)
+        if "csv" in formats:
+            with self.metrics.stage("write_csv"):
+                for key, kind, items in (("plans_csv", "plans", plans), ("regions_csv", "regions", regions),
+                                         ("os_csv", "os", os_list)):
+                    if items:
+                        name = f"vultr_{kind}_{timestamp}.csv{suffix}"
+                        rows = self.save_to_csv(items, f"{output_dir}/{name}")
+                        record(key, kind, "csv", name, rows, kind_hashes[kind])
         
-        if regions:
-            csv_file = f"{output_dir}/vultr_regions_{timestamp}.csv"
-            self.save_to_csv(regions, csv_file)
+        # Save typed columnar tables (the plan -> location table derives from plans)
+        for fmt in COLUMNAR_FORMATS:
+            if fmt in formats:
+                with self.metrics.stage(f"write_{fmt}"):
+                    written = save_columnar(plans, regions, os_list, output_dir, timestamp, fmt, compression)
+                for kind, name, rows in written:
+                    outputs.append({"kind": kind, "format": fmt, "path": name, "rows": rows,
+                                    "hash": kind_hashes.get(kind, kind_hashes["plans"])})
         
-        if os_list:
-            csv_file = f"{output_dir}/vultr_os_{timestamp}.csv"
-            self.save_to_csv(os_list, csv_file)
+        index.append({
+            "timestamp": timestamp,
+            "content_hash": content_hash,
+            "hashes": kind_hashes,
+            "unchanged": False,
+            "snapshot": timestamp,
+            "files": files,
+            "outputs": outputs,
+        })
         
         print("\n=== Summary ===")
         print(f"Plans: {len(plans)}")
         print(f"Regions: {len(regions)}")
         print(f"Operating Systems: {len(os_list)}")
         print(f"\nAll data saved to {output_dir}/")
+        return True
+
+
+OUTPUT_FORMATS = ("json", "csv") + COLUMNAR_FORMATS
+
+
+def _parse_formats(value: str) -> Tuple[str, ...]:
+    """Parse a comma-separated --format value ('both' means json and csv)."""
+    formats = []
+    for name in value.split(","):
+        name = name.strip().lower()
+        for fmt in (("json", "csv") if name == "both" else (name,)):
+            if fmt not in OUTPUT_FORMATS:
+                raise ValueError(f"unknown format '{fmt}' (choose from {', '.join(OUTPUT_FORMATS)}, both)")
+            if fmt not in formats:
+                formats.append(fmt)
+    return tuple(formats)
+
+
+def _run_command(args, retriever: VultrResourceRetriever, formats: Tuple[str, ...]):
+    """Run the command selected on the command line."""
+    if args.command == "serve":
+        from vultr_catalog_server import CatalogServer
+        
+        with retriever:
+            server = CatalogServer(retriever, refresh_interval=args.refresh_interval,
+                                   concurrency=max(args.concurrency, 3))
+            try:
+                server.serve_forever(socket_path=args.socket, port=args.port)
+            except RuntimeError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+        return
+    
+    if args.command == "availability":
+        with retriever:
+            matrix = retriever.get_availability_matrix(concurrency=args.concurrency if args.concurrency > 1 else None)
+        if len(matrix.failed_regions) == len(matrix.regions):
+            print("Error: no region availability could be retrieved", file=sys.stderr)
+            sys.exit(1)
+        os.makedirs(args.output_dir, exist_ok=True)
+        path = os.path.join(args.output_dir, f"vultr_availability_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        matrix.save(path)
+        print(f"Data saved to {path}")
+        return
+    
+    if args.command == "inventory":
+        from vultr_account_inventory import AccountInventory, check_drift
+        
+        state = None
+        if args.tfstate:
+            try:
+                with open(args.tfstate, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading {args.tfstate}: {e}", file=sys.stderr)
+                sys.exit(1)
+        with retriever:
+            inventory = AccountInventory(retriever, args.concurrency if args.concurrency > 1 else None).collect()
+        os.makedirs(args.output_dir, exist_ok=True)
+        path = os.path.join(args.output_dir, f"vultr_inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(inventory, f, indent=2, ensure_ascii=False)
+        print(f"Data saved to {path}")
+        for error in inventory["errors"]:
+            print(f"Warning: {error}", file=sys.stderr)
+        if state is None:
+            sys.exit(0 if inventory["complete"] else 1)
+        
+        drifts, unmanaged = check_drift(inventory, state)
+        for instance in unmanaged:
+            print(f"Not in terraform state: {instance['id']} ({instance.get('label') or instance.get('hostname')})")
+        for drift in drifts:
+            print(f"Drift: {drift}")
+        if not inventory["complete"]:
+            # Missing instances may not have been retrieved; report an error, not drift
+            print("Error: the inventory is incomplete; instances missing from it were not checked",
+                  file=sys.stderr)
+            sys.exit(1)
+        if not drifts:
+            print(f"No drift from {args.tfstate}")
+        # Like terraform plan -detailed-exitcode: 1 = error, 2 = drift
+        sys.exit(2 if drifts else 0)
+    
+    # Retrieve and save all data
+    with retriever:
+        saved = retriever.retrieve_and_save_all(
+            output_dir=args.output_dir,
+            concurrency=args.concurrency,
+            force=args.force,
+            db_path=args.db,
+            compression=args.compress,
+            formats=formats
+        )
+    if not saved:
+        sys.exit(1)
+
 
 
 def main():
@@ -210,9 +1097,25 @@ def main():
     parser = argparse.ArgumentParser(
         description="Retrieve and save Vultr resource information (plans, regions, OS)"
     )
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["fetch", "serve", "availability", "inventory"],
+        default="fetch",
+        help="fetch: save the catalog to files (default); "
+             "serve: keep it in memory and answer queries over --socket/--port; "
+             "availability: save which plans are deployable in each region; "
+             "inventory: save the account's instances, snapshots, backups and reserved IPs"
+    )
     parser.add_argument(
         "--api-key",
-        help="Vultr API key (optional, not required for public endpoints)",
+        help="Vultr API key (optional, not required for public endpoints; "
+             "inventory also reads VULTR_API_KEY)",
+        default=None
+    )
+    parser.add_argument(
+        "--base-url",
+        help="API base URL (default: $VULTR_API_BASE_URL or https://api.vultr.com/v2)",
         default=None
     )
     parser.add_argument(
@@ -222,18 +1125,184 @@ def main():
     )
     parser.add_argument(
         "--format",
-        choices=["json", "csv", "both"],
         default="both",
-        help="Output format (default: both)"
+        help="Output formats, comma-separated: json, csv, both (json,csv), parquet, arrow "
+             "(the columnar formats need pyarrow; default: both)"
+    )
+    parser.add_argument(
+        "--per-page",
+        type=int,
+        default=VultrResourceRetriever.DEFAULT_PER_PAGE,
+        help=f"Items requested per API page (default: {VultrResourceRetriever.DEFAULT_PER_PAGE})"
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=VultrResourceRetriever.DEFAULT_POOL_SIZE,
+        help=f"Maximum pooled keep-alive connections (default: {VultrResourceRetriever.DEFAULT_POOL_SIZE})"
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=VultrResourceRetriever.DEFAULT_CONNECT_TIMEOUT,
+        help=f"Connection timeout in seconds (default: {VultrResourceRetriever.DEFAULT_CONNECT_TIMEOUT})"
+    )
+    parser.add_argument(
+        "--read-timeout",
+        type=float,
+        default=VultrResourceRetriever.DEFAULT_READ_TIMEOUT,
+        help=f"Read timeout in seconds (default: {VultrResourceRetriever.DEFAULT_READ_TIMEOUT})"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory for the persistent response cache (default: no cache)"
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=VultrResourceRetriever.DEFAULT_CACHE_TTL,
+        help=f"Seconds to reuse cached responses before revalidating (default: {VultrResourceRetriever.DEFAULT_CACHE_TTL:.0f})"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Serve responses only from --cache-dir, never contact the API"
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=VultrResourceRetriever.DEFAULT_RATE_LIMIT,
+        help=f"Maximum API requests per second (default: {VultrResourceRetriever.DEFAULT_RATE_LIMIT:.0f})"
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=VultrResourceRetriever.DEFAULT_MAX_RETRIES,
+        help=f"Retries per request on 429/5xx/network errors (default: {VultrResourceRetriever.DEFAULT_MAX_RETRIES})"
+    )
+    parser.add_argument(
+        "--retry-budget",
+        type=int,
+        default=VultrResourceRetriever.DEFAULT_RETRY_BUDGET,
+        help=f"Total retries allowed for the whole run (default: {VultrResourceRetriever.DEFAULT_RETRY_BUDGET})"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of endpoints to fetch in parallel (default: 1, serial); "
+             "for availability and inventory, the number of requests in flight (default: --pool-size)"
+    )
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="Also store the snapshot in this SQLite catalog database"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Write a new snapshot even if the catalog is unchanged"
+    )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        help="serve: Unix socket to answer JSON-lines queries on"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help="serve: port to answer HTTP queries on (127.0.0.1 only)"
+    )
+    parser.add_argument(
+        "--refresh-interval",
+        type=float,
+        default=900.0,
+        help="serve: seconds between background catalog refreshes (default: 900)"
+    )
+    parser.add_argument(
+        "--tfstate",
+        default=None,
+        help="inventory: report drift against this terraform.tfstate (or `terraform show -json` output)"
+    )
+    parser.add_argument(
+        "--metrics-log",
+        default=None,
+        help="Append JSON-lines events (one per request and per stage) to this file"
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        default=None,
+        help="Write Prometheus metrics to this file when done (for node_exporter's textfile collector, *.prom)"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        default=None,
+        help="Profile the run (cProfile, flame graph stack samples, allocations, stage times) into DIR"
+    )
+    parser.add_argument(
+        "--compress",
+        choices=["none", "gzip", "zstd"],
+        default="none",
+        help="Compress snapshot files (zstd needs the zstandard package, otherwise gzip is used; default: none)"
     )
     
     args = parser.parse_args()
+    if args.offline and not args.cache_dir:
+        parser.error("--offline requires --cache-dir")
+    try:
+        formats = _parse_formats(args.format)
+    except ValueError as e:
+        parser.error(f"--format: {e}")
+    if set(formats) & set(COLUMNAR_FORMATS) and not columnar_available():
+        parser.error("parquet/arrow output requires the pyarrow package (pip install pyarrow)")
+    if args.command == "serve" and not args.socket and args.port is None:
+        parser.error("serve requires --socket and/or --port")
+    if args.command == "inventory":
+        args.api_key = args.api_key or os.environ.get("VULTR_API_KEY")
+        if not args.api_key:
+            parser.error("inventory requires --api-key or VULTR_API_KEY")
+    
+    try:
+        metrics = Metrics("retriever", args.metrics_log)
+    except OSError as e:
+        parser.error(f"--metrics-log: {e}")
     
     # Create retriever instance
-    retriever = VultrResourceRetriever(api_key=args.api_key)
+    retriever = VultrResourceRetriever(
+        api_key=args.api_key,
+        per_page=args.per_page,
+        pool_size=args.pool_size,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        cache_dir=args.cache_dir,
+        cache_ttl=args.cache_ttl,
+        offline=args.offline,
+        rate_limit=args.rate_limit,
+        max_retries=args.max_retries,
+        retry_budget=args.retry_budget,
+        base_url=args.base_url,
+        metrics=metrics
+    )
     
-    # Retrieve and save all data
-    retriever.retrieve_and_save_all(output_dir=args.output_dir)
+    if args.profile:
+        from vultr_profiler import Profiler
+        profiler = Profiler(args.profile, metrics)
+    else:
+        profiler = nullcontext()
+    
+    success = False
+    try:
+        with profiler:
+            _run_command(args, retriever, formats)
+        success = True
+    except SystemExit as e:
+        success = not e.code
+        raise
+    finally:
+        metrics.finish(success, args.metrics_textfile)
 
 
 if __name__ == "__main__":
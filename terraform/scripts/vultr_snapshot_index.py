@@ -0,0 +1,531 @@
+"""
+Vultr Snapshot Index
+Append-only JSON lines manifest (vultr_snapshots.jsonl) of the snapshots
+written by VultrResourceRetriever.
+
+Each line records one run: its timestamp, the catalog content hash, whether
+the catalog was unchanged, the snapshot it belongs to and, per output file,
+the kind, format, path, row count and content hash. Entries are appended in
+timestamp order, so the latest snapshot is found by reading the tail of the
+file and a snapshot "as of" a timestamp by bisecting byte offsets, neither of
+which depends on the number of recorded snapshots or files in the directory.
+
+iter_snapshot_records streams the records of one kind out of a snapshot
+file (CSV or the JSON written by retrieve_and_save_all) without loading the
+whole file. Snapshot files may be gzip (.gz) or zstd (.zst) compressed;
+open_snapshot picks the codec from the file name and decompresses as a
+stream.
+"""
+
+import csv
+import gzip
+import json
+import os
+import re
+import sys
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from vultr_records import OperatingSystem, Plan, Record, Region
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for .zst snapshots
+    zstandard = None
+
+# Snapshot kind -> (key in vultr_resources_*.json, record type)
+RECORD_KINDS = {
+    "plans": ("plans", Plan),
+    "regions": ("regions", Region),
+    "os": ("operating_systems", OperatingSystem),
+}
+
+# Compression -> file name suffix
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def available_compression(compression: Optional[str]) -> Optional[str]:
+    """
+    Return the compression to use for a requested one: zstd falls back to
+    gzip when the zstandard package is not installed.
+    
+    Args:
+        compression: None/'none', 'gzip' or 'zstd'
+    
+    Returns:
+        None, 'gzip' or 'zstd'
+    """
+    if compression in (None, "none"):
+        return None
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression == "zstd" and zstandard is None:
+        print("zstandard is not installed; using gzip instead of zstd", file=sys.stderr)
+        return "gzip"
+    return compression
+
+
+def snapshot_suffix(compression: Optional[str]) -> str:
+    """Return the file name suffix for a compression ('' for none)."""
+    return COMPRESSION_SUFFIXES.get(compression or "", "")
+
+
+def open_snapshot(path: str, mode: str = 'r') -> IO[str]:
+    """
+    Open a snapshot file as text, compressing or decompressing as a stream
+    when the name ends in .gz or .zst.
+    
+    Args:
+        path: File path
+        mode: 'r' or 'w'
+    
+    Returns:
+        Text file object (newline translation disabled, as csv expects)
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"Reading or writing {path} requires the zstandard package")
+        return zstandard.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def snapshot_format(path: str) -> str:
+    """Return the format ('json' or 'csv') of a possibly compressed snapshot file."""
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if path.endswith(suffix):
+            path = path[:-len(suffix)]
+            break
+    return os.path.splitext(path)[1].lstrip(".")
+
+
+class SnapshotIndex:
+    """Reads and appends the snapshot manifest of an output directory"""
+    
+    MANIFEST_NAME = "vultr_snapshots.jsonl"
+    TAIL_BLOCK = 64 * 1024
+    
+    def __init__(self, directory: str = "."):
+        """
+        Initialize the index.
+        
+        Args:
+            directory: Directory containing the manifest and snapshot files
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, self.MANIFEST_NAME)
+    
+    def exists(self) -> bool:
+        """Return True if the manifest file exists."""
+        return os.path.exists(self.path)
+    
+    def append(self, entry: Dict[str, Any]):
+        """
+        Append an entry to the manifest.
+        
+        Args:
+            entry: Manifest entry to record
+        """
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except IOError as e:
+            print(f"Error updating {self.path}: {e}", file=sys.stderr)
+    
+    def _reversed_entries(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield manifest entries newest first, reading the file backwards in
+        blocks so only the tail is read when a recent entry is wanted.
+        """
+        try:
+            f = open(self.path, 'rb')
+        except IOError:
+            return
+        with f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            remainder = b""
+            while position > 0:
+                block = min(position, self.TAIL_BLOCK)
+                position -= block
+                f.seek(position)
+                lines = (f.read(block) + remainder).split(b"\n")
+                # The first piece may be a partial line; keep it for the next block
+                remainder = lines.pop(0) if position > 0 else b""
+                for line in reversed(lines):
+                    entry = self._parse(line)
+                    if entry is not None:
+                        yield entry
+            entry = self._parse(remainder)
+            if entry is not None:
+                yield entry
+    
+    @staticmethod
+    def _parse(line: bytes) -> Optional[Dict[str, Any]]:
+        if not line.strip():
+            return None
+        try:
+            return json.loads(line.decode('utf-8'))
+        except ValueError:
+            return None
+    
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """Yield all manifest entries, oldest first."""
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    entry = self._parse(line)
+                    if entry is not None:
+                        yield entry
+        except IOError:
+            return
+    
+    def last(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the most recent manifest entry.
+        
+        Returns:
+            Last entry, or None if there is no usable manifest
+        """
+        return next(self._reversed_entries(), None)
+    
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Return the entry that wrote the most recent snapshot."""
+        return self._snapshot_entry(self._reversed_entries(), skip=0)
+    
+    def previous(self) -> Optional[Dict[str, Any]]:
+        """Return the entry that wrote the snapshot before the latest one."""
+        return self._snapshot_entry(self._reversed_entries(), skip=1)
+    
+    def _snapshot_entry(self, entries: Iterator[Dict[str, Any]], skip: int) -> Optional[Dict[str, Any]]:
+        """
+        Walk entries newest first and return the writing entry of the
+        (skip + 1)-th distinct snapshot. 'Unchanged' entries count towards
+        the snapshot they point at.
+        """
+        seen = []
+        for entry in entries:
+            snapshot = entry.get("snapshot", entry.get("timestamp"))
+            if snapshot not in seen:
+                seen.append(snapshot)
+            if len(seen) == skip + 1 and not entry.get("unchanged"):
+                return entry
+            if len(seen) > skip + 1:
+                return None
+        return None
+    
+    @staticmethod
+    def normalize_timestamp(value: str) -> str:
+        """
+        Normalize a timestamp to YYYYMMDDHHMMSS digits. Missing trailing
+        parts are filled with 9s, so '20251218' means the end of that day.
+        
+        Args:
+            value: Timestamp like '20251218_131843', '2025-12-18T13:18:43'
+                or '2025-12-18'
+        
+        Returns:
+            14-digit string
+        """
+        digits = re.sub(r"\D", "", value)[:14]
+        return digits + "9" * (14 - len(digits))
+    
+    def _bisect(self, timestamp: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the last entry with a timestamp at or before the given one,
+        bisecting the file by byte offset (entries are appended in time order).
+        """
+        target = self.normalize_timestamp(timestamp)
+        try:
+            f = open(self.path, 'rb')
+        except IOError:
+            return None
+        with f:
+            f.seek(0, os.SEEK_END)
+            # Lines starting before 'low' are <= target, lines starting at or
+            # after 'high' are > target
+            low, high = 0, f.tell()
+            found = None
+            while low < high:
+                middle = (low + high) // 2
+                if middle > low:
+                    # Move to the first line starting at or after middle
+                    f.seek(middle - 1)
+                    f.readline()
+                else:
+                    f.seek(low)
+                start = f.tell()
+                if start >= high:
+                    high = middle
+                    continue
+                entry = self._parse(f.readline())
+                if entry is None or self.normalize_timestamp(entry.get("timestamp", "")) <= target:
+                    if entry is not None:
+                        found = entry
+                    low = f.tell()
+                else:
+                    high = start
+        return found
+    
+    def as_of(self, timestamp: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the entry that wrote the snapshot current at a point in time.
+        
+        Args:
+            timestamp: Point in time (see normalize_timestamp)
+        
+        Returns:
+            Writing entry of the snapshot, or None if none is that old
+        """
+        found = self._bisect(timestamp)
+        if found is None or not found.get("unchanged"):
+            return found
+        # A snapshot is named after the timestamp of the entry that wrote it
+        snapshot = found.get("snapshot", "")
+        writer = self._bisect(snapshot)
+        if writer is not None and not writer.get("unchanged") and writer.get("timestamp") == snapshot:
+            return writer
+        for entry in self._reversed_entries():
+            if entry.get("snapshot", entry.get("timestamp")) == snapshot and not entry.get("unchanged"):
+                return entry
+        return None
+    
+    def resolve(self, which: str = "latest") -> Optional[Dict[str, Any]]:
+        """
+        Resolve 'latest', 'previous' or a timestamp to a writing entry.
+        
+        Args:
+            which: 'latest', 'previous' or a timestamp for as_of
+        
+        Returns:
+            Manifest entry, or None
+        """
+        if which == "latest":
+            return self.latest()
+        if which == "previous":
+            return self.previous()
+        return self.as_of(which)
+    
+    def find(self, kind: str, fmt: str, which: str = "latest") -> Optional[str]:
+        """
+        Return the path of a snapshot output file.
+        
+        Args:
+            kind: 'resources', 'plans', 'regions' or 'os'
+            fmt: File format ('json' or 'csv')
+            which: 'latest', 'previous' or a timestamp
+        
+        Returns:
+            Path of the file, or None if the snapshot has no such output
+        """
+        entry = self.resolve(which)
+        if entry is None:
+            return None
+        output = self.output(entry, kind, fmt)
+        return output["path"] if output else None
+    
+    def newest_with(self, kind: str, fmt: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """
+        Return the newest snapshot that has an output file of a kind and
+        format that still exists (e.g. the last CSV snapshot when later
+        runs only wrote JSON).
+        
+        Args:
+            kind: 'resources', 'plans', 'regions' or 'os'
+            fmt: File format ('json' or 'csv')
+        
+        Returns:
+            Tuple of (writing entry, file path), or None
+        """
+        for entry in self._reversed_entries():
+            if entry.get("unchanged"):
+                continue
+            output = self.output(entry, kind, fmt)
+            if output is not None and os.path.exists(output["path"]):
+                return entry, output["path"]
+        return None
+    
+    def output(self, entry: Dict[str, Any], kind: str, fmt: str) -> Optional[Dict[str, Any]]:
+        """
+        Return an output file recorded in a manifest entry.
+        
+        Args:
+            entry: Manifest entry
+            kind: 'resources', 'plans', 'regions' or 'os'
+            fmt: File format ('json' or 'csv')
+        
+        Returns:
+            Output dictionary with the full path (and, for current entries,
+            rows and hash), or None if the entry has no such output
+        """
+        for output in entry.get("outputs", []):
+            if output.get("kind") == kind and output.get("format") == fmt:
+                return dict(output, path=os.path.join(self.directory, output["path"]))
+        # Entries written before outputs were recorded
+        legacy = {("resources", "json"): "json", ("plans", "csv"): "plans_csv",
+                  ("regions", "csv"): "regions_csv", ("os", "csv"): "os_csv"}
+        name = entry.get("files", {}).get(legacy.get((kind, fmt), ""))
+        if not name:
+            return None
+        return {"kind": kind, "format": fmt, "path": os.path.join(self.directory, name)}
+
+
+class _JsonStream:
+    """Incremental reader for the values of a JSON document in a text file"""
+    
+    CHUNK_SIZE = 64 * 1024
+    WHITESPACE = re.compile(r"[ \t\r\n]*")
+    
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+    
+    def _fill(self) -> bool:
+        chunk = self.f.read(self.CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+    
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at the end)."""
+        while True:
+            self.pos = self.WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+    
+    def expect(self, char: str):
+        """Consume the given structural character."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found!r} in {self.f.name}")
+        self.pos += 1
+    
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_arrays(path: str, keys: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Stream the items of the top-level arrays in a JSON object file, decoding
+    one item at a time. Other top-level values are yielded whole.
+    
+    Args:
+        path: JSON file containing an object (possibly compressed)
+        keys: Keys of the values to read (default: all)
+    
+    Yields:
+        Tuples of (key, decoded item or value), in file order
+    """
+    wanted = set(keys) if keys is not None else None
+    with open_snapshot(path) as f:
+        stream = _JsonStream(f)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            name = stream.value()
+            stream.expect(":")
+            if stream.peek() == "[":
+                stream.pos += 1
+                read = wanted is None or name in wanted
+                if stream.peek() == "]":
+                    stream.pos += 1
+                else:
+                    while True:
+                        item = stream.value()
+                        if read:
+                            yield name, item
+                        if stream.peek() != ",":
+                            break
+                        stream.pos += 1
+                    stream.expect("]")
+                if wanted is not None and read:
+                    wanted.discard(name)
+                    if not wanted:
+                        return
+            else:
+                value = stream.value()
+                if wanted is None or name in wanted:
+                    yield name, value
+                    if wanted is not None:
+                        wanted.discard(name)
+                        if not wanted:
+                            return
+            if stream.peek() != ",":
+                stream.expect("}")
+                return
+            stream.pos += 1
+
+
+def iter_json_array(path: str, key: str) -> Iterator[Any]:
+    """
+    Stream the items of one top-level array in a JSON object file.
+    
+    Args:
+        path: JSON file containing an object
+        key: Key of the array to read
+    
+    Yields:
+        Decoded array items
+    """
+    for _, item in iter_json_arrays(path, (key,)):
+        yield item
+
+
+def iter_resources_records(path: str) -> Iterator[Tuple[str, Record]]:
+    """
+    Stream the records of every kind from a vultr_resources_*.json snapshot
+    in a single pass.
+    
+    Args:
+        path: Snapshot file
+    
+    Yields:
+        Tuples of (kind, record), grouped by kind in file order
+    """
+    kinds = {key: (kind, record_type) for kind, (key, record_type) in RECORD_KINDS.items()}
+    for key, item in iter_json_arrays(path, kinds):
+        kind, record_type = kinds[key]
+        yield kind, record_type.from_api(item)
+
+
+def iter_snapshot_records(path: str, kind: str) -> Iterator[Record]:
+    """
+    Stream the records of one kind from a snapshot file.
+    
+    Args:
+        path: A vultr_{kind}_*.csv file, or a vultr_resources_*.json file
+            (either possibly compressed)
+        kind: 'plans', 'regions' or 'os'
+    
+    Yields:
+        Parsed records, in file order
+    """
+    key, record_type = RECORD_KINDS[kind]
+    if snapshot_format(path) == "json":
+        items = iter_json_array(path, key)
+        yield from map(record_type.from_api, items)
+        return
+    with open_snapshot(path) as f:
+        yield from map(record_type.from_api, csv.DictReader(f))